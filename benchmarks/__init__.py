@@ -0,0 +1,4 @@
+"""
+Бенчмарки горячих путей бота.
+Запуск: python -m benchmarks.<имя_модуля> из корня репозитория.
+"""
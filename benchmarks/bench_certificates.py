@@ -0,0 +1,101 @@
+"""
+benchmarks/bench_certificates.py — Бенчмарк рендера сертификатов.
+
+Сравнивает прежний рендер (шрифт регистрируется на каждый документ,
+герб читается из PNG и кодируется заново) с шаблоном
+CertificateTemplate (ресурсы готовятся один раз на процесс).
+
+    python -m benchmarks.bench_certificates [--count N]
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from library import certificates  # noqa: E402
+from library.certificates import (  # noqa: E402
+    EMBLEM_PATH, FONT_PATH, CertificateTemplate, render_certificate,
+)
+
+FIELDS = {
+    "user_id": "1000000001",
+    "full_name": "Иванов Иван Иванович",
+    "position": "Судебный пристав-исполнитель",
+    "department": "ОСП по Центральному району",
+    "specialization": "oupds",
+    "difficulty": "базовый",
+    "grade": "хорошо",
+    "correct_count": 17,
+    "total_questions": 20,
+    "percentage": 85.0,
+    "elapsed_time": "12:34",
+    "issued": "19.10.2026",
+    "serial": "9PGA-N87H",
+    "qr": "9PGA-N87H",
+}
+
+
+class LegacyEmblem:
+    """Герб как в прежнем рендере: drawImage из файла на каждый документ."""
+
+    def draw(self, c, x, y, width, height):
+        c.drawImage(
+            str(EMBLEM_PATH), x, y, width=width, height=height,
+            preserveAspectRatio=True, mask="auto"
+        )
+
+
+class LegacyTemplate(CertificateTemplate):
+    def __init__(self):
+        pdfmetrics.registerFont(TTFont("DejaVu", str(FONT_PATH)))
+        self.font = "DejaVu"
+        self.emblem = LegacyEmblem()
+
+
+def render_legacy(fields: dict) -> bytes:
+    saved = certificates._template
+    certificates._template = LegacyTemplate()
+    try:
+        return render_certificate(fields)
+    finally:
+        certificates._template = saved
+
+
+def bench(name: str, fn, count: int) -> float:
+    fn(FIELDS)  # прогрев
+    times = []
+    for _ in range(count):
+        t0 = time.perf_counter()
+        pdf = fn(FIELDS)
+        times.append(time.perf_counter() - t0)
+    avg = statistics.mean(times) * 1000
+    print(
+        f"{name:<10} {avg:7.1f} ms/серт  "
+        f"(медиана {statistics.median(times) * 1000:.1f}, "
+        f"макс {max(times) * 1000:.1f}), {len(pdf) / 1024:.1f} КБ"
+    )
+    return avg
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--count", type=int, default=50)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    certificates.warm_up()
+    print(f"Шаблон построен за {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+    legacy = bench("Прежний", render_legacy, args.count)
+    template = bench("Шаблон", render_certificate, args.count)
+    print(f"Ускорение: ×{legacy / template:.1f}")
+
+
+if __name__ == "__main__":
+    main()
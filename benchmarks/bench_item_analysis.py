@@ -0,0 +1,158 @@
+"""
+benchmarks/bench_item_analysis.py — Бенчмарк анализа вопросов.
+
+Синтетический набор: 20 000 тестов × 50 вопросов = 1 000 000 ответов.
+Сравнивает векторный ItemAccumulator с наивным циклом на Python
+и замеряет полный путь из SQLite (analyze_bank).
+
+    python -m benchmarks.bench_item_analysis [--tests N] [--questions M]
+"""
+import argparse
+import asyncio
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from library.answer_codec import FORMAT_VERSION, decode_answers  # noqa: E402
+from library import item_analysis  # noqa: E402
+from library.enum import Difficulty  # noqa: E402
+from library.item_analysis import ANSWER_DTYPE, CHUNK_SIZE, ItemAccumulator  # noqa: E402
+from library.stats import stats_manager  # noqa: E402
+
+BANK_SIZE = 200
+N_OPTIONS = 5
+
+
+def make_blobs(n_tests: int, n_questions: int, seed: int = 1) -> list[bytes]:
+    """Генерирует BLOB-ы test_answers по простой модели Раша."""
+    rng = np.random.default_rng(seed)
+    ability = rng.normal(size=n_tests)
+    item_b = rng.normal(size=BANK_SIZE)
+    correct_opt = rng.integers(0, N_OPTIONS, size=BANK_SIZE)
+
+    qids = np.argsort(rng.random((n_tests, BANK_SIZE)), axis=1)[:, :n_questions]
+    p = 1 / (1 + np.exp(-(ability[:, None] - item_b[qids])))
+    is_correct = rng.random(p.shape) < p
+    wrong_opt = (correct_opt[qids] + rng.integers(1, N_OPTIONS, size=p.shape)) % N_OPTIONS
+
+    rec = np.zeros((n_tests, n_questions), dtype=ANSWER_DTYPE)
+    rec["qid"] = qids
+    rec["correct"] = 1 << correct_opt[qids]
+    rec["chosen"] = np.where(is_correct, rec["correct"], 1 << wrong_opt)
+    rec["time_ds"] = rng.integers(50, 900, size=p.shape)
+
+    header = bytes([FORMAT_VERSION])
+    return [header + row.tobytes() for row in rec]
+
+
+def naive_analysis(blobs: list[bytes]) -> dict:
+    """Та же трудность и дискриминативность чистым Python (для сравнения)."""
+    sums = defaultdict(lambda: [0, 0, 0.0, 0.0, 0.0])
+    for blob in blobs:
+        recs = decode_answers(blob)
+        flags = [r.chosen_mask == r.correct_mask for r in recs]
+        total = sum(flags)
+        for r, ok in zip(recs, flags):
+            rest = (total - ok) / max(len(recs) - 1, 1)
+            s = sums[r.question_id]
+            s[0] += 1
+            s[1] += ok
+            s[2] += rest
+            s[3] += rest * rest
+            s[4] += rest * ok
+    out = {}
+    for qid, (n, n1, sx, sx2, sx1) in sums.items():
+        p = n1 / n
+        mean = sx / n
+        std = max(sx2 / n - mean * mean, 0.0) ** 0.5
+        if 0 < n1 < n and std > 0:
+            r = (sx1 / n1 - (sx - sx1) / (n - n1)) / std * (p * (1 - p)) ** 0.5
+        else:
+            r = 0.0
+        out[qid] = (p, r)
+    return out
+
+
+def bench_vectorized(blobs: list[bytes]) -> ItemAccumulator:
+    acc = ItemAccumulator()
+    t0 = time.perf_counter()
+    for i in range(0, len(blobs), CHUNK_SIZE):
+        acc.add_chunk(blobs[i:i + CHUNK_SIZE])
+    results = acc.results()
+    dt = time.perf_counter() - t0
+    n_answers = int(acc.n.sum())
+    print(f"NumPy:        {dt * 1000:8.1f} ms  ({n_answers / dt / 1e6:.1f} M ответов/с, "
+          f"{len(results)} вопросов)")
+    return acc
+
+
+def bench_naive(blobs: list[bytes], acc: ItemAccumulator) -> None:
+    t0 = time.perf_counter()
+    naive = naive_analysis(blobs)
+    dt = time.perf_counter() - t0
+    n_answers = sum((len(b) - 1) // 6 for b in blobs)
+    print(f"Python-цикл:  {dt * 1000:8.1f} ms  ({n_answers / dt / 1e6:.2f} M ответов/с)")
+
+    by_id = {it.question_id: it for it in acc.results()}
+    worst = max(
+        max(abs(by_id[q].p_value - p), abs(by_id[q].discrimination - r))
+        for q, (p, r) in naive.items()
+    )
+    print(f"Расхождение с эталоном: {worst:.2e}")
+
+
+async def bench_sqlite(blobs: list[bytes]) -> None:
+    db_path = Path(tempfile.mkdtemp()) / "bench.db"
+    stats_manager.db_path = db_path
+    await stats_manager.init_db()
+    with sqlite3.connect(db_path) as db:
+        db.executemany(
+            "INSERT INTO test_results (id, user_id, specialization, difficulty, grade, "
+            "correct_count, total_questions, percentage, elapsed_time) "
+            "VALUES (?, 'u', 'bench', 'базовый', '', 0, 0, 0, '')",
+            ((i + 1,) for i in range(len(blobs)))
+        )
+        db.executemany(
+            "INSERT INTO test_answers (result_id, bank_version, answers) VALUES (?, 'v1', ?)",
+            ((i + 1, b) for i, b in enumerate(blobs))
+        )
+    size_mb = db_path.stat().st_size / 1e6
+
+    item_analysis.get_bank_version = lambda spec, diff: "v1"
+    t0 = time.perf_counter()
+    _, acc = await item_analysis.analyze_bank("bench", Difficulty.BASIC)
+    dt = time.perf_counter() - t0
+    print(f"SQLite→NumPy: {dt * 1000:8.1f} ms  ({acc.tests} тестов, БД {size_mb:.1f} МБ)")
+
+    t0 = time.perf_counter()
+    await item_analysis.analyze_bank("bench", Difficulty.BASIC)
+    print(f"Повтор (кэш): {(time.perf_counter() - t0) * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tests", type=int, default=20_000)
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument("--skip-naive", action="store_true")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    blobs = make_blobs(args.tests, args.questions)
+    print(f"Данные: {args.tests} × {args.questions} = {args.tests * args.questions} ответов "
+          f"({sum(map(len, blobs)) / 1e6:.1f} МБ, {time.perf_counter() - t0:.1f} s)")
+
+    acc = bench_vectorized(blobs)
+    if not args.skip_naive:
+        bench_naive(blobs, acc)
+    asyncio.run(bench_sqlite(blobs))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+benchmarks/bench_middleware.py — Накладные расходы цепочки middleware.
+
+Сравнивает на пустом обработчике (без сети и БД):
+  * прямой вызов обработчика;
+  * цепочку errors → rate_limit → timing → load_state;
+  * полный dispatch_callback из main.py (маршрутизатор + цепочка);
+  * запись в гистограмму задержек.
+Лимиты частоты заменены заведомо большими, чтобы события не отсекались.
+
+    python -m benchmarks.bench_middleware [--events N]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import main as bot_main  # noqa: E402
+from library.metrics import LatencyHistogram, latency  # noqa: E402
+from library.middleware import (  # noqa: E402
+    DEFAULT_MIDDLEWARES, Context, Pipeline, call_handler
+)
+from library.ratelimit import GCRA, rate_limiter  # noqa: E402
+from vk_bot.types import VKEvent  # noqa: E402
+
+USERS = 10_000
+
+
+async def noop(bot, event, user_id):
+    pass
+
+
+class FakeBot:
+    async def answer_callback(self, *args, **kwargs):
+        return {"ok": True}
+
+    async def send_text(self, *args, **kwargs):
+        return {"ok": True}
+
+
+def unlimited() -> None:
+    for key in list(rate_limiter._buckets):
+        rate_limiter._buckets[key] = GCRA(10 ** 9, 1.0)
+
+
+async def per_event(label: str, events: int, make, run) -> float:
+    items = [make(i) for i in range(events)]
+    t0 = time.perf_counter()
+    for item in items:
+        await run(item)
+    us = (time.perf_counter() - t0) / events * 1e6
+    print(f"{label:<34} {us:6.2f} мкс/событие")
+    return us
+
+
+async def main_async(events: int) -> None:
+    unlimited()
+    bot = FakeBot()
+    cb = SimpleNamespace(queryId="q", callbackData="my_stats")
+
+    def make_ctx(i):
+        return Context(bot, "callback", cb, f"u{i % USERS}", f"u{i % USERS}",
+                       route="my_stats", handler=noop)
+
+    base = await per_event(
+        "Прямой вызов обработчика", events, make_ctx,
+        lambda ctx: ctx.handler(ctx.bot, ctx.event, ctx.user_id)
+    )
+    pipeline = Pipeline(DEFAULT_MIDDLEWARES, call_handler)
+    chain = await per_event("Цепочка middleware", events, make_ctx, pipeline)
+
+    # Полный путь: main.dispatch_callback с маршрутизатором; обработчик my_stats
+    # подменён пустым, чтобы не ходить в БД
+    route = bot_main.router.resolve("my_stats")
+    original = route.handler
+    object.__setattr__(route, "handler", noop)
+    try:
+        def make_event(i):
+            uid = f"u{i % USERS}"
+            return VKEvent(type="callbackQuery", event_id=i, payload={
+                "queryId": "q", "callbackData": "my_stats",
+                "from": {"userId": uid},
+                "message": {"chat": {"chatId": uid}, "msgId": "1"},
+            })
+        full = await per_event(
+            "dispatch_callback (полный путь)", events, make_event,
+            lambda ev: bot_main.dispatch_callback(bot, ev)
+        )
+    finally:
+        object.__setattr__(route, "handler", original)
+
+    hist = LatencyHistogram()
+    t0 = time.perf_counter()
+    for i in range(events):
+        hist.record(i * 1e-6)
+    record = (time.perf_counter() - t0) / events * 1e6
+    print(f"{'LatencyHistogram.record':<34} {record:6.2f} мкс/запись")
+
+    print(f"\nНакладные расходы цепочки: {chain - base:.2f} мкс, "
+          f"полного пути: {full - base:.2f} мкс на событие")
+    h = latency.histogram("handler", "callback:my_stats")
+    print(f"Записано в гистограмму callback:my_stats: {h.count if h else 0}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--events", type=int, default=200_000)
+    args = parser.parse_args()
+    asyncio.run(main_async(args.events))
+
+
+if __name__ == "__main__":
+    main()
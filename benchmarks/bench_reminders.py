@@ -0,0 +1,111 @@
+"""
+benchmarks/bench_reminders.py — Бенчмарк рассылки напоминаний.
+
+Синтетическая база с N неактивными пользователями и фейковый бот с
+заданной задержкой ответа API. Прежняя рассылка (send + отдельное
+соединение на UPDATE + sleep(1) на пользователя) оценивается по
+замеру на небольшой выборке без sleep.
+
+    python -m benchmarks.bench_reminders [--users N] [--rate R] [--latency MS]
+"""
+import argparse
+import asyncio
+import logging
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import aiosqlite
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config.settings import settings  # noqa: E402
+from library import reminders  # noqa: E402
+from library.stats import stats_manager  # noqa: E402
+
+LEGACY_SAMPLE = 200
+
+
+class FakeBot:
+    """Отвечает ok после задержки, считает одновременные запросы."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+
+    async def send_text(self, chat_id, text, *args, **kwargs):
+        self.calls += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.active -= 1
+        return {"ok": True, "msgId": str(self.calls)}
+
+
+async def make_db(users: int) -> None:
+    stats_manager.db_path = Path(tempfile.mkdtemp()) / "bench.db"
+    await stats_manager.init_db()
+    old = (datetime.now() - timedelta(days=30)).isoformat()
+    with sqlite3.connect(stats_manager.db_path) as db:
+        db.executemany(
+            "INSERT INTO user_activity (user_id, last_activity, test_count, reminder_sent) "
+            "VALUES (?, ?, 1, 0)",
+            ((f"user{i:07d}@corp", old) for i in range(users))
+        )
+
+
+async def bench_legacy(bot: FakeBot, users: int) -> None:
+    """Прежний цикл на выборке: send + UPDATE отдельным соединением."""
+    sample = [f"user{i:07d}@corp" for i in range(LEGACY_SAMPLE)]
+    t0 = time.perf_counter()
+    for user_id in sample:
+        await bot.send_text(user_id, reminders.REMINDER_TEXT)
+        async with aiosqlite.connect(stats_manager.db_path) as db:
+            await db.execute(
+                "UPDATE user_activity SET reminder_sent = 1 WHERE user_id = ?", (user_id,)
+            )
+            await db.commit()
+    per_user = (time.perf_counter() - t0) / LEGACY_SAMPLE + 1.0  # + sleep(1)
+    print(f"Прежняя:  ≈{per_user * users / 3600:6.1f} ч  "
+          f"(оценка: {per_user * 1000:.0f} ms/польз. × {users})")
+    with sqlite3.connect(stats_manager.db_path) as db:
+        db.execute("UPDATE user_activity SET reminder_sent = 0")
+
+
+async def bench_new(bot: FakeBot, users: int) -> None:
+    bot.calls = 0
+    run = await reminders.run_reminders(bot)
+    print(f"Новая:    {run.seconds:8.1f} s  "
+          f"({run.per_second:.0f} сообщ./с, отправлено {run.sent}/{users}, "
+          f"макс. параллельно {bot.max_active})")
+
+
+async def main_async(args) -> None:
+    settings.reminder_rate = args.rate
+    settings.reminder_concurrency = args.concurrency
+    await make_db(args.users)
+    bot = FakeBot(args.latency / 1000)
+    await bench_legacy(bot, args.users)
+    await bench_new(bot, args.users)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--rate", type=float, default=200.0)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=50.0, help="мс на запрос")
+    args = parser.parse_args()
+    logging.getLogger("library.reminders").setLevel(logging.WARNING)
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
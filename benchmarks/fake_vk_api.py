@@ -0,0 +1,355 @@
+"""
+benchmarks/fake_vk_api.py — Локальная замена VK Teams Bot API (aiohttp.web).
+
+Реализует то, что использует vk_bot/bot.py:
+    GET  events/get                 — long-polling (lastEventId, pollTime)
+    GET  messages/sendText, messages/editText, messages/deleteMessages,
+         messages/answerCallbackQuery
+    GET  files/sendFile (fileId)    — повторная отправка загруженного файла
+    POST files/sendFile (multipart) — загрузка файла
+    GET  self/get
+
+Бот подключается к серверу без изменений кода:
+    API_URL=http://127.0.0.1:8081/bot/v1 API_TOKEN=fake-token python main.py
+
+Настраиваются задержка ответа (база + случайная добавка), доля ошибок
+(ok=false / HTTP 500), ограничение частоты (HTTP 429 сверх N запросов/с)
+и считаются вызовы по методам и чатам. Ожидание events/get, ошибки
+и лимит к нему не применяются — он и в настоящем API «висит» до события.
+
+События пользователей создаются из Python (push_message, push_callback —
+так работает benchmarks/loadgen.py) или служебными маршрутами для curl:
+    POST /_events/message?user=u1@test&text=/start
+    POST /_events/callback?user=u1@test&msgId=...&data=spec_oupds
+    GET  /_stats                    — счётчики вызовов (JSON)
+
+    python -m benchmarks.fake_vk_api [--port 8081] [--latency 0.03]
+        [--jitter 0.02] [--error-rate 0.01] [--rate-limit 50]
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional
+
+from aiohttp import web
+
+API_PREFIX = "/bot/v1"
+DEFAULT_TOKEN = "fake-token"
+BOT_USER_ID = "1000000000"
+MAX_POLL_TIME = 30          # сек, как у настоящего API
+MAX_EVENTS_PER_POLL = 100
+
+
+@dataclass
+class FakeConfig:
+    token: str = DEFAULT_TOKEN
+    latency: float = 0.0        # сек, добавляется к каждому ответу (кроме events/get)
+    jitter: float = 0.0         # сек, случайная добавка 0..jitter
+    error_rate: float = 0.0     # доля ответов с ошибкой
+    rate_limit: float = 0.0     # запросов/с на весь сервер; 0 — без лимита
+    max_poll_time: float = MAX_POLL_TIME
+
+
+@dataclass
+class BotAction:
+    """Действие бота, адресованное чату (для виртуальных пользователей)."""
+    method: str
+    chat_id: str
+    msg_id: str = ""
+    text: str = ""
+    keyboard: Optional[List[List[Dict]]] = None
+    at: float = field(default_factory=time.perf_counter)
+
+
+class FakeVKAPI:
+    def __init__(self, config: Optional[FakeConfig] = None):
+        self.config = config or FakeConfig()
+        self._events: Deque[Dict[str, Any]] = deque()
+        self._event_ids = itertools.count(1)
+        self._new_events = asyncio.Event()
+        self._msg_ids = itertools.count(7_000_000_000_000_000_000)
+        self._file_ids = itertools.count(1)
+        self.messages: Dict[str, Dict[str, Dict[str, Any]]] = {}  # chat → msgId → сообщение
+        self.files: Dict[str, int] = {}                          # fileId → размер
+        self._queries: Dict[str, str] = {}                       # queryId → chat
+        self._outboxes: Dict[str, asyncio.Queue] = {}
+
+        # Ограничение частоты: ведро токенов на весь сервер
+        self._tokens = self.config.rate_limit
+        self._refilled = time.monotonic()
+
+        # Учёт
+        self.calls: Counter = Counter()
+        self.errors: Counter = Counter()
+        self.limited: Counter = Counter()
+        self.calls_by_chat: Counter = Counter()
+        self.upload_bytes = 0
+        self.events_pushed = 0
+
+    # ------------------------------------------------------------------ #
+    # Сторона пользователей
+    # ------------------------------------------------------------------ #
+    def subscribe(self, chat_id: str) -> asyncio.Queue:
+        """Очередь действий бота в чате (создаётся при первом обращении)."""
+        queue = self._outboxes.get(chat_id)
+        if queue is None:
+            queue = self._outboxes[chat_id] = asyncio.Queue()
+        return queue
+
+    def unsubscribe(self, chat_id: str) -> None:
+        self._outboxes.pop(chat_id, None)
+
+    def _push(self, event_type: str, payload: Dict[str, Any]) -> int:
+        event_id = next(self._event_ids)
+        self._events.append({"eventId": event_id, "type": event_type, "payload": payload})
+        self.events_pushed += 1
+        self._new_events.set()
+        return event_id
+
+    @staticmethod
+    def _user(user_id: str) -> Dict[str, str]:
+        return {"userId": user_id, "firstName": "Тест", "lastName": user_id.split("@")[0]}
+
+    def push_message(self, user_id: str, text: str) -> int:
+        """Пользователь пишет боту в личный чат (chatId = userId)."""
+        return self._push("newMessage", {
+            "msgId": str(next(self._msg_ids)),
+            "chat": {"chatId": user_id, "type": "private"},
+            "from": self._user(user_id),
+            "text": text,
+            "timestamp": int(time.time()),
+        })
+
+    def push_callback(self, user_id: str, msg_id: str, data: str) -> str:
+        """Пользователь нажимает inline-кнопку под сообщением бота; возвращает queryId."""
+        query_id = f"SVR:{user_id}:{next(self._event_ids)}"
+        self._queries[query_id] = user_id
+        message = self.messages.get(user_id, {}).get(msg_id, {})
+        self._push("callbackQuery", {
+            "queryId": query_id,
+            "from": self._user(user_id),
+            "message": {
+                "msgId": msg_id,
+                "chat": {"chatId": user_id, "type": "private"},
+                "from": {"userId": BOT_USER_ID},
+                "text": message.get("text", ""),
+            },
+            "callbackData": data,
+        })
+        return query_id
+
+    def _deliver(self, action: BotAction) -> None:
+        self.calls_by_chat[action.chat_id] += 1
+        queue = self._outboxes.get(action.chat_id)
+        if queue is not None:
+            queue.put_nowait(action)
+
+    # ------------------------------------------------------------------ #
+    # HTTP
+    # ------------------------------------------------------------------ #
+    def _rate_limited(self) -> bool:
+        rate = self.config.rate_limit
+        if rate <= 0:
+            return False
+        now = time.monotonic()
+        self._tokens = min(rate, self._tokens + (now - self._refilled) * rate)
+        self._refilled = now
+        if self._tokens < 1:
+            return True
+        self._tokens -= 1
+        return False
+
+    async def dispatch(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        handler = METHODS.get((request.method, method))
+        if handler is None:
+            return web.json_response({"ok": False, "description": "Unknown method"}, status=404)
+        if request.method == "POST":
+            form = await request.post()
+            params = {k: v for k, v in form.items()}
+        else:
+            form = None
+            params = dict(request.query)
+        if params.get("token") != self.config.token:
+            return web.json_response({"ok": False, "description": "Invalid token"}, status=401)
+
+        self.calls[method] += 1
+        if method != "events/get":
+            if self._rate_limited():
+                self.limited[method] += 1
+                return web.json_response(
+                    {"ok": False, "description": "Rate limit exceeded"}, status=429
+                )
+            delay = self.config.latency + random.uniform(0, self.config.jitter)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if self.config.error_rate and random.random() < self.config.error_rate:
+                self.errors[method] += 1
+                return web.json_response(
+                    {"ok": False, "description": "Internal error (injected)"}, status=500
+                )
+        body = await handler(self, request, params, form)
+        return web.json_response(body)
+
+    async def _events_get(self, request, params, form) -> Dict[str, Any]:
+        last = int(params.get("lastEventId", 0) or 0)
+        # Подтверждённые события больше не нужны
+        while self._events and self._events[0]["eventId"] <= last:
+            self._events.popleft()
+        if not self._events:
+            self._new_events.clear()
+            poll_time = min(float(params.get("pollTime", 0) or 0), self.config.max_poll_time)
+            try:
+                await asyncio.wait_for(self._new_events.wait(), poll_time)
+            except asyncio.TimeoutError:
+                pass
+        events = list(itertools.islice(self._events, MAX_EVENTS_PER_POLL))
+        return {"ok": True, "events": events}
+
+    def _store(self, chat_id: str, msg_id: str, params: Dict[str, Any]) -> Optional[list]:
+        keyboard = params.get("inlineKeyboardMarkup")
+        keyboard = json.loads(keyboard) if keyboard else None
+        self.messages.setdefault(chat_id, {})[msg_id] = {
+            "text": params.get("text", ""), "keyboard": keyboard,
+        }
+        return keyboard
+
+    async def _send_text(self, request, params, form) -> Dict[str, Any]:
+        chat_id = params.get("chatId", "")
+        msg_id = str(next(self._msg_ids))
+        keyboard = self._store(chat_id, msg_id, params)
+        self._deliver(BotAction("sendText", chat_id, msg_id, params.get("text", ""), keyboard))
+        return {"ok": True, "msgId": msg_id}
+
+    async def _edit_text(self, request, params, form) -> Dict[str, Any]:
+        chat_id, msg_id = params.get("chatId", ""), params.get("msgId", "")
+        if msg_id not in self.messages.get(chat_id, {}):
+            return {"ok": False, "description": "Message not found"}
+        keyboard = self._store(chat_id, msg_id, params)
+        self._deliver(BotAction("editText", chat_id, msg_id, params.get("text", ""), keyboard))
+        return {"ok": True}
+
+    async def _delete_messages(self, request, params, form) -> Dict[str, Any]:
+        chat_id = params.get("chatId", "")
+        chat = self.messages.get(chat_id, {})
+        for msg_id in request.query.getall("msgId", []):
+            chat.pop(msg_id, None)
+        self._deliver(BotAction("deleteMessages", chat_id))
+        return {"ok": True}
+
+    async def _answer_callback(self, request, params, form) -> Dict[str, Any]:
+        chat_id = self._queries.pop(params.get("queryId", ""), None)
+        if chat_id is None:
+            return {"ok": False, "description": "Query not found"}
+        self._deliver(BotAction("answerCallbackQuery", chat_id, text=params.get("text", "")))
+        return {"ok": True}
+
+    async def _send_file(self, request, params, form) -> Dict[str, Any]:
+        chat_id = params.get("chatId", "")
+        if form is not None:
+            upload = form.get("file")
+            size = len(upload.file.read()) if isinstance(upload, web.FileField) else 0
+            file_id = f"file{next(self._file_ids)}"
+            self.files[file_id] = size
+            self.upload_bytes += size
+        else:
+            file_id = params.get("fileId", "")
+            if file_id not in self.files:
+                return {"ok": False, "description": "File not found"}
+        msg_id = str(next(self._msg_ids))
+        self._deliver(BotAction("sendFile", chat_id, msg_id, params.get("caption", "")))
+        return {"ok": True, "msgId": msg_id, "fileId": file_id}
+
+    async def _self_get(self, request, params, form) -> Dict[str, Any]:
+        return {"ok": True, "userId": BOT_USER_ID, "nick": "fake_test_bot", "firstName": "Fake"}
+
+    # ------------------------------------------------------------------ #
+    # Служебные маршруты
+    # ------------------------------------------------------------------ #
+    async def _control_message(self, request: web.Request) -> web.Response:
+        event_id = self.push_message(request.query["user"], request.query.get("text", ""))
+        return web.json_response({"ok": True, "eventId": event_id})
+
+    async def _control_callback(self, request: web.Request) -> web.Response:
+        q = request.query
+        query_id = self.push_callback(q["user"], q.get("msgId", ""), q.get("data", ""))
+        return web.json_response({"ok": True, "queryId": query_id})
+
+    async def _control_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": dict(self.calls),
+            "errors": dict(self.errors),
+            "rate_limited": dict(self.limited),
+            "events_pushed": self.events_pushed,
+            "events_pending": len(self._events),
+            "upload_bytes": self.upload_bytes,
+            "chats": len(self.calls_by_chat),
+        }
+
+    def create_app(self) -> web.Application:
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_route("*", API_PREFIX + "/{method:.+}", self.dispatch)
+        app.router.add_post("/_events/message", self._control_message)
+        app.router.add_post("/_events/callback", self._control_callback)
+        app.router.add_get("/_stats", self._control_stats)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8081) -> web.AppRunner:
+        runner = web.AppRunner(self.create_app(), access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        return runner
+
+
+METHODS = {
+    ("GET", "events/get"): FakeVKAPI._events_get,
+    ("GET", "messages/sendText"): FakeVKAPI._send_text,
+    ("GET", "messages/editText"): FakeVKAPI._edit_text,
+    ("GET", "messages/deleteMessages"): FakeVKAPI._delete_messages,
+    ("GET", "messages/answerCallbackQuery"): FakeVKAPI._answer_callback,
+    ("GET", "files/sendFile"): FakeVKAPI._send_file,
+    ("POST", "files/sendFile"): FakeVKAPI._send_file,
+    ("GET", "self/get"): FakeVKAPI._self_get,
+}
+
+
+async def serve(args: argparse.Namespace) -> None:
+    api = FakeVKAPI(FakeConfig(
+        token=args.token, latency=args.latency, jitter=args.jitter,
+        error_rate=args.error_rate, rate_limit=args.rate_limit,
+    ))
+    runner = await api.start(args.host, args.port)
+    print(f"🧪 Fake VK API: http://{args.host}:{args.port}{API_PREFIX} (token={args.token})")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+        print(json.dumps(api.stats(), ensure_ascii=False, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--token", default=DEFAULT_TOKEN)
+    parser.add_argument("--latency", type=float, default=0.0, help="сек на ответ")
+    parser.add_argument("--jitter", type=float, default=0.0, help="сек, случайная добавка")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля ошибок (0..1)")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="запросов/с, 0 — без лимита")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
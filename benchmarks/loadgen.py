@@ -0,0 +1,520 @@
+"""
+benchmarks/loadgen.py — Сквозная нагрузка: тысячи экзаменуемых одновременно.
+
+Поднимает в своём процессе замену API (benchmarks/fake_vk_api.py),
+запускает бота отдельным процессом (python main.py) с API_URL на неё и
+временными data/ и logs/, затем проводит виртуальных пользователей по
+сценарию экзамена:
+
+    /start → специализация → ФИО → должность → подразделение →
+    уровень → N вопросов (выбор ответа, «Далее») → сертификат → статистика
+
+Между нажатиями — «время на размышление» (экспоненциальное, среднее
+--think сек; между выбором ответа и «Далее» — --tap-gap). Задержка
+считается от нажатия (события в API) до действия бота, завершающего
+шаг: нового вопроса, файла сертификата и т.п. Не получив ответа за
+--patience сек, пользователь повторяет нажатие один раз.
+
+Отчёт: пропускная способность (нажатий/с, тестов/мин), p50/p95/p99
+задержки по шагам, вызовов API на тест, ошибки и таймауты, RSS и CPU
+бота вместе с дочерними процессами (пул рендера; по /proc, Linux) и
+события, отброшенные его ограничителем частоты (по /metrics; запущенный
+бот получает HTTP_ENABLED на --port + 1).
+Задержка цикла событий самого генератора выводится для контроля: если
+она велика, генератор не успевает и результаты завышены.
+
+    python -m benchmarks.loadgen [--users 1000] [--ramp 60] [--think 5]
+        [--difficulty резерв] [--latency 0.03] [--error-rate 0]
+        [--bot-env RATELIMIT_GLOBAL_MESSAGE=500/1] [--json report.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import aiohttp
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.fake_vk_api import API_PREFIX, DEFAULT_TOKEN, BotAction, FakeConfig, FakeVKAPI  # noqa: E402
+from library.metrics import LatencyHistogram  # noqa: E402
+
+STEP_TIMEOUT = 60.0       # сек от нажатия до отказа от шага
+PROGRESS_INTERVAL = 10.0  # сек между строками прогресса
+SAMPLE_INTERVAL = 1.0     # сек между замерами RSS/CPU бота
+REJECTED_METRIC = "bot_ratelimit_rejected_total"
+SPECIALIZATIONS = [
+    "oupds", "ispolniteli", "aliment", "doznanie", "rozyisk",
+    "prof", "oko", "informatika", "kadry", "bezopasnost", "upravlenie",
+]
+STEPS = [
+    "start", "spec", "full_name", "position", "department", "difficulty",
+    "answer", "next", "finish", "certificate", "stats",
+]
+
+
+class StepTimeout(Exception):
+    pass
+
+
+def _callbacks(action: BotAction) -> List[str]:
+    return [btn.get("callbackData", "") for row in action.keyboard or [] for btn in row]
+
+
+def _has_button(prefix: str) -> Callable[[BotAction], bool]:
+    return lambda a: a.method == "sendText" and any(c.startswith(prefix) for c in _callbacks(a))
+
+
+def _is(*methods: str) -> Callable[[BotAction], bool]:
+    return lambda a: a.method in methods
+
+
+@dataclass
+class Report:
+    latency: Dict[str, LatencyHistogram] = field(
+        default_factory=lambda: {step: LatencyHistogram() for step in STEPS}
+    )
+    taps: int = 0
+    completed: int = 0
+    timeouts: Counter = field(default_factory=Counter)
+    retaps: Counter = field(default_factory=Counter)
+    failures: Counter = field(default_factory=Counter)
+    active: int = 0
+    api_calls: List[int] = field(default_factory=list)   # вызовов API на завершённый тест
+
+    def total(self) -> LatencyHistogram:
+        merged = LatencyHistogram()
+        for h in self.latency.values():
+            merged.merge(h)
+        return merged
+
+
+class VirtualUser:
+    def __init__(self, index: int, api: FakeVKAPI, report: Report, args: argparse.Namespace):
+        self.user_id = f"load{index:05d}@loadtest"
+        self.index = index
+        self.api = api
+        self.report = report
+        self.args = args
+        self.rng = random.Random(index)
+        self.inbox = api.subscribe(self.user_id)
+
+    async def think(self, mean: float) -> None:
+        if mean > 0:
+            await asyncio.sleep(self.rng.expovariate(1 / mean))
+
+    async def expect(self, step: str, match: Callable[[BotAction], bool],
+                     send: Callable[[], None]) -> BotAction:
+        """
+        Отправляет событие и ждёт действие бота, завершающее шаг.
+
+        Как живой человек, пользователь без ответа --patience сек
+        повторяет нажатие один раз (событие могло быть сброшено
+        ограничителем частоты); задержка считается от первого нажатия.
+        """
+        self.report.taps += 1
+        tapped = time.perf_counter()
+        send()
+        deadline = tapped + self.args.patience
+        retried = False
+        while True:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    raise asyncio.TimeoutError
+                action = await asyncio.wait_for(self.inbox.get(), remaining)
+            except asyncio.TimeoutError:
+                if retried:
+                    raise StepTimeout(step) from None
+                retried = True
+                self.report.retaps[step] += 1
+                send()
+                deadline = tapped + STEP_TIMEOUT
+                continue
+            if match(action):
+                if step == "next" and "generate_cert" in _callbacks(action):
+                    step = "finish"
+                self.report.latency[step].record(action.at - tapped)
+                return action
+
+    async def say(self, step: str, text: str, match: Callable[[BotAction], bool]) -> BotAction:
+        return await self.expect(
+            step, match, lambda: self.api.push_message(self.user_id, text)
+        )
+
+    async def tap(self, step: str, msg_id: str, data: str,
+                  match: Callable[[BotAction], bool]) -> BotAction:
+        return await self.expect(
+            step, match, lambda: self.api.push_callback(self.user_id, msg_id, data)
+        )
+
+    async def run(self) -> None:
+        self.report.active += 1
+        try:
+            await self.scenario()
+            self.report.completed += 1
+            self.report.api_calls.append(self.api.calls_by_chat[self.user_id])
+        except StepTimeout as e:
+            self.report.timeouts[str(e)] += 1
+        finally:
+            self.report.active -= 1
+            self.api.unsubscribe(self.user_id)
+
+    async def scenario(self) -> None:
+        args = self.args
+        spec = args.spec or self.rng.choice(SPECIALIZATIONS)
+        menu = await self.say("start", "/start", _has_button("spec_"))
+        await self.think(args.think)
+        await self.tap("spec", menu.msg_id, f"spec_{spec}", _is("sendText"))
+        await self.think(args.think)
+        await self.say("full_name", f"Нагрузочный Тест {self.index}", _is("sendText"))
+        await self.think(args.think)
+        await self.say("position", "Судебный пристав-исполнитель", _is("sendText"))
+        await self.think(args.think)
+        levels = await self.say(
+            "department", f"ОСП №{self.index % 50 + 1}", _has_button("diff_")
+        )
+        await self.think(args.think)
+        question = await self.tap(
+            "difficulty", levels.msg_id, f"diff_{args.difficulty}", _has_button("ans_")
+        )
+
+        while True:
+            options = [c for c in _callbacks(question) if c.startswith("ans_")]
+            await self.think(args.think)
+            for data in self.rng.sample(options, 1 if self.rng.random() < 0.8 else 2):
+                await self.tap("answer", question.msg_id, data, _is("answerCallbackQuery"))
+                await self.think(args.tap_gap)
+            nxt = await self.tap(
+                "next", question.msg_id, "next",
+                lambda a: _has_button("ans_")(a) or _has_button("generate_cert")(a)
+            )
+            if "generate_cert" in _callbacks(nxt):
+                break
+            question = nxt
+
+        await self.think(args.think)
+        cert = await self.tap("certificate", nxt.msg_id, "generate_cert", _is("sendFile", "sendText"))
+        if cert.method != "sendFile":
+            self.report.failures["certificate"] += 1
+        await self.think(args.think)
+        await self.tap("stats", nxt.msg_id, "my_stats", _is("sendText"))
+
+
+# ─────────────────────────────────────────────────────────────────────── #
+# Процесс бота
+# ─────────────────────────────────────────────────────────────────────── #
+class ProcessSampler:
+    """RSS и CPU процесса и его потомков по /proc (Linux)."""
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.tick = os.sysconf("SC_CLK_TCK")
+        self.page = os.sysconf("SC_PAGE_SIZE")
+        self.rss_mb: List[float] = []
+        self.cpu_pct: List[float] = []
+        self._last: Optional[tuple] = None
+
+    def _tree(self) -> List[int]:
+        parents: Dict[int, int] = {}
+        for entry in os.listdir("/proc"):
+            if entry.isdigit():
+                try:
+                    stat = Path(f"/proc/{entry}/stat").read_text()
+                except OSError:
+                    continue
+                parents[int(entry)] = int(stat.rsplit(")", 1)[1].split()[1])
+        tree, frontier = [self.pid], [self.pid]
+        while frontier:
+            frontier = [pid for pid, ppid in parents.items() if ppid in frontier]
+            tree += frontier
+        return tree
+
+    def sample(self) -> None:
+        ticks = 0
+        rss = 0
+        for pid in self._tree():
+            try:
+                fields = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+                rss += int(Path(f"/proc/{pid}/statm").read_text().split()[1]) * self.page
+            except OSError:
+                continue
+            ticks += int(fields[11]) + int(fields[12])  # utime + stime
+        now = time.monotonic()
+        if self._last is not None:
+            last_now, last_ticks = self._last
+            self.cpu_pct.append((ticks - last_ticks) / self.tick / (now - last_now) * 100)
+        self._last = (now, ticks)
+        self.rss_mb.append(rss / 1024 / 1024)
+
+    async def run(self) -> None:
+        while True:
+            self.sample()
+            await asyncio.sleep(SAMPLE_INTERVAL)
+
+
+def spawn_bot(port: int, http_port: int, workdir: Path, extra_env: List[str]) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "API_URL": f"http://127.0.0.1:{port}{API_PREFIX}",
+        "API_TOKEN": DEFAULT_TOKEN,
+        "DATA_DIR": str(workdir / "data"),
+        "LOGS_DIR": str(workdir / "logs"),
+        "HTTP_ENABLED": "true",           # /metrics: отказы ограничителя частоты
+        "HTTP_PORT": str(http_port),
+        "PYTHONUNBUFFERED": "1",
+    }
+    for item in extra_env:
+        key, _, value = item.partition("=")
+        env[key] = value
+    out = (workdir / "bot.out").open("wb")
+    return subprocess.Popen(
+        [sys.executable, "main.py"], cwd=ROOT, env=env, stdout=out, stderr=subprocess.STDOUT
+    )
+
+
+async def wait_ready(api: FakeVKAPI, bot: Optional[subprocess.Popen], timeout: float = 60) -> None:
+    """Бот готов, когда начал long-polling."""
+    deadline = time.monotonic() + timeout
+    while api.calls["events/get"] == 0:
+        if bot is not None and bot.poll() is not None:
+            raise RuntimeError(f"Бот завершился с кодом {bot.returncode}")
+        if time.monotonic() > deadline:
+            raise RuntimeError("Бот не начал polling")
+        await asyncio.sleep(0.1)
+
+
+async def scrape_rejections(url: str) -> Optional[Dict[str, int]]:
+    """События, отброшенные ограничителем частоты бота, из его /metrics."""
+    try:
+        async with aiohttp.ClientSession() as session:
+            async with session.get(url, timeout=aiohttp.ClientTimeout(total=10)) as resp:
+                text = await resp.text()
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        return None
+    rejected: Dict[str, int] = {}
+    for line in text.splitlines():
+        if line.startswith(REJECTED_METRIC + "{"):
+            labels, _, value = line.rpartition(" ")
+            kind = labels.split('kind="', 1)[1].split('"', 1)[0]
+            scope = labels.split('scope="', 1)[1].split('"', 1)[0]
+            rejected[f"{kind}/{scope}"] = int(float(value))
+    return rejected
+
+
+# ─────────────────────────────────────────────────────────────────────── #
+# Отчёт
+# ─────────────────────────────────────────────────────────────────────── #
+def _ms(h: LatencyHistogram, q: float) -> str:
+    return f"{h.quantile(q) * 1000:.0f}" if h.count else "—"
+
+
+async def progress(report: Report, api: FakeVKAPI, started: float) -> None:
+    last_taps = 0
+    while True:
+        await asyncio.sleep(PROGRESS_INTERVAL)
+        rate = (report.taps - last_taps) / PROGRESS_INTERVAL
+        last_taps = report.taps
+        total = report.total()
+        print(
+            f"⏱ {time.perf_counter() - started:5.0f} s | активных {report.active} | "
+            f"завершили {report.completed} | {rate:.0f} нажатий/с | "
+            f"p95 {_ms(total, 0.95)} ms | таймаутов {sum(report.timeouts.values())}",
+            file=sys.stderr,
+        )
+
+
+async def loop_lag(hist: LatencyHistogram, interval: float = 0.05) -> None:
+    while True:
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        hist.record(max(time.perf_counter() - expected, 0.0))
+
+
+def build_report(report: Report, api: FakeVKAPI, sampler: Optional[ProcessSampler],
+                 rejected: Optional[Dict[str, int]], lag: LatencyHistogram,
+                 seconds: float, args: argparse.Namespace) -> Dict:
+    api_calls = sum(n for method, n in api.calls.items() if method != "events/get")
+    steps = {
+        step: {
+            "count": h.count,
+            "p50_ms": h.quantile(0.5) * 1000, "p95_ms": h.quantile(0.95) * 1000,
+            "p99_ms": h.quantile(0.99) * 1000, "max_ms": h.max_us / 1000,
+        }
+        for step, h in report.latency.items() if h.count
+    }
+    total = report.total()
+    result = {
+        "users": args.users,
+        "completed": report.completed,
+        "timeouts": dict(report.timeouts),
+        "retaps": dict(report.retaps),
+        "failures": dict(report.failures),
+        "seconds": seconds,
+        "taps": report.taps,
+        "taps_per_second": report.taps / seconds,
+        "tests_per_minute": report.completed / seconds * 60,
+        "latency": {
+            "all": {"p50_ms": total.quantile(0.5) * 1000, "p95_ms": total.quantile(0.95) * 1000,
+                    "p99_ms": total.quantile(0.99) * 1000},
+            **steps,
+        },
+        "api_calls": api_calls,
+        "api_calls_per_test": (
+            sum(report.api_calls) / len(report.api_calls) if report.api_calls else None
+        ),
+        "api_errors_injected": sum(api.errors.values()),
+        "api_rate_limited": sum(api.limited.values()),
+        "bot_rate_limited": rejected,
+        "loadgen_loop_lag_p99_ms": lag.quantile(0.99) * 1000,
+    }
+    if sampler is not None and sampler.rss_mb:
+        result["bot"] = {
+            "rss_max_mb": max(sampler.rss_mb),
+            "rss_last_mb": sampler.rss_mb[-1],
+            "cpu_avg_pct": sum(sampler.cpu_pct) / len(sampler.cpu_pct) if sampler.cpu_pct else 0,
+            "cpu_max_pct": max(sampler.cpu_pct, default=0),
+        }
+    return result
+
+
+def print_report(r: Dict) -> None:
+    print(
+        f"\n👥 Пользователей: {r['users']}, завершили тест: {r['completed']}, "
+        f"таймаутов: {sum(r['timeouts'].values())} {r['timeouts'] or ''}"
+    )
+    print(
+        f"⏱ {r['seconds']:.0f} s, нажатий: {r['taps']} ({r['taps_per_second']:.1f}/с), "
+        f"тестов в минуту: {r['tests_per_minute']:.1f}"
+    )
+    print(f"\n{'шаг':<12} {'n':>8} {'p50':>7} {'p95':>7} {'p99':>7} {'max':>7}  (мс)")
+    for step, s in r["latency"].items():
+        if step == "all":
+            continue
+        print(
+            f"{step:<12} {s['count']:>8} {s['p50_ms']:>7.0f} {s['p95_ms']:>7.0f} "
+            f"{s['p99_ms']:>7.0f} {s['max_ms']:>7.0f}"
+        )
+    a = r["latency"]["all"]
+    print(f"{'все':<12} {r['taps']:>8} {a['p50_ms']:>7.0f} {a['p95_ms']:>7.0f} {a['p99_ms']:>7.0f}")
+    per_test = r["api_calls_per_test"]
+    print(
+        f"\n📡 Вызовов API: {r['api_calls']}"
+        + (f", на тест: {per_test:.1f}" if per_test else "")
+        + f"; ошибок (инъекция): {r['api_errors_injected']}, 429: {r['api_rate_limited']}"
+    )
+    if r["retaps"]:
+        print(f"🔁 Повторных нажатий (нет ответа за --patience сек): {r['retaps']}")
+    if r["bot_rate_limited"]:
+        print(f"🚦 Отброшено ограничителем частоты бота: {r['bot_rate_limited']}")
+    if r["failures"]:
+        print(f"❌ Неудачные шаги: {r['failures']}")
+    if "bot" in r:
+        b = r["bot"]
+        print(
+            f"🤖 Бот: RSS max {b['rss_max_mb']:.0f} MB (в конце {b['rss_last_mb']:.0f}), "
+            f"CPU avg {b['cpu_avg_pct']:.0f}% max {b['cpu_max_pct']:.0f}%"
+        )
+    lag = r["loadgen_loop_lag_p99_ms"]
+    note = "  ⚠️ генератор перегружен, задержки завышены" if lag > 50 else ""
+    print(f"🧪 Задержка цикла генератора p99: {lag:.0f} ms{note}")
+
+
+async def main_async(args: argparse.Namespace) -> Dict:
+    api = FakeVKAPI(FakeConfig(
+        latency=args.latency, jitter=args.jitter,
+        error_rate=args.error_rate, rate_limit=args.rate_limit,
+    ))
+    runner = await api.start(port=args.port)
+    workdir = Path(tempfile.mkdtemp(prefix="loadgen_"))
+    bot = None
+    metrics_url = args.bot_metrics
+    if not args.no_spawn:
+        bot = spawn_bot(args.port, args.port + 1, workdir, args.bot_env)
+        metrics_url = metrics_url or f"http://127.0.0.1:{args.port + 1}/metrics"
+    pid = bot.pid if bot is not None else args.bot_pid
+    sampler = ProcessSampler(pid) if pid and Path("/proc").exists() else None
+    print(f"🧪 Fake API на :{args.port}, каталог прогона: {workdir}", file=sys.stderr)
+
+    lag = LatencyHistogram()
+    background: List[asyncio.Task] = []
+    try:
+        await wait_ready(api, bot)
+        report = Report()
+        started = time.perf_counter()
+        background = [asyncio.create_task(loop_lag(lag)),
+                      asyncio.create_task(progress(report, api, started))]
+        if sampler is not None:
+            background.append(asyncio.create_task(sampler.run()))
+
+        users = []
+        for i in range(args.users):
+            delay = args.ramp * i / args.users
+            users.append(asyncio.create_task(_delayed(delay, VirtualUser(i, api, report, args).run())))
+        _, pending = await asyncio.wait(users, timeout=args.duration)
+        for task in pending:
+            task.cancel()
+        seconds = time.perf_counter() - started
+        rejected = await scrape_rejections(metrics_url) if metrics_url else None
+        return build_report(report, api, sampler, rejected, lag, seconds, args)
+    finally:
+        for task in background:
+            task.cancel()
+        if bot is not None:
+            bot.terminate()
+            try:
+                bot.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                bot.kill()
+        await runner.cleanup()
+
+
+async def _delayed(delay: float, coro) -> None:
+    await asyncio.sleep(delay)
+    await coro
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--ramp", type=float, default=60.0, help="сек на запуск всех пользователей")
+    parser.add_argument("--think", type=float, default=5.0, help="сек, среднее между шагами")
+    parser.add_argument("--tap-gap", type=float, default=0.5, help="сек между ответом и «Далее»")
+    parser.add_argument("--difficulty", default="резерв")
+    parser.add_argument("--spec", help="одна специализация для всех (по умолчанию — случайная)")
+    parser.add_argument("--patience", type=float, default=15.0,
+                        help="сек без ответа до повторного нажатия")
+    parser.add_argument("--duration", type=float, default=3600.0, help="предел прогона, сек")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.03, help="задержка API, сек")
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="лимит API, запросов/с")
+    parser.add_argument("--bot-env", action="append", default=[], metavar="KEY=VALUE",
+                        help="переменные окружения бота (настройки)")
+    parser.add_argument("--no-spawn", action="store_true",
+                        help="не запускать бота (уже запущен с API_URL на этот сервер)")
+    parser.add_argument("--bot-pid", type=int, help="PID бота для RSS/CPU при --no-spawn")
+    parser.add_argument("--bot-metrics", metavar="URL",
+                        help="/metrics бота (по умолчанию — запущенного, на --port + 1)")
+    parser.add_argument("--json", type=Path, help="сохранить отчёт в файл")
+    args = parser.parse_args()
+
+    report = asyncio.run(main_async(args))
+    print_report(report)
+    if args.json:
+        args.json.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
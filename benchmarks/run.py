@@ -0,0 +1,383 @@
+"""
+benchmarks/run.py — Набор микробенчмарков горячих путей с базовой линией.
+
+Каждый случай замеряется как в timeit: число повторов в серии
+подбирается так, чтобы серия шла не меньше --min-time секунд, затем
+выполняется --repeat серий при отключённом GC. Набор запускается в
+--processes отдельных процессах (PYTHONHASHSEED=0); для сравнения
+берётся минимум времени операции по всем сериям (наименее зашумлённая
+оценка), медиана выводится для справки.
+
+Базовая линия — benchmarks/baseline.json. Случай считается регрессией,
+если минимум вырос больше чем на порог (--threshold или порог случая)
+и это подтвердил повторный замер; при регрессии код выхода 1. Базовая линия зависит от машины: её
+записывают (--update) на той же машине, где запускается проверка.
+Сеть, БД и пул процессов не используются — набор работает офлайн.
+
+    python -m benchmarks.run                    # сравнить с baseline.json
+    python -m benchmarks.run --update           # записать новую базовую линию
+    python -m benchmarks.run -k keyboard -k state   # только выбранные случаи
+"""
+import argparse
+import asyncio
+import gc
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from library.certificates import generate_certificate  # noqa: E402
+from library.core import _build_question_text  # noqa: E402
+from library.enum import Difficulty  # noqa: E402
+from library.keyboards import get_test_keyboard  # noqa: E402
+from library.models import CurrentTestState, Question  # noqa: E402
+from library.question_loader import load_questions_for_specialization  # noqa: E402
+from library.state_manager import StateManager  # noqa: E402
+from vk_bot.types import VKEvent  # noqa: E402
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+DEFAULT_THRESHOLD = 0.25
+SPECIALIZATION = "oupds"
+USERS = 10_000
+
+
+@dataclass
+class Case:
+    name: str
+    setup: Callable[[], Callable]   # возвращает замеряемую функцию (или корутинную)
+    is_async: bool = False
+    threshold: Optional[float] = None
+
+
+CASES: List[Case] = []
+
+
+def bench(name: str, is_async: bool = False, threshold: Optional[float] = None):
+    def register(setup: Callable[[], Callable]) -> Callable[[], Callable]:
+        CASES.append(Case(name, setup, is_async, threshold))
+        return setup
+    return register
+
+
+# ─────────────────────────────────────────────────────────────────────── #
+# Данные
+# ─────────────────────────────────────────────────────────────────────── #
+def make_questions(n: int) -> List[Question]:
+    return [
+        Question(
+            question=f"Вопрос {i}: какой срок установлен для добровольного исполнения?",
+            options=[f"Вариант ответа {j} к вопросу {i}" for j in range(1, 5)],
+            correct_answers={1 + i % 4},
+            question_id=i,
+        )
+        for i in range(n)
+    ]
+
+
+def make_test_state(n: int) -> CurrentTestState:
+    state = CurrentTestState(
+        questions=make_questions(n), full_name="Иванов Иван Иванович",
+        specialization=SPECIALIZATION, difficulty=Difficulty.ADVANCED,
+    )
+    state.answers_history = {i: {1 + (i * 7) % 4} for i in range(n)}
+    return state
+
+
+MESSAGE_PAYLOAD = {
+    "msgId": "7212345678901234567",
+    "chat": {"chatId": "1000000001@chat.agent", "type": "private", "title": ""},
+    "from": {"userId": "1000000001@chat.agent", "firstName": "Иван",
+             "lastName": "Иванов", "nick": "ivanov"},
+    "text": "/start",
+    "timestamp": 1760000000,
+}
+
+CALLBACK_PAYLOAD = {
+    "queryId": "SVR:1000000001:1760000000:123",
+    "from": {"userId": "1000000001@chat.agent", "firstName": "Иван", "lastName": "Иванов"},
+    "message": {
+        "msgId": "7212345678901234567",
+        "chat": {"chatId": "1000000001@chat.agent", "type": "private"},
+        "from": {"userId": "70001@chat.agent"},
+        "text": "📝 Вопрос 5/50",
+    },
+    "callbackData": "ans_3",
+}
+
+
+# ─────────────────────────────────────────────────────────────────────── #
+# Случаи
+# ─────────────────────────────────────────────────────────────────────── #
+@bench("core._build_question_text")
+def _():
+    state = make_test_state(40)
+    state.current_index = 5
+    state.selected_answers = {1, 3}
+    return lambda: _build_question_text(state)
+
+
+@bench("keyboards.get_test_keyboard")
+def _():
+    return lambda: get_test_keyboard(4, {2})
+
+
+@bench("CurrentTestState.calculate_results")
+def _():
+    return make_test_state(50).calculate_results
+
+
+@bench("Question.shuffle_options")
+def _():
+    return make_questions(1)[0].shuffle_options
+
+
+@bench("VKEvent.message")
+def _():
+    event = VKEvent(type="newMessage", payload=MESSAGE_PAYLOAD, event_id=1)
+    return lambda: event.message
+
+
+@bench("VKEvent.callback_query")
+def _():
+    event = VKEvent(type="callbackQuery", payload=CALLBACK_PAYLOAD, event_id=1)
+    return lambda: event.callback_query
+
+
+@bench("question_loader.load_questions (oupds, базовый)")
+def _():
+    return lambda: load_questions_for_specialization(SPECIALIZATION, Difficulty.BASIC)
+
+
+@bench("certificates.generate_certificate", is_async=True, threshold=0.30)
+def _():
+    # Пул не запущен — рендер в потоке, без процессов
+    state = make_test_state(20)
+    state.calculate_results()
+    state.position = "Судебный пристав-исполнитель"
+    state.department = "ОСП по Центральному району"
+    state.cert_serial = "9PGA-N87H"
+    return lambda: generate_certificate(state, "1000000001")
+
+
+@bench("StateManager: set/update/get (10k users)", is_async=True)
+def _():
+    manager = StateManager()
+    users = [f"{100000 + i}@chat.agent" for i in range(USERS)]
+    for user_id in users:
+        manager._get_or_create(user_id).state = "answering_question"
+    random.Random(1).shuffle(users)
+    picks = itertools.cycle(users)
+
+    async def cycle():
+        user_id = next(picks)
+        await manager.set_state(user_id, "answering_question")
+        await manager.update_data(user_id, specialization=SPECIALIZATION)
+        await manager.get_state(user_id)
+        await manager.get_data(user_id)
+
+    return cycle
+
+
+# ─────────────────────────────────────────────────────────────────────── #
+# Замер
+# ─────────────────────────────────────────────────────────────────────── #
+def _timer(case: Case, fn: Callable, loop: asyncio.AbstractEventLoop) -> Callable[[int], float]:
+    if case.is_async:
+        async def batch(number: int) -> float:
+            started = time.perf_counter()
+            for _ in range(number):
+                await fn()
+            return time.perf_counter() - started
+        return lambda number: loop.run_until_complete(batch(number))
+
+    def run(number: int) -> float:
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        return time.perf_counter() - started
+    return run
+
+
+def measure(case: Case, repeat: int, min_time: float,
+            loop: asyncio.AbstractEventLoop) -> Dict[str, float]:
+    """Время одной операции, мкс: минимум и медиана по сериям."""
+    random.seed(0)
+    timer = _timer(case, case.setup(), loop)
+    timer(1)  # прогрев: ленивые импорты, шрифты, кэши
+    number = 1
+    while timer(number) < min_time:
+        number *= 2
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        per_op = [timer(number) / number * 1e6 for _ in range(repeat)]
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return {"min_us": min(per_op), "median_us": statistics.median(per_op), "number": number}
+
+
+def load_baseline() -> Dict:
+    if not BASELINE_PATH.exists():
+        return {}
+    return json.loads(BASELINE_PATH.read_text(encoding="utf-8"))
+
+
+def machine_info() -> Dict[str, str]:
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "system": platform.system(),
+    }
+
+
+def _fmt_us(us: float) -> str:
+    return f"{us:,.2f}" if us < 1000 else f"{us:,.0f}"
+
+
+def run_worker(names: List[str], repeat: int, min_time: float) -> None:
+    """Режим --worker: замер в этом процессе, результат — JSON в stdout."""
+    logging.getLogger().setLevel(logging.ERROR)
+    loop = asyncio.new_event_loop()
+    results = {c.name: measure(c, repeat, min_time, loop) for c in CASES if c.name in names}
+    loop.close()
+    print(json.dumps(results))
+
+
+def run_processes(cases: List[Case], args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    """
+    Каждый процесс замеряет все случаи; итог — минимум по процессам.
+    Разброс между процессами (раскладка памяти, хеши) здесь больше, чем
+    между сериями внутри процесса.
+    """
+    env = {**os.environ, "PYTHONHASHSEED": "0"}
+    command = [sys.executable, "-m", "benchmarks.run", "--worker",
+               "--repeat", str(args.repeat), "--min-time", str(args.min_time)]
+    for case in cases:
+        command += ["--case", case.name]
+    runs: Dict[str, List[Dict[str, float]]] = {c.name: [] for c in cases}
+    for i in range(args.processes):
+        print(f"⏳ Процесс {i + 1}/{args.processes}...", file=sys.stderr)
+        out = subprocess.run(
+            command, env=env, cwd=ROOT, check=True, capture_output=True, text=True
+        ).stdout
+        for name, res in json.loads(out.strip().splitlines()[-1]).items():
+            runs[name].append(res)
+    return {
+        name: {
+            "min_us": min(r["min_us"] for r in per_process),
+            "median_us": statistics.median(r["median_us"] for r in per_process),
+            "number": per_process[0]["number"],
+        }
+        for name, per_process in runs.items()
+    }
+
+
+def _threshold(case: Case, args: argparse.Namespace) -> float:
+    return case.threshold if case.threshold is not None else args.threshold
+
+
+def _delta(case: Case, results: Dict, base_results: Dict) -> float:
+    """Относительное изменение минимума к базовой линии (0 — нет базы)."""
+    base = base_results.get(case.name, {}).get("min_us")
+    if base is None:
+        return 0.0
+    return results[case.name]["min_us"] / base - 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--update", action="store_true", help="записать baseline.json")
+    parser.add_argument("-k", dest="filters", action="append", default=[],
+                        help="подстрока имени случая (можно несколько)")
+    parser.add_argument("--processes", type=int, default=3, help="процессов-замерщиков")
+    parser.add_argument("--repeat", type=int, default=5, help="серий в процессе")
+    parser.add_argument("--min-time", type=float, default=0.1, help="сек на серию")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="допустимый рост минимума (доля)")
+    parser.add_argument("--json", type=Path, help="сохранить результаты в файл")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--case", action="append", default=[], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.case, args.repeat, args.min_time)
+        return
+
+    cases = [
+        c for c in CASES
+        if not args.filters or any(f.lower() in c.name.lower() for f in args.filters)
+    ]
+    baseline = load_baseline()
+    base_results = baseline.get("results", {})
+    if baseline and baseline.get("machine") != machine_info():
+        print(f"⚠️ Базовая линия записана на другой машине: {baseline.get('machine')}")
+
+    results = run_processes(cases, args)
+    # Превышение порога перепроверяется ещё одним замером: случайный
+    # всплеск нагрузки на машине не повторяется, настоящая регрессия — да
+    suspects = [c for c in cases if _delta(c, results, base_results) > _threshold(c, args)]
+    if suspects and not args.update:
+        print(f"🔁 Перепроверка: {', '.join(c.name for c in suspects)}", file=sys.stderr)
+        for name, res in run_processes(suspects, args).items():
+            if res["min_us"] < results[name]["min_us"]:
+                results[name] = res
+
+    regressions = []
+    width = max(len(c.name) for c in cases)
+    print(f"{'случай':<{width}}  {'мин, мкс':>10}  {'медиана':>10}  {'база':>10}  изменение")
+    for case in cases:
+        res = results[case.name]
+        base = base_results.get(case.name, {}).get("min_us")
+        threshold = _threshold(case, args)
+        if base is None:
+            change = "новый"
+        else:
+            delta = _delta(case, results, base_results)
+            change = f"{delta:+.1%}"
+            if delta > threshold:
+                change += f"  ❌ регрессия (порог {threshold:.0%})"
+                regressions.append(case.name)
+            elif delta < -threshold:
+                change += "  ✅ ускорение"
+        print(
+            f"{case.name:<{width}}  {_fmt_us(res['min_us']):>10}  "
+            f"{_fmt_us(res['median_us']):>10}  "
+            f"{_fmt_us(base) if base is not None else '—':>10}  {change}"
+        )
+
+    report = {
+        "machine": machine_info(),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "results": results,
+    }
+    if args.json:
+        args.json.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    if args.update:
+        if args.filters:
+            report["results"] = {**base_results, **results}
+        BASELINE_PATH.write_text(
+            json.dumps(report, ensure_ascii=False, indent=2) + "\n", encoding="utf-8"
+        )
+        print(f"💾 Базовая линия записана: {BASELINE_PATH}")
+        return
+    if regressions:
+        print(f"❌ Регрессии: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
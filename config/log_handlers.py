@@ -0,0 +1,139 @@
+"""
+config/log_handlers.py — Неблокирующее логирование.
+
+Корневой логгер пишет только в ограниченную очередь (BoundedQueueHandler);
+форматирование времени, JSON, запись в stdout и файл выполняет поток
+QueueListener. Если очередь заполнена, запись отбрасывается и
+учитывается в счётчике — поток цикла событий никогда не ждёт диска.
+
+В потоке вызывающего выполняется только подстановка аргументов
+(msg % args) — она нужна, чтобы не передавать в другой поток изменяемые
+объекты. Поэтому на горячих путях аргументы передаются %-стилем:
+записи ниже уровня логгера не форматируются вовсе.
+
+Выборка (SamplingFilter): для INFO и ниже можно оставлять одну запись
+из N — по логгеру (настройка log_sampling) или для отдельного вызова
+через extra={"sample": N}. Считается по шаблону сообщения, первая
+запись каждого шаблона в окне SAMPLE_WINDOW всегда проходит. Счётчики
+сбрасываются с каждым окном, поэтому сообщения, собранные f-строкой
+(каждое — свой «шаблон»), не накапливаются в памяти.
+"""
+import json
+import logging
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler
+from typing import Dict, Tuple
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+DROP_REPORT_INTERVAL = 10.0  # сек между сообщениями о потерянных записях
+SAMPLE_WINDOW = 60.0         # сек, окно счётчиков выборки
+SAMPLE_MAX_KEYS = 10_000     # досрочный сброс окна при стольких шаблонах
+
+# Атрибуты LogRecord, которые не считаются пользовательскими extra
+_RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "sample"}
+
+
+class BoundedQueueHandler(QueueHandler):
+    """QueueHandler без ожидания: при переполнении запись отбрасывается."""
+
+    def __init__(self, maxsize: int):
+        super().__init__(queue.Queue(maxsize))
+        self.dropped = 0
+        self._dropped_reported = 0
+        self._last_report = 0.0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # В отличие от QueueHandler.prepare, здесь не вызывается format():
+        # время и итоговая строка собираются в потоке-слушателе
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return
+        if self.dropped != self._dropped_reported:
+            # О потерях сообщаем при успешной записи, не чаще DROP_REPORT_INTERVAL
+            now = time.monotonic()
+            if now - self._last_report < DROP_REPORT_INTERVAL:
+                return
+            self._last_report = now
+            lost = self.dropped - self._dropped_reported
+            self._dropped_reported = self.dropped
+            note = logging.makeLogRecord({
+                "name": __name__, "levelno": logging.WARNING, "levelname": "WARNING",
+                "msg": f"⚠️ Очередь логов переполнена, потеряно записей: {lost}",
+            })
+            try:
+                self.queue.put_nowait(note)
+            except queue.Full:
+                pass
+
+
+class SamplingFilter(logging.Filter):
+    """Оставляет 1 из N записей уровня INFO и ниже."""
+
+    def __init__(self, rates: Dict[str, int]):
+        super().__init__()
+        self.rates = {name: n for name, n in rates.items() if n > 1}
+        self._seen: Dict[Tuple[str, object], int] = {}
+        self._window_start = time.monotonic()
+        self._lock = threading.Lock()
+        self.sampled_out = 0
+
+    def _rate(self, record: logging.LogRecord) -> int:
+        rate = getattr(record, "sample", None)
+        if rate is not None:
+            return rate
+        name = record.name
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition(".")[0]
+        return 1
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO:
+            return True
+        rate = self._rate(record)
+        if rate <= 1:
+            return True
+        key = (record.name, record.msg)  # шаблон до подстановки аргументов
+        with self._lock:
+            now = time.monotonic()
+            if now - self._window_start >= SAMPLE_WINDOW or len(self._seen) >= SAMPLE_MAX_KEYS:
+                self._seen.clear()
+                self._window_start = now
+            seen = self._seen.get(key, 0)
+            self._seen[key] = seen + 1
+        if seen % rate:
+            self.sampled_out += 1
+            return False
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись — одна строка JSON."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and not key.startswith("_"):
+                data[key] = value
+        if record.exc_text:
+            data["exc"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
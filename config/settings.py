@@ -1,15 +1,19 @@
 """
 config/settings.py — Конфигурация VK Workspace бота.
 """
+import atexit
 import os
 import sys
 import logging
+from logging.handlers import QueueListener, RotatingFileHandler
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Optional
 
 from pydantic import Field, field_validator
 from pydantic_settings import BaseSettings
 
+from .log_handlers import TEXT_FORMAT, BoundedQueueHandler, JsonFormatter, SamplingFilter
+
 
 class Settings(BaseSettings):
     # === КРИТИЧЕСКИЕ ПАРАМЕТРЫ ===
@@ -48,10 +52,89 @@ class Settings(BaseSettings):
         "prof", "oko", "informatika", "kadry", "bezopasnost", "upravlenie"
     ]
 
+    # === АДМИНИСТРАТОРЫ ===
+    # userId через запятую (переменная ADMIN_IDS)
+    admin_ids: str = Field(default="")
+
     answers_show_time: int = 60   # секунд до удаления ответов
+    store_answers: bool = True    # сохранять поответные данные (test_answers)
+
+    # === СЕРТИФИКАТЫ ===
+    cert_workers: int = 2              # процессов рендера; 0 — рендер в потоке
+    cert_queue_size: int = 16          # одновременных рендеров (остальные ждут)
+    cert_queue_timeout: float = 10.0   # сек ожидания места в очереди
+    cert_render_timeout: float = 30.0  # сек на один рендер
+    cert_cache_max_mb: int = 200       # объём дискового кэша готовых PDF
+    cert_prerender: str = "passing"    # рендер заранее: off | passing | always | idle
+    cert_prerender_max: int = 4        # одновременных упреждающих рендеров
+    cert_prerender_keep: int = 1000    # невостребованных упреждающих сертификатов
+    cert_qr: bool = True               # QR-код с серийным номером на сертификате
+    # Ссылка проверки в QR, например https://bot.example.ru/verify/{serial};
+    # пусто — в QR только серийный номер
+    cert_verify_url: str = ""
+    verify_cache_size: int = 50_000    # записей реестра в памяти (/verify)
+
+    # === НАПОМИНАНИЯ ===
+    reminder_inactive_days: int = 7     # порог неактивности
+    reminder_schedule: str = "0 9 * * 1-5"      # cron: по будням в 09:00
+    reminder_quiet_hours: str = "20:00-09:00"   # пауза рассылки (местное время)
+    reminder_rate: float = 20.0         # сообщений в секунду
+    reminder_concurrency: int = 8       # одновременных запросов к API
+
+    scheduler_timezone: str = "Europe/Moscow"
+
+    # === ОГРАНИЧЕНИЕ ЧАСТОТЫ («N/сек», пусто — без лимита) ===
+    ratelimit_user_message: str = "3/1"
+    ratelimit_user_callback: str = "3/1"
+    # Лимиты чата и бота отбрасывают и чужие ответы на тест — включать
+    # только для защиты от флуда, с запасом над пиковой нагрузкой
+    ratelimit_chat_message: str = ""
+    ratelimit_chat_callback: str = ""
+    ratelimit_global_message: str = ""
+    ratelimit_global_callback: str = ""
+
+    # === HTTP (проверка сертификатов, метрики) ===
+    http_enabled: bool = False
+    http_host: str = "127.0.0.1"
+    http_port: int = 8080
+    http_metrics: bool = True             # GET /metrics (Prometheus)
+    http_profile: bool = True             # POST /profile (только с localhost)
+
+    # === КОНТРОЛЬ ЦИКЛА СОБЫТИЙ ===
+    watchdog_enabled: bool = True
+    watchdog_interval: float = 0.1         # сек между пульсами
+    watchdog_threshold: float = 0.25       # остановка цикла дольше — снимаем стек
+    watchdog_report_interval: float = 300  # одинаковый стек — не чаще раза в N сек
+    asyncio_debug: bool = False            # staging: отладочный режим asyncio
+    asyncio_slow_callback: float = 0.1     # порог «медленного шага» в режиме отладки
+
+    # === ТРАССИРОВКА (см. library/tracing.py) ===
+    trace_enabled: bool = True
+    trace_slow_ms: float = 1000            # трассы дольше — всегда в logs/traces.jsonl
+    trace_sample_rate: float = 0.0         # доля остальных трасс (0..1)
+    trace_max_mb: int = 50                 # ротация файла трасс
+
+    # === ПРОФИЛИРОВАНИЕ (/profile, POST /profile; см. library/profiler.py) ===
+    profile_default_seconds: int = 30
+    profile_max_seconds: int = 120
+    profile_sample_interval: float = 0.005  # сек между снимками стека (sample)
+    profile_keep: int = 20                  # замеров в logs/profiles
+
+    # === ПРОЦЕНТИЛЬНЫЙ РАНГ ===
+    percentile_period: str = "all"        # "all" или "month"
+    percentile_min_samples: int = 10      # минимум чужих результатов для ранга
+    percentile_reconcile_minutes: int = 60
     log_level: str = "INFO"
     use_file_logging: bool = True
 
+    # === ЛОГИРОВАНИЕ (см. config/log_handlers.py) ===
+    log_format: str = "text"               # "text" или "json" (JSON Lines)
+    log_max_mb: int = 20                   # ротация файла по размеру
+    log_backup_count: int = 5
+    log_queue_size: int = 10000            # переполнение — записи отбрасываются
+    # Выборка INFO: логгер → оставлять 1 из N, например {"library.core": 10}
+    log_sampling: Dict[str, int] = {}
+
     model_config = {"case_sensitive": False}
 
     @field_validator("api_token", mode="before")
@@ -72,28 +155,72 @@ class Settings(BaseSettings):
     def validate_environment(cls, v):
         return (v or os.getenv("ENVIRONMENT", "production")).lower()
 
+    @property
+    def admin_id_set(self) -> set[str]:
+        return {x.strip() for x in self.admin_ids.split(",") if x.strip()}
+
 
 settings = Settings()
 logger = logging.getLogger(__name__)
 
 
+# Обработчик очереди корневого логгера (счётчики dropped / sampled_out)
+log_queue_handler: Optional[BoundedQueueHandler] = None
+_log_listener: Optional[QueueListener] = None
+
+
 def setup_logging():
+    """
+    Корневой логгер → ограниченная очередь → поток QueueListener →
+    stdout и (если use_file_logging) файл с ротацией по размеру.
+    """
+    global log_queue_handler, _log_listener
     log_level = getattr(logging, settings.log_level.upper(), logging.INFO)
-    logging.basicConfig(
-        level=log_level,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        handlers=[logging.StreamHandler(sys.stdout)]
-    )
+    if settings.log_format == "json":
+        formatter: logging.Formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(TEXT_FORMAT)
+
+    handlers = [logging.StreamHandler(sys.stdout)]
     if settings.use_file_logging:
         try:
             settings.logs_dir.mkdir(parents=True, exist_ok=True)
-            fh = logging.FileHandler(settings.logs_dir / "bot.log", encoding="utf-8")
-            fh.setFormatter(logging.Formatter(
-                "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+            name = "bot.jsonl" if settings.log_format == "json" else "bot.log"
+            handlers.append(RotatingFileHandler(
+                settings.logs_dir / name, encoding="utf-8",
+                maxBytes=settings.log_max_mb * 1024 * 1024,
+                backupCount=settings.log_backup_count
             ))
-            logging.getLogger().addHandler(fh)
         except OSError as e:
-            logger.warning(f"⚠️ Файловое логирование недоступно: {e}")
+            print(f"⚠️ Файловое логирование недоступно: {e}", file=sys.stderr)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    if _log_listener is not None:
+        _log_listener.stop()
+    log_queue_handler = BoundedQueueHandler(settings.log_queue_size)
+    log_queue_handler.addFilter(SamplingFilter(settings.log_sampling))
+    root = logging.getLogger()
+    root.setLevel(log_level)
+    root.handlers[:] = [log_queue_handler]
+
+    _log_listener = QueueListener(log_queue_handler.queue, *handlers)
+    _log_listener.start()
+    atexit.register(_log_listener.stop)
+
+
+def log_stats() -> Dict[str, int]:
+    """Счётчики очереди логов (для метрик)."""
+    if log_queue_handler is None:
+        return {}
+    sampler = next(
+        (f for f in log_queue_handler.filters if isinstance(f, SamplingFilter)), None
+    )
+    return {
+        "queued": log_queue_handler.queue.qsize(),
+        "dropped": log_queue_handler.dropped,
+        "sampled_out": sampler.sampled_out if sampler else 0,
+    }
 
 
 def ensure_dirs():
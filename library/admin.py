@@ -0,0 +1,334 @@
+"""
+library/admin.py — Команды администраторов.
+Доступны только пользователям из settings.admin_ids.
+"""
+import csv
+import io
+import logging
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from vk_bot.bot import VKBot
+    from vk_bot.types import VKMessage
+
+from config.settings import settings
+from .bulk_certs import export_certificates
+from .enum import Difficulty
+from .export import FORMATS, export_results, parse_filter_args, split_command_args
+from .item_analysis import analyze_bank
+from .metrics import latency
+from .profiler import MODES, OVERHEAD, parse_args as parse_profile_args, profiler
+from .rollups import GRAINS, period_for
+from .stats import stats_manager
+
+logger = logging.getLogger(__name__)
+
+# Пороги, при которых вопрос попадает в список «проблемных»
+P_TOO_HARD = 0.2
+P_TOO_EASY = 0.95
+LOW_DISCRIMINATION = 0.1
+MAX_FLAGGED_SHOWN = 15
+
+
+def is_admin(user_id: str) -> bool:
+    return user_id in settings.admin_id_set
+
+
+def _mask_to_str(mask: int) -> str:
+    return ",".join(str(bit + 1) for bit in range(8) if mask >> bit & 1)
+
+
+async def handle_items_cmd(bot: "VKBot", message: "VKMessage", user_id: str):
+    """/items <специализация> [уровень] — анализ качества вопросов банка."""
+    args = (message.text or "").split()[1:]
+    if not args or args[0] not in settings.specializations:
+        await bot.send_text(
+            message.chat.chatId,
+            "Использование: /items &lt;специализация&gt; [уровень]\n"
+            f"Специализации: {', '.join(settings.specializations)}"
+        )
+        return
+    specialization = args[0]
+    try:
+        difficulty = Difficulty(args[1].lower()) if len(args) > 1 else Difficulty.BASIC
+    except ValueError:
+        await bot.send_text(message.chat.chatId, "❌ Неверный уровень сложности")
+        return
+
+    try:
+        bank_version, acc = await analyze_bank(specialization, difficulty)
+    except Exception as e:
+        logger.error(f"❌ Ошибка анализа вопросов: {e}", exc_info=True)
+        await bot.send_text(message.chat.chatId, "❌ Ошибка анализа вопросов")
+        return
+
+    if acc is None or acc.tests == 0:
+        await bot.send_text(message.chat.chatId, "ℹ️ Нет данных по этому банку вопросов")
+        return
+
+    items = acc.results()
+    flagged = [
+        it for it in items
+        if it.p_value < P_TOO_HARD or it.p_value > P_TOO_EASY
+        or it.discrimination < LOW_DISCRIMINATION
+    ]
+    flagged.sort(key=lambda it: it.discrimination)
+
+    avg_p = sum(it.p_value for it in items) / len(items)
+    text = (
+        f"📐 <b>Анализ вопросов: {specialization}</b> ({difficulty.value})\n"
+        f"Версия банка: {bank_version}\n"
+        f"Тестов: {acc.tests}, вопросов: {len(items)}\n"
+        f"Средняя трудность (p): {avg_p:.2f}\n\n"
+        f"<b>Проблемные вопросы ({len(flagged)}):</b>\n"
+    )
+    for it in flagged[:MAX_FLAGGED_SHOWN]:
+        text += (
+            f"• #{it.question_id}: p={it.p_value:.2f}, "
+            f"r={it.discrimination:.2f}, n={it.attempts}\n"
+        )
+    if not flagged:
+        text += "нет\n"
+
+    # Полная таблица — CSV-файлом
+    buf = io.StringIO()
+    writer = csv.writer(buf, delimiter=";")
+    writer.writerow(
+        ["question_id", "attempts", "p_value", "discrimination", "avg_time_s", "correct"]
+        + [f"opt{i}_rate" for i in range(1, 7)]
+        + [f"opt{i}_score" for i in range(1, 7)]
+    )
+    for it in items:
+        writer.writerow(
+            [it.question_id, it.attempts, f"{it.p_value:.4f}",
+             f"{it.discrimination:.4f}", f"{it.avg_time:.1f}",
+             _mask_to_str(it.correct_mask)]
+            + it.option_rates + it.option_scores
+        )
+
+    await bot.send_text(message.chat.chatId, text)
+    await bot.send_file(
+        message.chat.chatId,
+        buf.getvalue().encode("utf-8-sig"),
+        filename=f"items_{specialization}_{bank_version}.csv"
+    )
+
+
+GRAIN_LABELS = {"day": "день", "week": "неделя", "month": "месяц"}
+
+
+async def handle_top_cmd(bot: "VKBot", message: "VKMessage", user_id: str):
+    """
+    /top [day|week|month] [специализация] [уровень] — рейтинг подразделений.
+    Читает только агрегаты results_rollup.
+    """
+    args = (message.text or "").split()[1:]
+    grain = "week"
+    specialization = None
+    difficulty = None
+    for arg in args:
+        low = arg.lower()
+        if low in GRAINS:
+            grain = low
+        elif low in settings.specializations:
+            specialization = low
+        else:
+            try:
+                difficulty = Difficulty(low).value
+            except ValueError:
+                await bot.send_text(
+                    message.chat.chatId,
+                    "Использование: /top [day|week|month] [специализация] [уровень]"
+                )
+                return
+
+    period = period_for(grain)
+    rows = await stats_manager.get_leaderboard(
+        grain, period, specialization=specialization, difficulty=difficulty
+    )
+    title = f"🏆 <b>Рейтинг подразделений</b> ({GRAIN_LABELS[grain]} {period})"
+    if specialization:
+        title += f"\n📚 {specialization}"
+    if difficulty:
+        title += f", {difficulty}"
+    if not rows:
+        await bot.send_text(message.chat.chatId, f"{title}\n\nНет результатов за период")
+        return
+
+    lines = [title, ""]
+    for place, r in enumerate(rows, 1):
+        lines.append(
+            f"{place}. {r['name']} — {r['avg_percentage']:.1f}% "
+            f"(тестов: {r['tests']}, сдали: {r['passed']}, "
+            f"лучший: {r['best_percentage']:.1f}%)"
+        )
+    await bot.send_text(message.chat.chatId, "\n".join(lines))
+
+
+EXPORT_USAGE = (
+    "Использование: /export [csv|xlsx] [disk] "
+    "[from=ГГГГ-ММ-ДД] [to=ГГГГ-ММ-ДД] [dept=\"подразделение\"] [spec=специализация]\n"
+    "disk — только сохранить файл на сервере, не отправлять в чат"
+)
+
+
+async def handle_export_cmd(bot: "VKBot", message: "VKMessage", user_id: str):
+    """/export — потоковая выгрузка test_results в CSV.gz или XLSX."""
+    try:
+        filters, rest = parse_filter_args(split_command_args(message.text or ""))
+    except ValueError as e:
+        await bot.send_text(message.chat.chatId, f"❌ {e}\n\n{EXPORT_USAGE}")
+        return
+    fmt = "csv"
+    to_disk = False
+    for arg in rest:
+        low = arg.lower()
+        if low in FORMATS:
+            fmt = low
+        elif low == "disk":
+            to_disk = True
+        else:
+            await bot.send_text(message.chat.chatId, EXPORT_USAGE)
+            return
+
+    await bot.send_text(message.chat.chatId, "⏳ Выгрузка запущена...")
+    try:
+        result = await export_results(filters, fmt)
+    except RuntimeError as e:
+        await bot.send_text(message.chat.chatId, f"❌ {e}")
+        return
+
+    summary = (
+        f"📤 Выгрузка готова: {result.rows} строк, "
+        f"{result.path.stat().st_size / 1e6:.1f} МБ, {result.seconds:.1f} с"
+    )
+    if to_disk:
+        await bot.send_text(message.chat.chatId, f"{summary}\n💾 {result.path}")
+    else:
+        await bot.send_file_path(message.chat.chatId, result.path, caption=summary)
+
+
+CERTS_USAGE = (
+    "Использование: /certs [disk] "
+    "[dept=\"подразделение\"] [spec=специализация] [from=ГГГГ-ММ-ДД] [to=ГГГГ-ММ-ДД]\n"
+    "Нужен хотя бы один фильтр. disk — только сохранить архив на сервере"
+)
+
+
+async def handle_certs_cmd(bot: "VKBot", message: "VKMessage", user_id: str):
+    """/certs — ZIP с сертификатами по подразделению / специализации / датам."""
+    chat_id = message.chat.chatId
+    try:
+        filters, rest = parse_filter_args(split_command_args(message.text or ""))
+    except ValueError as e:
+        await bot.send_text(chat_id, f"❌ {e}\n\n{CERTS_USAGE}")
+        return
+    to_disk = [a.lower() for a in rest] == ["disk"]
+    if (rest and not to_disk) or not any(vars(filters).values()):
+        await bot.send_text(chat_id, CERTS_USAGE)
+        return
+
+    resp = await bot.send_text(chat_id, "⏳ Генерация сертификатов...")
+    msg_id = str((resp or {}).get("msgId", ""))
+
+    async def progress(done: int, total: int):
+        if msg_id:
+            await bot.edit_text(chat_id, msg_id, f"⏳ Сертификаты: {done} из {total}...")
+
+    result = await export_certificates(filters, progress=progress)
+    if result.total == 0:
+        result.path.unlink(missing_ok=True)
+        await bot.send_text(chat_id, "ℹ️ Нет результатов по заданным фильтрам")
+        return
+
+    summary = (
+        f"📦 Сертификаты готовы: {result.rendered} из {result.total}, "
+        f"{result.path.stat().st_size / 1e6:.1f} МБ, {result.seconds:.1f} с "
+        f"({result.per_second:.1f} шт/с)"
+    )
+    if result.failed:
+        summary += f"\n⚠️ Не удалось сгенерировать: {result.failed}"
+    if msg_id:
+        await bot.edit_text(chat_id, msg_id, summary)
+    if to_disk:
+        await bot.send_text(chat_id, f"💾 {result.path}")
+    else:
+        await bot.send_file_path(chat_id, result.path, caption=summary)
+
+
+LATENCY_FAMILIES = {"handler": "Обработчики", "api": "Вызовы Bot API"}
+MAX_LATENCY_ROWS = 12
+
+
+def _ms(seconds: float) -> str:
+    return f"{seconds * 1000:.0f}" if seconds >= 0.01 else f"{seconds * 1000:.1f}"
+
+
+async def handle_latency_cmd(bot: "VKBot", message: "VKMessage", user_id: str):
+    """/latency [reset] — задержки по маршрутам и методам API (мс), худшие по p99."""
+    args = (message.text or "").split()[1:]
+    if [a.lower() for a in args] == ["reset"]:
+        latency.reset()
+        await bot.send_text(message.chat.chatId, "🧹 Гистограммы задержек сброшены")
+        return
+
+    lines = ["⏱ <b>Задержки, мс</b> (p50 / p99 / max)"]
+    for family, title in LATENCY_FAMILIES.items():
+        hists = sorted(
+            latency.family(family).items(),
+            key=lambda item: item[1].quantile(0.99), reverse=True
+        )
+        if not hists:
+            continue
+        lines += ["", f"<b>{title}:</b>"]
+        for name, h in hists[:MAX_LATENCY_ROWS]:
+            line = (
+                f"• {name}: {_ms(h.quantile(0.5))} / {_ms(h.quantile(0.99))} / "
+                f"{_ms(h.max_us / 1e6)} (n={h.count})"
+            )
+            errors = latency.errors.get((family, name), 0)
+            if errors:
+                line += f", ошибок: {errors}"
+            lines.append(line)
+    if len(lines) == 1:
+        lines.append("\nНет данных")
+    await bot.send_text(message.chat.chatId, "\n".join(lines))
+
+
+PROFILE_USAGE = (
+    f"Использование: /profile [{'|'.join(MODES)}] [секунд]\n"
+    f"По умолчанию sample на {settings.profile_default_seconds} с, "
+    f"не дольше {settings.profile_max_seconds} с"
+)
+
+
+async def handle_profile_cmd(bot: "VKBot", message: "VKMessage", user_id: str):
+    """/profile [режим] [секунд] — профилирование работающего бота."""
+    chat_id = message.chat.chatId
+    try:
+        mode, seconds = parse_profile_args((message.text or "").split()[1:])
+    except ValueError as e:
+        await bot.send_text(chat_id, f"❌ {e}\n\n{PROFILE_USAGE}")
+        return
+    if profiler.running:
+        await bot.send_text(chat_id, f"❌ Уже идёт профилирование ({profiler.running})")
+        return
+
+    await bot.send_text(chat_id, f"⏳ Профилирование {mode} на {seconds} с\n⚠️ {OVERHEAD[mode]}")
+    try:
+        result = await profiler.run(mode, seconds)
+    except RuntimeError as e:
+        await bot.send_text(chat_id, f"❌ {e}")
+        return
+    logger.info("🔬 /profile %s %s с от %s", mode, seconds, user_id)
+    await bot.send_file_path(chat_id, result.path, caption=f"🔬 {mode}, {seconds} с\n{result.summary}")
+
+
+ADMIN_COMMANDS = {
+    "/items": handle_items_cmd,
+    "/top":   handle_top_cmd,
+    "/export": handle_export_cmd,
+    "/certs": handle_certs_cmd,
+    "/latency": handle_latency_cmd,
+    "/profile": handle_profile_cmd,
+}
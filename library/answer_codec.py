@@ -0,0 +1,83 @@
+"""
+library/answer_codec.py — Компактная упаковка ответов теста в BLOB.
+
+Формат (little-endian):
+    1 байт  — версия формата;
+    далее по 6 байт на вопрос: question_id (uint16), выбранные варианты
+    (uint8, битовая маска), правильные варианты (uint8, битовая маска),
+    время на вопрос (uint16, десятые доли секунды).
+
+Маски хранятся в ИСХОДНОМ порядке вариантов из JSON (до перемешивания),
+поэтому ответы разных пользователей сопоставимы без перестановок.
+Тест из 50 вопросов занимает 301 байт. Число вариантов ограничено
+моделью Question (MAX_OPTIONS); при импорте проверяется, что оно
+помещается в разрядность масок.
+"""
+import struct
+from typing import List, NamedTuple, Optional, Set
+
+from .models import CurrentTestState, Question
+
+FORMAT_VERSION = 1
+RECORD = struct.Struct("<HBBH")
+RECORD_SIZE = RECORD.size
+HEADER_SIZE = 1
+MASK_BITS = 8  # разрядность масок (uint8)
+
+# Наибольшее число вариантов вопроса — из ограничения модели Question
+MAX_OPTIONS = next(
+    m.max_length for m in Question.model_fields["options"].metadata
+    if getattr(m, "max_length", None) is not None
+)
+assert MAX_OPTIONS <= MASK_BITS, "варианты вопроса не помещаются в маску ответа"
+
+_MAX_TIME_DS = 0xFFFF
+
+
+class AnswerRecord(NamedTuple):
+    question_id: int
+    chosen_mask: int
+    correct_mask: int
+    time_ds: int  # десятые доли секунды
+
+
+def _original_mask(question: Question, positions: Set[int]) -> int:
+    """Позиции 1..N в перемешанном порядке → битовая маска исходных вариантов."""
+    mapping = question.shuffle_mapping
+    mask = 0
+    for pos in positions:
+        orig = mapping[pos - 1] if mapping else pos - 1
+        mask |= 1 << orig
+    return mask
+
+
+def encode_answers(test_state: CurrentTestState) -> bytes:
+    """Упаковывает ответы теста в BLOB."""
+    buf = bytearray(HEADER_SIZE + RECORD_SIZE * len(test_state.questions))
+    buf[0] = FORMAT_VERSION
+    offset = HEADER_SIZE
+    for idx, question in enumerate(test_state.questions):
+        qid = question.question_id if question.question_id is not None else idx
+        chosen = _original_mask(question, test_state.answers_history.get(idx, set()))
+        correct = _original_mask(question, question.correct_answers)
+        time_ds = min(int(test_state.answer_times.get(idx, 0.0) * 10), _MAX_TIME_DS)
+        RECORD.pack_into(buf, offset, qid, chosen, correct, time_ds)
+        offset += RECORD_SIZE
+    return bytes(buf)
+
+
+def decode_answers(blob: bytes) -> List[AnswerRecord]:
+    """Распаковывает BLOB обратно в список записей."""
+    if not blob:
+        return []
+    if blob[0] != FORMAT_VERSION:
+        raise ValueError(f"Неизвестная версия формата ответов: {blob[0]}")
+    return [AnswerRecord(*rec) for rec in RECORD.iter_unpack(blob[HEADER_SIZE:])]
+
+
+def bank_version_of(test_state: CurrentTestState) -> Optional[str]:
+    """Версия банка вопросов, из которого собран тест."""
+    for question in test_state.questions:
+        if question.bank_version:
+            return question.bank_version
+    return None
@@ -0,0 +1,137 @@
+"""
+library/bulk_certs.py — Массовая выгрузка сертификатов в ZIP.
+
+Результаты читаются страницами (StatsManager.iter_results), PDF
+рендерятся параллельно в пуле cert_pool и по мере готовности
+дописываются в архив на диске. В памяти одновременно находится не
+больше BULK_WINDOW сертификатов, поэтому объём выгрузки ограничен
+только диском.
+"""
+import asyncio
+import logging
+import re
+import time
+import zipfile
+from collections import deque
+from dataclasses import dataclass, fields
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from config.settings import settings
+from .certificates import cert_pool, issued_date, qr_payload
+from .export import ExportFilters, export_path
+from .stats import stats_manager, RESULT_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 500
+PROGRESS_INTERVAL = 5.0  # сек между сообщениями о ходе выгрузки
+
+# Не занимаем весь пул: часть мест остаётся для запросов пользователей
+BULK_WINDOW = max(settings.cert_workers, 1) * 2
+
+ProgressCallback = Callable[[int, int], Awaitable[None]]
+
+_UNSAFE_CHARS = re.compile(r'[\\/:*?"<>|\s]+')
+
+
+@dataclass
+class BulkResult:
+    path: Path
+    total: int
+    rendered: int
+    failed: int
+    seconds: float
+
+    @property
+    def per_second(self) -> float:
+        return self.rendered / self.seconds if self.seconds else 0.0
+
+
+def fields_from_row(row: Tuple, serial: str = "") -> Dict[str, Any]:
+    """Поля сертификата (как certificate_fields) из строки test_results."""
+    r = dict(zip(RESULT_COLUMNS, row))
+    return {
+        "user_id": r["user_id"],
+        "full_name": r["full_name"] or "",
+        "position": r["position"] or "",
+        "department": r["department"] or "",
+        "specialization": r["specialization"],
+        "difficulty": r["difficulty"],
+        "grade": r["grade"],
+        "correct_count": r["correct_count"],
+        "total_questions": r["total_questions"],
+        "percentage": r["percentage"],
+        "elapsed_time": r["elapsed_time"],
+        "issued": issued_date(r["created_at"]) if r["created_at"] else "",
+        "serial": serial,
+        "qr": qr_payload(serial),
+    }
+
+
+def _entry_name(result_id: int, f: Dict[str, Any]) -> str:
+    name = _UNSAFE_CHARS.sub("_", f["full_name"]).strip("_") or f["user_id"]
+    return f"{result_id}_{name}_{f['specialization']}.pdf"
+
+
+async def export_certificates(
+    filters: ExportFilters,
+    path: Optional[Path] = None,
+    progress: Optional[ProgressCallback] = None
+) -> BulkResult:
+    """
+    Рендерит сертификаты по фильтрам в ZIP.
+    PDF уже сжаты внутри, поэтому архив пишется без сжатия (ZIP_STORED).
+    """
+    query = {f.name: getattr(filters, f.name) for f in fields(filters)}
+    total = await stats_manager.count_results(**query)
+    path = path or export_path("certificates", ".zip")
+    started = time.perf_counter()
+    rendered = failed = 0
+    last_report = started
+    inflight: deque = deque()
+
+    zf = zipfile.ZipFile(path, "w", compression=zipfile.ZIP_STORED)
+
+    async def collect():
+        nonlocal rendered, failed, last_report
+        name, job = inflight.popleft()
+        try:
+            pdf = await job
+        except Exception as e:
+            failed += 1
+            logger.warning(f"⚠️ Сертификат {name} не сгенерирован: {e}")
+            return
+        await asyncio.to_thread(zf.writestr, name, pdf)
+        rendered += 1
+        now = time.perf_counter()
+        if progress and now - last_report >= PROGRESS_INTERVAL:
+            last_report = now
+            await progress(rendered + failed, total)
+
+    try:
+        async for rows in stats_manager.iter_results(**query, page_size=PAGE_SIZE):
+            serials = await stats_manager.ensure_serials([row[0] for row in rows])
+            for row in rows:
+                f = fields_from_row(row, serials[row[0]])
+                job = asyncio.ensure_future(cert_pool.render(f))
+                inflight.append((_entry_name(row[0], f), job))
+                if len(inflight) >= BULK_WINDOW:
+                    await collect()
+        while inflight:
+            await collect()
+    except BaseException:
+        for _, job in inflight:
+            job.cancel()
+        zf.close()
+        path.unlink(missing_ok=True)
+        raise
+    await asyncio.to_thread(zf.close)
+
+    result = BulkResult(path, total, rendered, failed, time.perf_counter() - started)
+    logger.info(
+        f"📦 Сертификаты {path.name}: {rendered} из {total} за {result.seconds:.1f}s "
+        f"({result.per_second:.1f} шт/с, {path.stat().st_size / 1e6:.1f} МБ), "
+        f"ошибок {failed}"
+    )
+    return result
@@ -0,0 +1,283 @@
+"""
+library/cert_cache.py — Кэш готовых сертификатов.
+
+Ключ — sha256 от полей сертификата и версии шаблона: одинаковые поля
+дают одинаковый PDF, поэтому повторный запрос не рендерит его заново.
+PDF хранятся в data_dir/cert_cache, общий объём ограничен
+(вытесняются давно не использованные, LRU). Рядом с PDF сохраняется
+fileId, который вернул API при первой загрузке: повторная отправка
+идёт по ссылке, без передачи байтов. Файл, который сейчас отправляется,
+закреплён (pin) и не вытесняется до конца загрузки.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import weakref
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from vk_bot.bot import VKBot
+
+from config.settings import settings
+from .certificates import TEMPLATE_VERSION, cert_pool
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = settings.data_dir / "cert_cache"
+
+
+def cache_key(fields: Dict[str, Any]) -> str:
+    """Ключ по каноническому JSON полей и версии шаблона."""
+    canonical = json.dumps(fields, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{TEMPLATE_VERSION}\n{canonical}".encode("utf-8")).hexdigest()
+
+
+class CertificateCache:
+    """
+    Дисковый LRU-кэш PDF: <key>.pdf и <key>.id (fileId после загрузки).
+    Индекс (ключ → размер) держится в памяти и восстанавливается
+    сканированием каталога (в потоке) при первом обращении.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._file_ids: Dict[str, str] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._upload_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = (
+            weakref.WeakValueDictionary()
+        )
+        self._pins: Counter = Counter()
+        self._loaded = False
+        self._load_lock = asyncio.Lock()
+        self.total_bytes = 0
+
+        # Метрики
+        self.hits = 0
+        self.misses = 0
+        self.reused_uploads = 0
+        self.evicted = 0
+
+    # ------------------------------------------------------------------ #
+    # Индекс
+    # ------------------------------------------------------------------ #
+    def _pdf(self, key: str) -> Path:
+        return self.directory / f"{key}.pdf"
+
+    def _id_file(self, key: str) -> Path:
+        return self.directory / f"{key}.id"
+
+    def _scan(self) -> Tuple[List[Tuple[float, str, int]], Dict[str, str]]:
+        """Содержимое каталога; недописанные .tmp (отменённый рендер) удаляются."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for tmp in self.directory.glob("*.tmp"):
+            tmp.unlink(missing_ok=True)
+        entries = []
+        file_ids = {}
+        for path in self.directory.glob("*.pdf"):
+            st = path.stat()
+            entries.append((st.st_mtime, path.stem, st.st_size))
+            id_file = self._id_file(path.stem)
+            if id_file.exists():
+                file_ids[path.stem] = id_file.read_text().strip()
+        return sorted(entries), file_ids
+
+    async def load(self) -> None:
+        """Восстанавливает индекс по каталогу (один раз, вне цикла событий)."""
+        if self._loaded:
+            return
+        async with self._load_lock:
+            if self._loaded:
+                return
+            entries, file_ids = await asyncio.to_thread(self._scan)
+            for _, key, size in entries:
+                self._index[key] = size
+                self.total_bytes += size
+            self._file_ids.update(file_ids)
+            self._loaded = True
+        if entries:
+            logger.info(
+                f"✅ Кэш сертификатов: {len(entries)} файлов, "
+                f"{self.total_bytes / 1e6:.1f} МБ"
+            )
+        self._evict()
+
+    def _touch(self, key: str) -> None:
+        self._index.move_to_end(key)
+        try:
+            os.utime(self._pdf(key))  # порядок LRU переживает перезапуск
+        except OSError:
+            pass
+
+    def _remove(self, key: str) -> None:
+        self.total_bytes -= self._index.pop(key, 0)
+        self._file_ids.pop(key, None)
+        for path in (self._pdf(key), self._id_file(key)):
+            path.unlink(missing_ok=True)
+
+    def _evict(self) -> None:
+        """Удаляет давно не использованные файлы сверх лимита (кроме закреплённых)."""
+        if self.total_bytes <= self.max_bytes:
+            return
+        for key in list(self._index)[:-1]:  # последний добавленный остаётся
+            if self.total_bytes <= self.max_bytes:
+                break
+            if self._pins[key]:
+                continue
+            self._remove(key)
+            self.evicted += 1
+
+    @contextmanager
+    def pin(self, key: str) -> Iterator[None]:
+        """Файл ключа не вытесняется, пока его читают (отправка в API)."""
+        self._pins[key] += 1
+        try:
+            yield
+        finally:
+            self._pins[key] -= 1
+            if not self._pins[key]:
+                del self._pins[key]
+                self._evict()
+
+    # ------------------------------------------------------------------ #
+    # API
+    # ------------------------------------------------------------------ #
+    def get_path(self, key: str) -> Optional[Path]:
+        if key not in self._index:
+            return None
+        if not self._pdf(key).exists():
+            self._remove(key)
+            return None
+        self._touch(key)
+        return self._pdf(key)
+
+    def get_file_id(self, key: str) -> Optional[str]:
+        return self._file_ids.get(key) if key in self._index else None
+
+    def set_file_id(self, key: str, file_id: Optional[str]) -> None:
+        if key not in self._index:
+            return
+        if file_id:
+            self._file_ids[key] = file_id
+            self._id_file(key).write_text(file_id)
+        else:
+            self._file_ids.pop(key, None)
+            self._id_file(key).unlink(missing_ok=True)
+
+    async def put(self, key: str, pdf: bytes) -> Path:
+        await self.load()
+        path = self._pdf(key)
+        tmp = path.with_suffix(".tmp")
+        try:
+            await asyncio.to_thread(tmp.write_bytes, pdf)
+            os.replace(tmp, path)
+        except BaseException:
+            # Отмена посреди записи: поток мог ещё не закончить, поэтому
+            # оставшийся .tmp дочистит и _scan при следующем запуске
+            tmp.unlink(missing_ok=True)
+            raise
+        self.total_bytes += len(pdf) - self._index.get(key, 0)
+        self._index[key] = len(pdf)
+        self._index.move_to_end(key)
+        self._evict()
+        return path
+
+    def discard(self, key: str) -> None:
+        if key in self._index and not self._pins[key]:
+            self._remove(key)
+
+    async def get_or_render(self, fields: Dict[str, Any]) -> tuple[str, Path]:
+        """
+        Путь к PDF для полей: из кэша или после рендера в пуле.
+        Одновременные запросы одного сертификата ждут один рендер.
+        """
+        key = cache_key(fields)
+        await self.load()
+        path = self.get_path(key)
+        if path is not None:
+            self.hits += 1
+            return key, path
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.hits += 1
+            return key, await asyncio.shield(pending)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            pdf = await cert_pool.render(fields)
+            path = await self.put(key, pdf)
+            future.set_result(path)
+            return key, path
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # не ругаться, если никто больше не ждал
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def upload_lock(self, key: str) -> asyncio.Lock:
+        """Одна загрузка на ключ: остальные дождутся fileId."""
+        lock = self._upload_locks.get(key)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._upload_locks[key] = lock
+        return lock
+
+    def metrics(self) -> Dict[str, float]:
+        return {
+            "files": len(self._index),
+            "bytes": self.total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "reused_uploads": self.reused_uploads,
+            "evicted": self.evicted,
+        }
+
+
+cert_cache = CertificateCache(CACHE_DIR, settings.cert_cache_max_mb * 1024 * 1024)
+
+
+async def send_certificate(
+    bot: "VKBot",
+    chat_id: str,
+    fields: Dict[str, Any],
+    filename: str,
+    caption: str = ""
+) -> Optional[Dict]:
+    """
+    Отправляет сертификат: по fileId, если он уже загружался,
+    иначе загружает PDF из кэша (рендерит при промахе).
+    """
+    key, path = await cert_cache.get_or_render(fields)
+
+    # Закрепляем сразу, без await между получением пути и pin
+    with cert_cache.pin(key):
+        if not path.exists():
+            # Вытеснен, пока ждали чужой рендер: рендерим заново (уже закреплён)
+            key, path = await cert_cache.get_or_render(fields)
+        async with cert_cache.upload_lock(key):
+            file_id = cert_cache.get_file_id(key)
+            if file_id:
+                resp = await bot.send_file_by_id(chat_id, file_id, caption=caption)
+                if resp and resp.get("ok"):
+                    cert_cache.reused_uploads += 1
+                    return resp
+                # fileId мог устареть на стороне API — загружаем заново
+                cert_cache.set_file_id(key, None)
+
+            resp = await bot.send_file_path(chat_id, path, filename=filename, caption=caption)
+            if resp and resp.get("fileId"):
+                cert_cache.set_file_id(key, resp["fileId"])
+            return resp
@@ -0,0 +1,163 @@
+"""
+library/cert_pool.py — Пул процессов для CPU-тяжёлого рендера (PDF).
+
+Рендер reportlab полностью синхронный: выполненный в event loop, он
+задерживает обработку нажатий всех пользователей. RenderPool выносит
+его в ProcessPoolExecutor с «прогретыми» воркерами (ресурсы грузятся
+инициализатором один раз), ограничивает очередь ожидающих задач и
+время рендера, а также собирает метрики времени.
+"""
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from config.settings import settings
+from .metrics import latency
+
+logger = logging.getLogger(__name__)
+
+# Сводка метрик в лог — раз в N рендеров
+LOG_EVERY = 100
+
+
+class RenderQueueFull(Exception):
+    """Слишком много рендеров в очереди."""
+
+
+class RenderTimeout(Exception):
+    """Рендер не уложился в отведённое время."""
+
+
+def _noop() -> None:
+    return None
+
+
+class RenderPool:
+    """
+    Пул процессов для синхронной функции render_fn(payload) -> bytes.
+
+    При settings.cert_workers = 0 рендер выполняется в потоке
+    (asyncio.to_thread) — без пула процессов, но тоже вне event loop.
+    """
+
+    def __init__(
+        self,
+        render_fn: Callable[[Any], bytes],
+        initializer: Optional[Callable[[], None]] = None,
+        name: str = "render"
+    ):
+        self.render_fn = render_fn
+        self.initializer = initializer
+        self.name = name
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.pending = 0
+
+        # Метрики
+        self.rendered = 0
+        self.failed = 0
+        self.rejected = 0
+        self.render_seconds_total = 0.0
+        self.render_seconds_max = 0.0
+        self.wait_seconds_total = 0.0
+
+    # ------------------------------------------------------------------ #
+    # Lifecycle
+    # ------------------------------------------------------------------ #
+    async def start(self) -> None:
+        """Запускает воркеры и дожидается их инициализации."""
+        self._slots = asyncio.Semaphore(settings.cert_queue_size)
+        workers = settings.cert_workers
+        if workers <= 0:
+            if self.initializer:
+                await asyncio.to_thread(self.initializer)
+            logger.info(f"✅ Пул [{self.name}]: рендер в потоке (без процессов)")
+            return
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=self.initializer,
+        )
+        # Прогрев: процессы создаются и инициализируются сейчас,
+        # а не на первом запросе пользователя
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            loop.run_in_executor(self._executor, _noop) for _ in range(workers)
+        ))
+        logger.info(
+            f"✅ Пул [{self.name}]: {workers} процессов "
+            f"готовы за {time.perf_counter() - started:.1f}s"
+        )
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    # ------------------------------------------------------------------ #
+    # Render
+    # ------------------------------------------------------------------ #
+    async def render(self, payload: Any) -> bytes:
+        """Рендер вне event loop с ограничением очереди и таймаутом."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(settings.cert_queue_size)
+
+        queued = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), settings.cert_queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise RenderQueueFull(f"Очередь [{self.name}] переполнена")
+
+        self.pending += 1
+        started = time.perf_counter()
+        self.wait_seconds_total += started - queued
+        try:
+            if self._executor is not None:
+                loop = asyncio.get_running_loop()
+                job = loop.run_in_executor(self._executor, self.render_fn, payload)
+            else:
+                job = asyncio.to_thread(self.render_fn, payload)
+            try:
+                result = await asyncio.wait_for(job, settings.cert_render_timeout)
+            except asyncio.TimeoutError:
+                self.failed += 1
+                raise RenderTimeout(
+                    f"Рендер [{self.name}] дольше {settings.cert_render_timeout}s"
+                )
+            except Exception:
+                self.failed += 1
+                raise
+        finally:
+            self.pending -= 1
+            self._slots.release()
+
+        elapsed = time.perf_counter() - started
+        self.rendered += 1
+        self.render_seconds_total += elapsed
+        self.render_seconds_max = max(self.render_seconds_max, elapsed)
+        latency.observe("render", self.name, elapsed)
+        if self.rendered % LOG_EVERY == 0:
+            m = self.metrics()
+            logger.info(
+                f"📊 Пул [{self.name}]: {m['rendered']} рендеров, "
+                f"среднее {m['render_avg_ms']:.0f} ms, макс {m['render_max_ms']:.0f} ms, "
+                f"ожидание {m['wait_avg_ms']:.0f} ms, отказов {m['rejected']}"
+            )
+        return result
+
+    def metrics(self) -> Dict[str, float]:
+        done = max(self.rendered, 1)
+        return {
+            "rendered": self.rendered,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "pending": self.pending,
+            "render_avg_ms": self.render_seconds_total / done * 1000,
+            "render_max_ms": self.render_seconds_max * 1000,
+            "wait_avg_ms": self.wait_seconds_total / max(self.rendered + self.failed, 1) * 1000,
+        }
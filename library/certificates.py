@@ -1,35 +1,63 @@
 """
 library/certificates.py — Генерация PDF сертификатов ФССП.
 Корпоративный дизайн с официальным гербом.
+
+Рендер (render_certificate) — синхронный и работает с простым словарем
+полей, чтобы его можно было выполнять в пуле процессов (см. cert_pool.py).
+Всё статическое оформление собрано в CertificateTemplate, который
+строится один раз на процесс: шрифт регистрируется один раз, а герб
+заранее переводится в JPEG, который reportlab встраивает без
+перекодирования.
 """
 import io
 import logging
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
 
+from PIL import Image
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
+from reportlab.lib.utils import ImageReader
+from reportlab.graphics.barcode import qrencoder
 from reportlab.pdfgen import canvas as pdf_canvas
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 
 from config.settings import settings
 from .models import CurrentTestState
+from .cert_pool import RenderPool
 
 logger = logging.getLogger(__name__)
 
 FONT_PATH   = Path(__file__).parent / "fonts" / "DejaVuSans.ttf"
 EMBLEM_PATH = Path(__file__).parent / "static" / "fssp_emblem_opt.png"
 
+# Версия оформления: входит в ключ кэша (cert_cache.py), поднимать
+# при любом изменении внешнего вида сертификата
+TEMPLATE_VERSION = "4"
+
+BACKGROUND = "#f7fbf7"
+EMBLEM_JPEG_QUALITY = 95
+
+QR_SIZE = 60
+
+_font_name: str | None = None
+
 
 def register_fonts() -> str:
+    """Регистрирует DejaVu (один раз на процесс) и возвращает имя шрифта."""
+    global _font_name
+    if _font_name is not None:
+        return _font_name
+    _font_name = "Helvetica"
     try:
         if FONT_PATH.exists():
             pdfmetrics.registerFont(TTFont("DejaVu", str(FONT_PATH)))
-            return "DejaVu"
+            _font_name = "DejaVu"
     except Exception as e:
         logger.error(f"❌ Ошибка шрифта: {e}")
-    return "Helvetica"
+    return _font_name
 
 
 def draw_decorative_border(c, width, height):
@@ -54,59 +82,199 @@ def draw_decorative_border(c, width, height):
         c.line(x, y, x, y + dy)
 
 
-def draw_fssp_emblem(c, width, height):
-    if not EMBLEM_PATH.exists():
-        return
-    try:
-        emblem_size = 80
-        x = width / 2 - emblem_size / 2
-        y = height - 120 - emblem_size / 2
+class EmblemImage:
+    """
+    Герб, подготовленный один раз на процесс. PNG с прозрачностью
+    накладывается на цвет фона сертификата и сохраняется в JPEG:
+    JPEG-данные Canvas.drawImage встраивает в PDF как есть (DCTDecode),
+    а PNG пришлось бы заново распаковывать и сжимать в каждом документе.
+    """
+
+    def __init__(self, path: Path, background: str = BACKGROUND):
+        with Image.open(path) as src:
+            rgba = src.convert("RGBA")
+        flat = Image.new("RGB", rgba.size, background)
+        flat.paste(rgba, mask=rgba.getchannel("A"))
+        buffer = io.BytesIO()
+        flat.save(buffer, "JPEG", quality=EMBLEM_JPEG_QUALITY)
+        self._jpeg = buffer.getvalue()
+        self.width, self.height = flat.size
+
+    def draw(self, c, x: float, y: float, width: float, height: float) -> None:
         c.drawImage(
-            str(EMBLEM_PATH), x, y,
-            width=emblem_size, height=emblem_size,
-            preserveAspectRatio=True, mask="auto"
+            ImageReader(io.BytesIO(self._jpeg)), x, y, width=width, height=height,
+            preserveAspectRatio=True, anchor="c"
         )
-    except Exception as e:
-        logger.error(f"❌ Ошибка герба: {e}")
+
+
+class CertificateTemplate:
+    """Статическая часть сертификата: фон, рамки, герб, заголовок, подвал."""
+
+    def __init__(self):
+        self.font = register_fonts()
+        self.emblem: EmblemImage | None = None
+        if EMBLEM_PATH.exists():
+            try:
+                self.emblem = EmblemImage(EMBLEM_PATH)
+            except Exception as e:
+                logger.error(f"❌ Ошибка герба: {e}")
+
+    def draw_static(self, c, width, height):
+        font = self.font
+
+        # Фон
+        c.setFillColor(colors.HexColor(BACKGROUND))
+        c.rect(0, 0, width, height, fill=1, stroke=0)
+
+        draw_decorative_border(c, width, height)
+
+        if self.emblem is not None:
+            emblem_size = 80
+            self.emblem.draw(
+                c, width / 2 - emblem_size / 2, height - 120 - emblem_size / 2,
+                emblem_size, emblem_size
+            )
+
+        # Заголовок
+        c.setFont(font, 32)
+        c.setFillColor(colors.HexColor("#006400"))
+        c.drawCentredString(width / 2, height - 200, "СЕРТИФИКАТ")
+
+        c.setFont(font, 14)
+        c.setFillColor(colors.HexColor("#555555"))
+        c.drawCentredString(width / 2, height - 225, "о прохождении профессионального тестирования")
+
+        c.setStrokeColor(colors.HexColor("#d4af37"))
+        c.setLineWidth(2)
+        c.line(150, height - 240, width - 150, height - 240)
+
+        # Подвал
+        footer_y = 120
+        c.setStrokeColor(colors.HexColor("#006400"))
+        c.setLineWidth(1)
+        sw = 200
+        c.line(width / 2 - sw / 2, footer_y, width / 2 + sw / 2, footer_y)
+
+        c.setFont(font, 8)
+        c.setFillColor(colors.HexColor("#777777"))
+        c.drawCentredString(width / 2, footer_y - 15, "ФССП РОССИИ")
+        c.drawCentredString(width / 2, footer_y - 27, "Система тестирования профессиональной подготовки")
+
+        c.setFont(font, 7)
+        c.setFillColor(colors.HexColor("#bbbbbb"))
+        c.drawCentredString(width / 2, 50, "VK Workspace Bot")
+
+
+_template: CertificateTemplate | None = None
+
+
+def get_template() -> CertificateTemplate:
+    """Шаблон сертификата (строится один раз на процесс)."""
+    global _template
+    if _template is None:
+        _template = CertificateTemplate()
+    return _template
+
+
+def warm_up() -> None:
+    """Предзагрузка ресурсов рендера (инициализатор воркеров пула)."""
+    get_template()
+
+
+def qr_payload(serial: str) -> str:
+    """Содержимое QR-кода: ссылка проверки или сам номер."""
+    if not settings.cert_qr or not serial:
+        return ""
+    if settings.cert_verify_url:
+        return settings.cert_verify_url.format(serial=serial)
+    return serial
+
+
+def draw_qr(c, payload: str, x: float, y: float, size: float, border: int = 2) -> None:
+    """QR-код одним путём (без графа reportlab.graphics — он в разы медленнее)."""
+    qr = qrencoder.QRCode(None, qrencoder.QRErrorCorrectLevel.M)
+    qr.addData(payload)
+    qr.make()
+    count = qr.getModuleCount()
+    box = size / (count + border * 2)
+    path = c.beginPath()
+    for r, row in enumerate(qr.modules):
+        top = y + size - (r + border + 1) * box
+        col = 0
+        while col < count:
+            if not row[col]:
+                col += 1
+                continue
+            start = col
+            while col < count and row[col]:
+                col += 1
+            path.rect(x + (start + border) * box, top, (col - start) * box, box)
+    c.setFillColor(colors.black)
+    c.drawPath(path, stroke=0, fill=1)
+
+
+def issued_date(created_at: Optional[str]) -> str:
+    """Дата выдачи по test_results.created_at; пустая строка при неверном значении."""
+    if created_at is None:
+        return datetime.now(timezone.utc).strftime("%d.%m.%Y")
+    try:
+        return datetime.fromisoformat(created_at).strftime("%d.%m.%Y")
+    except (TypeError, ValueError):
+        return ""
+
+
+def certificate_fields(test_state: CurrentTestState, user_id: str) -> Dict[str, Any]:
+    """
+    Поля сертификата — простой словарь, передаваемый в воркер пула.
+    Поля определяют ключ кэша (cert_cache), поэтому дата выдачи берётся
+    из сохранённого результата, а не из текущего дня.
+    """
+    serial = test_state.cert_serial or ""
+    return {
+        "user_id": user_id,
+        "full_name": test_state.full_name,
+        "position": test_state.position,
+        "department": test_state.department,
+        "specialization": test_state.specialization,
+        "difficulty": test_state.difficulty.value,
+        "grade": test_state.grade,
+        "correct_count": test_state.correct_count,
+        "total_questions": test_state.total_questions,
+        "percentage": test_state.percentage,
+        "elapsed_time": test_state.elapsed_time,
+        "issued": issued_date(test_state.created_at),
+        "serial": serial,
+        "qr": qr_payload(serial),
+    }
 
 
 async def generate_certificate(
     test_state: CurrentTestState,
     user_id: str
 ) -> io.BytesIO:
-    """Генерирует PDF сертификат и возвращает BytesIO."""
-    font = register_fonts()
+    """Генерирует PDF сертификат (вне event loop) и возвращает BytesIO."""
+    pdf = await cert_pool.render(certificate_fields(test_state, user_id))
+    logger.info(f"✅ Сертификат сгенерирован для {user_id}")
+    return io.BytesIO(pdf)
+
+
+def render_certificate(f: Dict[str, Any]) -> bytes:
+    """Синхронный рендер PDF по словарю полей (см. certificate_fields)."""
+    template = get_template()
+    font = template.font
     buffer = io.BytesIO()
     c = pdf_canvas.Canvas(buffer, pagesize=A4)
     width, height = A4
 
-    # Фон
-    c.setFillColor(colors.HexColor("#f7fbf7"))
-    c.rect(0, 0, width, height, fill=1, stroke=0)
-
-    draw_decorative_border(c, width, height)
-    draw_fssp_emblem(c, width, height)
-
-    # Заголовок
-    c.setFont(font, 32)
-    c.setFillColor(colors.HexColor("#006400"))
-    c.drawCentredString(width / 2, height - 200, "СЕРТИФИКАТ")
-
-    c.setFont(font, 14)
-    c.setFillColor(colors.HexColor("#555555"))
-    c.drawCentredString(width / 2, height - 225, "о прохождении профессионального тестирования")
-
-    c.setStrokeColor(colors.HexColor("#d4af37"))
-    c.setLineWidth(2)
-    c.line(150, height - 240, width - 150, height - 240)
+    template.draw_static(c, width, height)
 
     # Данные сотрудника
     y_pos = height - 280
     left_margin = 100
     for label, value in [
-        ("ФИО:", test_state.full_name),
-        ("Должность:", test_state.position),
-        ("Подразделение:", test_state.department),
+        ("ФИО:", f["full_name"]),
+        ("Должность:", f["position"]),
+        ("Подразделение:", f["department"]),
     ]:
         c.setFont(font, 11)
         c.setFillColor(colors.HexColor("#555555"))
@@ -128,13 +296,13 @@ async def generate_certificate(
     y_pos -= 30
 
     for label, value in [
-        ("Специализация:", test_state.specialization.upper()),
-        ("Уровень сложности:", test_state.difficulty.value.capitalize()),
+        ("Специализация:", f["specialization"].upper()),
+        ("Уровень сложности:", f["difficulty"].capitalize()),
         ("", ""),
-        ("Оценка:", test_state.grade.upper()),
-        ("Правильных ответов:", f"{test_state.correct_count} из {test_state.total_questions}"),
-        ("Результат:", f"{test_state.percentage:.1f}%"),
-        ("Затрачено времени:", test_state.elapsed_time),
+        ("Оценка:", f["grade"].upper()),
+        ("Правильных ответов:", f"{f['correct_count']} из {f['total_questions']}"),
+        ("Результат:", f"{f['percentage']:.1f}%"),
+        ("Затрачено времени:", f["elapsed_time"]),
     ]:
         if label:
             c.setFont(font, 10)
@@ -153,26 +321,19 @@ async def generate_certificate(
             c.drawString(left_margin + 150, y_pos, value)
         y_pos -= 22
 
-    # Подвал
-    footer_y = 120
-    c.setStrokeColor(colors.HexColor("#006400"))
-    c.setLineWidth(1)
-    sw = 200
-    c.line(width / 2 - sw / 2, footer_y, width / 2 + sw / 2, footer_y)
-
     c.setFont(font, 8)
     c.setFillColor(colors.HexColor("#777777"))
-    c.drawCentredString(width / 2, footer_y - 15, "ФССП РОССИИ")
-    c.drawCentredString(width / 2, footer_y - 27, "Система тестирования профессиональной подготовки")
-
-    date_str = datetime.now().strftime("%d.%m.%Y")
-    c.drawString(80, 50, f"Дата выдачи: {date_str}")
-    c.drawRightString(width - 80, 50, f"ID: {user_id}")
-    c.setFont(font, 7)
-    c.setFillColor(colors.HexColor("#bbbbbb"))
-    c.drawCentredString(width / 2, 50, "VK Workspace Bot")
+    c.drawString(80, 50, f"Дата выдачи: {f['issued']}")
+    if f.get("serial"):
+        c.drawRightString(width - 80, 50, f"№ {f['serial']}")
+    else:
+        c.drawRightString(width - 80, 50, f"ID: {f['user_id']}")
+    if f.get("qr"):
+        draw_qr(c, f["qr"], width - 80 - QR_SIZE, 62, QR_SIZE)
 
     c.save()
-    buffer.seek(0)
-    logger.info(f"✅ Сертификат сгенерирован для {user_id}")
-    return buffer
+    return buffer.getvalue()
+
+
+# Глобальный пул рендера сертификатов (запускается в main)
+cert_pool = RenderPool(render_certificate, initializer=warm_up, name="certificates")
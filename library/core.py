@@ -15,9 +15,14 @@ from .keyboards import get_test_keyboard, get_finish_keyboard
 from .states import TestStates
 from .state_manager import state_manager
 from .stats import stats_manager
+from .metrics import counters
+from .prerender import prerenderer
 
 logger = logging.getLogger(__name__)
 
+# Переходы между вопросами — самое частое событие: в лог 1 из N
+QUESTION_LOG_SAMPLE = 20
+
 NUMBER_EMOJI = {1: "1️⃣", 2: "2️⃣", 3: "3️⃣", 4: "4️⃣", 5: "5️⃣", 6: "6️⃣"}
 
 
@@ -61,7 +66,7 @@ async def show_question(
         try:
             await bot.delete_message(chat_id, test_state.last_message_id)
         except Exception as e:
-            logger.debug(f"Не удалось удалить сообщение: {e}")
+            logger.debug("Не удалось удалить сообщение: %s", e)
     
     resp = await bot.send_text(chat_id, full_text, keyboard)
     if resp and resp.get("ok"):
@@ -101,7 +106,7 @@ async def handle_answer_toggle(
     try:
         await bot.edit_text(chat_id, msg_id, full_text, keyboard)
     except Exception as e:
-        logger.warning(f"⚠️ Не удалось обновить сообщение: {e}")
+        logger.warning("⚠️ Не удалось обновить сообщение: %s", e)
     
     await bot.answer_callback(query.queryId)
     await state_manager.update_data(user_id, test_state=test_state)
@@ -134,8 +139,9 @@ async def handle_next_question(
     await state_manager.update_data(user_id, test_state=test_state)
     
     logger.info(
-        f"➡️ {user_id}: вопрос "
-        f"{test_state.current_index + 1}/{len(test_state.questions)}"
+        "➡️ %s: вопрос %d/%d", user_id,
+        test_state.current_index + 1, len(test_state.questions),
+        extra={"sample": QUESTION_LOG_SAMPLE}
     )
 
 
@@ -159,10 +165,15 @@ async def finish_test(
     if test_state.timer_task:
         test_state.timer_task.stop()
     
+    if test_state.current_index < len(test_state.questions):
+        # Тест завершён таймером: открытый вопрос не прошёл через «Далее»
+        test_state.save_answer(test_state.current_index)
     test_state.calculate_results()
     
     # Сохраняем в БД
     await stats_manager.save_result(user_id, test_state)
+    counters.inc("tests_finished_total", specialization=test_state.specialization)
+    percentile = stats_manager.get_percentile(test_state)
     
     grade_emoji = {
         "отлично": "🏆", "хорошо": "👍",
@@ -182,6 +193,8 @@ async def finish_test(
         f"💯 <b>Процент:</b> {test_state.percentage:.1f}%\n"
         f"⏱ <b>Время:</b> {test_state.elapsed_time}"
     )
+    if percentile is not None:
+        result_text += f"\n\n👥 Лучше, чем <b>{percentile:.0f}%</b> коллег на этом уровне"
     
     chat_id = query.message.chat.chatId
     
@@ -196,8 +209,9 @@ async def finish_test(
     
     await state_manager.set_state(user_id, TestStates.SHOWING_RESULTS)
     await state_manager.update_data(user_id, test_state=test_state)
+    prerenderer.schedule(user_id, test_state)
     
     logger.info(
-        f"🏁 {user_id} завершил тест: "
-        f"{test_state.percentage:.1f}% ({test_state.grade})"
+        "🏁 %s завершил тест: %.1f%% (%s)",
+        user_id, test_state.percentage, test_state.grade
     )
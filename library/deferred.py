@@ -0,0 +1,218 @@
+"""
+library/deferred.py — Очередь отложенных действий с сообщениями.
+
+Отложенные удаления и правки хранятся в таблице deferred_actions и в
+куче (heapq) по времени выполнения; их выполняет один воркер. После
+перезапуска очередь читается из БД, поэтому сообщения удаляются и
+тогда, когда бот был перезапущен до истечения срока.
+Удаления одного чата, срок которых наступает почти одновременно,
+уходят одним вызовом messages/deleteMessages.
+Ответ ok=false завершает действие, только если ошибка окончательная
+(сообщение уже удалено, слишком старое и т.п.); лимит запросов и сбои
+сервера повторяются так же, как сетевые ошибки.
+"""
+import asyncio
+import heapq
+import json
+import logging
+import time
+from collections import defaultdict
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+import aiosqlite
+
+if TYPE_CHECKING:
+    from vk_bot.bot import VKBot
+
+from .stats import stats_manager
+
+logger = logging.getLogger(__name__)
+
+DELETE_BATCH = 50       # msgId в одном deleteMessages
+RETRY_DELAY = 30.0      # сек до повтора при сетевой или временной ошибке
+MAX_ATTEMPTS = 5
+# Фрагменты description ответа ok=false, после которых повтор бесполезен
+PERMANENT_ERRORS = ("not found", "too old", "not modified", "permission", "forbidden")
+# Действия, срок которых наступит в ближайшую секунду, выполняются
+# вместе с текущими — так удаления одного чата собираются в пакет
+BATCH_WINDOW = 1.0
+
+# Запись кучи: (due, id, kind, chat_id, msg_id, payload, attempts)
+Action = Tuple[float, int, str, str, str, Optional[str], int]
+
+
+def _is_final(resp: Optional[Dict]) -> bool:
+    """Ответ API завершает действие: успех или ошибка, которую повтор не исправит."""
+    if resp is None:
+        return False
+    if resp.get("ok"):
+        return True
+    description = str(resp.get("description", "")).lower()
+    return any(marker in description for marker in PERMANENT_ERRORS)
+
+
+class DeferredQueue:
+    def __init__(self):
+        self._heap: List[Action] = []
+        self._wakeup = asyncio.Event()
+        self._bot: Optional["VKBot"] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # Метрики
+        self.done = 0
+        self.dropped = 0
+        self.api_calls = 0
+
+    # ------------------------------------------------------------------ #
+    # Lifecycle
+    # ------------------------------------------------------------------ #
+    async def start(self, bot: "VKBot") -> None:
+        self._bot = bot
+        async with aiosqlite.connect(stats_manager.db_path) as db:
+            cursor = await db.execute("""
+                SELECT due, id, kind, chat_id, msg_id, payload, attempts
+                FROM deferred_actions
+            """)
+            self._heap = [tuple(row) for row in await cursor.fetchall()]
+        heapq.heapify(self._heap)
+        if self._heap:
+            logger.info(f"✅ Отложенных действий восстановлено: {len(self._heap)}")
+        self._task = asyncio.create_task(self._worker())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    # ------------------------------------------------------------------ #
+    # API
+    # ------------------------------------------------------------------ #
+    async def _add(
+        self, delay: float, kind: str, chat_id: str, msg_id: str,
+        payload: Optional[str] = None
+    ) -> None:
+        due = time.time() + delay
+        async with aiosqlite.connect(stats_manager.db_path) as db:
+            cursor = await db.execute("""
+                INSERT INTO deferred_actions (due, kind, chat_id, msg_id, payload, attempts)
+                VALUES (?, ?, ?, ?, ?, 0)
+            """, (due, kind, chat_id, msg_id, payload))
+            await db.commit()
+            action_id = cursor.lastrowid
+        heapq.heappush(self._heap, (due, action_id, kind, chat_id, msg_id, payload, 0))
+        if self._heap[0][1] == action_id:
+            self._wakeup.set()  # новое действие раньше всех остальных
+
+    async def delete_later(self, chat_id: str, msg_id: str, delay: float) -> None:
+        """Удалить сообщение через delay секунд."""
+        await self._add(delay, "delete", chat_id, msg_id)
+
+    async def edit_later(
+        self, chat_id: str, msg_id: str, delay: float, text: str,
+        inline_keyboard: Optional[list] = None
+    ) -> None:
+        """Заменить текст (и клавиатуру) сообщения через delay секунд."""
+        payload = json.dumps({"text": text, "inline_keyboard": inline_keyboard}, ensure_ascii=False)
+        await self._add(delay, "edit", chat_id, msg_id, payload)
+
+    def pending(self) -> int:
+        return len(self._heap)
+
+    # ------------------------------------------------------------------ #
+    # Worker
+    # ------------------------------------------------------------------ #
+    async def _worker(self) -> None:
+        while True:
+            try:
+                timeout = None
+                if self._heap:
+                    timeout = max(self._heap[0][0] - time.time(), 0.0)
+                if timeout is None or timeout > 0:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                horizon = time.time() + BATCH_WINDOW
+                due: List[Action] = []
+                while self._heap and self._heap[0][0] <= horizon:
+                    due.append(heapq.heappop(self._heap))
+                await self._execute(due)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Ошибка очереди отложенных действий: {e}", exc_info=True)
+                await asyncio.sleep(1)
+
+    async def _execute(self, due: List[Action]) -> None:
+        finished: List[int] = []
+        retry: List[Action] = []
+
+        deletes: Dict[str, List[Action]] = defaultdict(list)
+        for action in due:
+            if action[2] == "delete":
+                deletes[action[3]].append(action)
+            else:
+                resp = await self._edit(action)
+                self.api_calls += 1
+                if _is_final(resp):
+                    finished.append(action[1])
+                else:
+                    retry.append(action)
+
+        for chat_id, actions in deletes.items():
+            for i in range(0, len(actions), DELETE_BATCH):
+                batch = actions[i:i + DELETE_BATCH]
+                resp = await self._bot.delete_messages(chat_id, [a[4] for a in batch])
+                self.api_calls += 1
+                if _is_final(resp):
+                    finished.extend(a[1] for a in batch)
+                else:
+                    retry.extend(batch)
+
+        self.done += len(finished)
+        requeue = []
+        for due_at, action_id, kind, chat_id, msg_id, payload, attempts in retry:
+            if attempts + 1 >= MAX_ATTEMPTS:
+                finished.append(action_id)
+                self.dropped += 1
+                logger.warning(f"⚠️ Отложенное действие {kind} {chat_id}/{msg_id} отброшено")
+                continue
+            requeue.append((time.time() + RETRY_DELAY, action_id, kind, chat_id,
+                            msg_id, payload, attempts + 1))
+
+        async with aiosqlite.connect(stats_manager.db_path) as db:
+            await db.executemany(
+                "DELETE FROM deferred_actions WHERE id = ?", [(i,) for i in finished]
+            )
+            await db.executemany(
+                "UPDATE deferred_actions SET due = ?, attempts = ? WHERE id = ?",
+                [(a[0], a[6], a[1]) for a in requeue]
+            )
+            await db.commit()
+        for action in requeue:
+            heapq.heappush(self._heap, action)
+
+    async def _edit(self, action: Action) -> Optional[Dict]:
+        _, _, _, chat_id, msg_id, payload, _ = action
+        data = json.loads(payload or "{}")
+        return await self._bot.edit_text(
+            chat_id, msg_id, data.get("text", ""), data.get("inline_keyboard")
+        )
+
+    def metrics(self) -> Dict[str, int]:
+        return {
+            "pending": len(self._heap),
+            "done": self.done,
+            "dropped": self.dropped,
+            "api_calls": self.api_calls,
+        }
+
+
+deferred = DeferredQueue()
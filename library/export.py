@@ -0,0 +1,179 @@
+"""
+library/export.py — Потоковая выгрузка результатов (CSV.gz / XLSX).
+
+Строки читаются страницами (keyset по id, см. StatsManager.iter_results)
+и сразу дописываются в файл, поэтому память не зависит от объёма
+выгрузки. Запись страниц выполняется в отдельном потоке, чтобы
+сжатие не тормозило event loop.
+"""
+import asyncio
+import csv
+import gzip
+import logging
+import shlex
+import time
+from dataclasses import dataclass, fields
+from datetime import date, datetime
+from pathlib import Path
+from typing import AsyncIterator, List, Optional
+
+from config.settings import settings
+from .stats import stats_manager, RESULT_COLUMNS
+
+try:
+    from openpyxl import Workbook
+except ImportError:  # XLSX — опционально
+    Workbook = None
+
+logger = logging.getLogger(__name__)
+
+EXPORT_DIR = settings.data_dir / "exports"
+PAGE_SIZE = 2000
+
+FORMATS = ("csv", "xlsx")
+
+
+@dataclass
+class ExportFilters:
+    date_from: Optional[str] = None
+    date_to: Optional[str] = None
+    department: Optional[str] = None
+    specialization: Optional[str] = None
+
+
+@dataclass
+class ExportResult:
+    path: Path
+    rows: int
+    seconds: float
+
+
+# Синонимы ключей в командах администратора: from=…, dept=…, spec=…
+_ARG_KEYS = {
+    "from": "date_from", "to": "date_to",
+    "dept": "department", "department": "department",
+    "spec": "specialization", "specialization": "specialization",
+}
+
+
+def parse_filter_args(args: list[str]) -> tuple[ExportFilters, list[str]]:
+    """
+    Разбирает аргументы вида from=2026-01-01 dept="ОСП №1" spec=prof.
+    Возвращает фильтры и оставшиеся позиционные аргументы.
+    """
+    filters = ExportFilters()
+    rest = []
+    for arg in args:
+        key, sep, value = arg.partition("=")
+        if not sep:
+            rest.append(arg)
+            continue
+        field = _ARG_KEYS.get(key.lower())
+        if field is None:
+            raise ValueError(f"Неизвестный параметр: {key}")
+        if field in ("date_from", "date_to"):
+            date.fromisoformat(value)  # проверка формата YYYY-MM-DD
+        setattr(filters, field, value)
+    return filters, rest
+
+
+def split_command_args(text: str) -> list[str]:
+    """Аргументы команды с поддержкой кавычек: dept="ОСП №1"."""
+    try:
+        return shlex.split(text)[1:]
+    except ValueError:
+        return text.split()[1:]
+
+
+def export_path(prefix: str, suffix: str) -> Path:
+    """
+    Уникальный файл выгрузки «prefix_ГГГГММДД_ЧЧММСС[_N]suffix».
+    Имя резервируется созданием пустого файла (O_EXCL), поэтому две
+    выгрузки в одну секунду, в том числе одновременные, не пишут в один файл.
+    """
+    EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    path = EXPORT_DIR / f"{prefix}_{stamp}{suffix}"
+    n = 1
+    while True:
+        try:
+            path.touch(exist_ok=False)
+            return path
+        except FileExistsError:
+            n += 1
+            path = EXPORT_DIR / f"{prefix}_{stamp}_{n}{suffix}"
+
+
+async def _write_csv(path: Path, pages: AsyncIterator[List[tuple]]) -> int:
+    rows_total = 0
+    f = gzip.open(path, "wt", compresslevel=6, encoding="utf-8-sig", newline="")
+    try:
+        writer = csv.writer(f, delimiter=";")
+        writer.writerow(RESULT_COLUMNS)
+        async for rows in pages:
+            await asyncio.to_thread(writer.writerows, rows)
+            rows_total += len(rows)
+    except BaseException:
+        f.close()
+        raise
+    # close() дожимает и сбрасывает последний блок gzip — тоже не в цикле событий
+    await asyncio.to_thread(f.close)
+    return rows_total
+
+
+async def _write_xlsx(path: Path, pages: AsyncIterator[List[tuple]]) -> int:
+    rows_total = 0
+    # write_only: строки сбрасываются во временный XML, а не копятся в памяти
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("results")
+    ws.append(RESULT_COLUMNS)
+
+    def _append(rows):
+        for row in rows:
+            ws.append(row)
+
+    async for rows in pages:
+        await asyncio.to_thread(_append, rows)
+        rows_total += len(rows)
+    await asyncio.to_thread(wb.save, path)
+    return rows_total
+
+
+async def export_results(
+    filters: ExportFilters,
+    fmt: str = "csv",
+    path: Optional[Path] = None
+) -> ExportResult:
+    """
+    Выгружает test_results в файл.
+    CSV сжимается gzip; XLSX уже является zip-архивом и не сжимается
+    повторно (требуется openpyxl).
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Неизвестный формат: {fmt}")
+    if fmt == "xlsx" and Workbook is None:
+        raise RuntimeError("Для выгрузки XLSX установите openpyxl")
+
+    path = path or export_path("results", ".csv.gz" if fmt == "csv" else ".xlsx")
+    started = time.perf_counter()
+    pages = stats_manager.iter_results(
+        **{f.name: getattr(filters, f.name) for f in fields(filters)},
+        page_size=PAGE_SIZE
+    )
+
+    try:
+        if fmt == "csv":
+            rows_total = await _write_csv(path, pages)
+        else:
+            rows_total = await _write_xlsx(path, pages)
+    except BaseException:
+        # Ошибка или отмена посреди выгрузки: неполный файл не оставляем
+        path.unlink(missing_ok=True)
+        raise
+
+    result = ExportResult(path, rows_total, time.perf_counter() - started)
+    logger.info(
+        f"📤 Выгрузка {path.name}: {rows_total} строк за {result.seconds:.1f}s "
+        f"({path.stat().st_size / 1e6:.1f} МБ)"
+    )
+    return result
@@ -0,0 +1,84 @@
+"""
+library/http_server.py — Локальный HTTP-сервер бота (aiohttp.web).
+
+Включается настройкой http_enabled. Маршруты:
+    GET /verify/{serial} — проверка сертификата (JSON)
+    GET /metrics         — метрики Prometheus (если http_metrics)
+    POST /profile?mode=sample&seconds=30
+                         — профилирование, в ответе файл профиля
+                           (если http_profile; только с localhost)
+"""
+import logging
+from typing import Optional
+
+from aiohttp import web
+
+from config.settings import settings
+from .profiler import parse_args as parse_profile_args, profiler
+from .prometheus import CONTENT_TYPE, render as render_metrics
+from .registry import registry
+
+logger = logging.getLogger(__name__)
+
+
+async def verify_handler(request: web.Request) -> web.Response:
+    record = await registry.lookup(request.match_info["serial"])
+    if record is None:
+        return web.json_response({"valid": False}, status=404)
+    return web.json_response({"valid": True, **record})
+
+
+async def metrics_handler(request: web.Request) -> web.Response:
+    return web.Response(body=render_metrics().encode(), headers={"Content-Type": CONTENT_TYPE})
+
+
+LOOPBACK = {"127.0.0.1", "::1"}
+
+
+async def profile_handler(request: web.Request) -> web.StreamResponse:
+    if request.remote not in LOOPBACK:
+        return web.json_response({"error": "только с localhost"}, status=403)
+    args = [request.query.get("mode", "sample"),
+            request.query.get("seconds", str(settings.profile_default_seconds))]
+    try:
+        mode, seconds = parse_profile_args(args)
+        result = await profiler.run(mode, seconds)
+    except ValueError as e:
+        return web.json_response({"error": str(e)}, status=400)
+    except RuntimeError as e:
+        return web.json_response({"error": str(e)}, status=409)
+    return web.FileResponse(result.path, headers={
+        "Content-Disposition": f'attachment; filename="{result.path.name}"',
+    })
+
+
+def create_app() -> web.Application:
+    app = web.Application()
+    app.router.add_get("/verify/{serial}", verify_handler)
+    if settings.http_metrics:
+        app.router.add_get("/metrics", metrics_handler)
+    if settings.http_profile:
+        app.router.add_post("/profile", profile_handler)
+    return app
+
+
+class HTTPServer:
+    def __init__(self):
+        self._runner: Optional[web.AppRunner] = None
+
+    async def start(self) -> None:
+        if not settings.http_enabled:
+            return
+        self._runner = web.AppRunner(create_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, settings.http_host, settings.http_port)
+        await site.start()
+        logger.info(f"✅ HTTP-сервер: http://{settings.http_host}:{settings.http_port}")
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+http_server = HTTPServer()
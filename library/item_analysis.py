@@ -0,0 +1,195 @@
+"""
+library/item_analysis.py — Анализ качества вопросов по данным test_answers.
+
+Для каждого вопроса банка считаются:
+    • трудность (p-value) — доля правильных ответов;
+    • дискриминативность — точечно-бисериальная корреляция правильности
+      ответа с результатом остальной части теста (без самого вопроса);
+    • анализ дистракторов — доля выбравших каждый вариант и средний
+      результат выбравших.
+
+Все статистики выражаются через аддитивные суммы, поэтому ответы
+читаются порциями (keyset по result_id), порции обрабатываются
+векторно в NumPy, а накопители кэшируются по версии банка и при
+следующем запросе дополняются только новыми результатами.
+"""
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from .answer_codec import FORMAT_VERSION, HEADER_SIZE, MAX_OPTIONS, RECORD_SIZE
+from .enum import Difficulty
+from .question_loader import get_bank_version
+from .stats import stats_manager
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 5000  # тестов за одно чтение из БД
+
+# Совпадает с answer_codec.RECORD ("<HBBH")
+ANSWER_DTYPE = np.dtype([
+    ("qid", "<u2"), ("chosen", "u1"), ("correct", "u1"), ("time_ds", "<u2"),
+])
+assert ANSWER_DTYPE.itemsize == RECORD_SIZE
+
+
+@dataclass
+class ItemStats:
+    """Статистика одного вопроса."""
+    question_id: int
+    attempts: int
+    p_value: float
+    discrimination: float
+    avg_time: float            # сек
+    correct_mask: int
+    option_rates: List[float]   # доля выбравших вариант (исходный порядок)
+    option_scores: List[float]  # средний результат выбравших вариант
+
+
+class ItemAccumulator:
+    """Аддитивные суммы по вопросам одного банка."""
+
+    def __init__(self):
+        self.last_result_id = 0
+        self.tests = 0
+        self._size = 0
+        self.n = np.zeros(0, dtype=np.int64)
+        self.n_correct = np.zeros(0, dtype=np.int64)
+        self.sum_score = np.zeros(0)
+        self.sum_score2 = np.zeros(0)
+        self.sum_score_correct = np.zeros(0)
+        self.sum_time = np.zeros(0)
+        self.correct_mask = np.zeros(0, dtype=np.uint8)
+        self.option_counts = np.zeros((0, MAX_OPTIONS))
+        self.option_score_sum = np.zeros((0, MAX_OPTIONS))
+
+    def _grow(self, size: int) -> None:
+        if size <= self._size:
+            return
+        extra = size - self._size
+        for name in ("n", "n_correct", "sum_score", "sum_score2",
+                     "sum_score_correct", "sum_time", "correct_mask"):
+            arr = getattr(self, name)
+            setattr(self, name, np.concatenate([arr, np.zeros(extra, dtype=arr.dtype)]))
+        for name in ("option_counts", "option_score_sum"):
+            arr = getattr(self, name)
+            setattr(self, name, np.vstack([arr, np.zeros((extra, MAX_OPTIONS))]))
+        self._size = size
+
+    def add_chunk(self, blobs: Sequence[bytes]) -> None:
+        """Добавляет порцию BLOB-ов из test_answers (без циклов по ответам)."""
+        blobs = [b for b in blobs if b and b[0] == FORMAT_VERSION]
+        if not blobs:
+            return
+        counts = np.fromiter(
+            ((len(b) - HEADER_SIZE) // RECORD_SIZE for b in blobs),
+            dtype=np.int64, count=len(blobs)
+        )
+        data = np.frombuffer(
+            b"".join(b[HEADER_SIZE:HEADER_SIZE + c * RECORD_SIZE] for b, c in zip(blobs, counts)),
+            dtype=ANSWER_DTYPE
+        )
+        if data.size == 0:
+            return
+        attempt = np.repeat(np.arange(len(blobs)), counts)
+        correct = (data["chosen"] == data["correct"]).astype(np.float64)
+
+        # Результат остальной части теста (доля правильных без данного вопроса)
+        totals = np.bincount(attempt, weights=correct, minlength=len(blobs))
+        rest = (totals[attempt] - correct) / np.maximum(counts[attempt] - 1, 1)
+
+        qid = data["qid"].astype(np.intp)
+        size = int(qid.max()) + 1
+        self._grow(size)
+
+        def _sum(weights=None):
+            return np.bincount(qid, weights=weights, minlength=self._size)
+
+        self.n += _sum().astype(np.int64)
+        self.n_correct += _sum(correct).astype(np.int64)
+        self.sum_score += _sum(rest)
+        self.sum_score2 += _sum(rest * rest)
+        self.sum_score_correct += _sum(rest * correct)
+        self.sum_time += _sum(data["time_ds"] / 10.0)
+        self.correct_mask[qid] = data["correct"]
+
+        chosen = data["chosen"]
+        for bit in range(MAX_OPTIONS):
+            picked = ((chosen >> bit) & 1).astype(np.float64)
+            self.option_counts[:, bit] += _sum(picked)
+            self.option_score_sum[:, bit] += _sum(picked * rest)
+
+        self.tests += len(blobs)
+
+    def results(self) -> List[ItemStats]:
+        """Итоговые статистики по вопросам, встречавшимся в тестах."""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            n = self.n.astype(np.float64)
+            n1 = self.n_correct.astype(np.float64)
+            p = n1 / n
+            mean = self.sum_score / n
+            std = np.sqrt(np.maximum(self.sum_score2 / n - mean * mean, 0.0))
+            m1 = self.sum_score_correct / n1
+            m0 = (self.sum_score - self.sum_score_correct) / (n - n1)
+            r_pb = (m1 - m0) / std * np.sqrt(p * (1 - p))
+            r_pb = np.where(np.isfinite(r_pb), r_pb, 0.0)
+            rates = self.option_counts / n[:, None]
+            scores = np.where(
+                self.option_counts > 0,
+                self.option_score_sum / self.option_counts, 0.0
+            )
+            avg_time = self.sum_time / n
+
+        return [
+            ItemStats(
+                question_id=int(q),
+                attempts=int(self.n[q]),
+                p_value=float(p[q]),
+                discrimination=float(r_pb[q]),
+                avg_time=float(avg_time[q]),
+                correct_mask=int(self.correct_mask[q]),
+                option_rates=[round(float(x), 4) for x in rates[q]],
+                option_scores=[round(float(x), 4) for x in scores[q]],
+            )
+            for q in np.flatnonzero(self.n)
+        ]
+
+
+# Кэш накопителей: (специализация, уровень, версия банка) → суммы.
+# Уровни, читающие один общий файл, не смешиваются
+_cache: Dict[Tuple[str, str, str], ItemAccumulator] = {}
+_locks: Dict[Tuple[str, str, str], asyncio.Lock] = {}
+
+
+async def analyze_bank(
+    specialization: str,
+    difficulty: Difficulty
+) -> Tuple[str | None, ItemAccumulator | None]:
+    """
+    Возвращает (версия банка, накопитель) для текущего банка
+    специализации/уровня, дочитав из БД только новые результаты.
+    """
+    bank_version = get_bank_version(specialization, difficulty)
+    if bank_version is None:
+        return None, None
+
+    key = (specialization, difficulty.value, bank_version)
+    lock = _locks.setdefault(key, asyncio.Lock())
+    async with lock:
+        acc = _cache.setdefault(key, ItemAccumulator())
+        added = 0
+        async for rows in stats_manager.iter_answer_chunks(
+            specialization, difficulty.value, bank_version, acc.last_result_id, CHUNK_SIZE
+        ):
+            await asyncio.to_thread(acc.add_chunk, [blob for _, blob in rows])
+            acc.last_result_id = rows[-1][0]
+            added += len(rows)
+        if added:
+            logger.info(
+                f"📐 Анализ {specialization}/{difficulty.value} [{bank_version}]: "
+                f"+{added} тестов (всего {acc.tests})"
+            )
+    return bank_version, acc
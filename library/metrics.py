@@ -0,0 +1,190 @@
+"""
+library/metrics.py — Гистограммы задержек в стиле HDR.
+
+Значения хранятся в микросекундах в лог-линейных корзинах: на каждую
+степень двойки — 16 корзин, относительная погрешность не больше ~6%
+во всём диапазоне от 1 мкс до ~19 ч. Запись — O(1) (bit_length, сдвиг,
+инкремент), память — фиксированный список счётчиков на гистограмму,
+независимо от числа событий.
+
+Гистограммы группируются по семейству и имени:
+    ("handler", "callback:ans")       — обработчик события
+    ("api", "messages/sendText")      — исходящий вызов Bot API
+    ("db", "save_result")             — метод StatsManager
+    ("render", "certificate")         — рендер PDF в пуле
+
+Там же — счётчики событий (counters). Все изменения выполняются из
+цикла событий без блокировок: инкремент dict под GIL атомарен для
+читателя из другого потока, а писатель один.
+"""
+import functools
+import time
+from collections import Counter
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from .tracing import tracer
+
+SUB_BITS = 5                       # 2^5 = 32 значения мантиссы
+SUB_HALF = 1 << (SUB_BITS - 1)     # 16 корзин на степень двойки
+MAX_SHIFT = 32                     # до 2^36 мкс ≈ 19 ч
+N_BUCKETS = (MAX_SHIFT + 1) * SUB_HALF + SUB_HALF
+MAX_VALUE = (1 << (MAX_SHIFT + SUB_BITS)) - 1
+
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+
+def bucket_index(us: int) -> int:
+    if us < (1 << SUB_BITS):
+        return us
+    shift = us.bit_length() - SUB_BITS
+    return (shift << (SUB_BITS - 1)) + (us >> shift)
+
+
+def bucket_bounds(index: int) -> Tuple[int, int]:
+    """[нижняя, верхняя) граница корзины в микросекундах."""
+    if index < (1 << SUB_BITS):
+        return index, index + 1
+    shift = (index >> (SUB_BITS - 1)) - 1
+    mantissa = index - (shift << (SUB_BITS - 1))
+    return mantissa << shift, (mantissa + 1) << shift
+
+
+class LatencyHistogram:
+    __slots__ = ("counts", "count", "total_us", "max_us")
+
+    def __init__(self):
+        self.counts: List[int] = [0] * N_BUCKETS
+        self.count = 0
+        self.total_us = 0
+        self.max_us = 0
+
+    def record(self, seconds: float) -> None:
+        us = int(seconds * 1_000_000)
+        if us > MAX_VALUE:
+            us = MAX_VALUE
+        elif us < 0:
+            us = 0
+        # bucket_index() без вызова функции (SUB_BITS = 5)
+        if us < 32:
+            self.counts[us] += 1
+        else:
+            shift = us.bit_length() - SUB_BITS
+            self.counts[(shift << 4) + (us >> shift)] += 1
+        self.count += 1
+        self.total_us += us
+        if us > self.max_us:
+            self.max_us = us
+
+    def quantile(self, q: float) -> float:
+        """Значение q-квантиля в секундах (середина корзины)."""
+        if not self.count:
+            return 0.0
+        rank = max(int(q * self.count + 0.5), 1)
+        seen = 0
+        for index, n in enumerate(self.counts):
+            if not n:
+                continue
+            seen += n
+            if seen >= rank:
+                low, high = bucket_bounds(index)
+                return min((low + high - 1) / 2, self.max_us) / 1_000_000
+        return self.max_us / 1_000_000
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        for i, n in enumerate(other.counts):
+            if n:
+                self.counts[i] += n
+        self.count += other.count
+        self.total_us += other.total_us
+        self.max_us = max(self.max_us, other.max_us)
+
+    def summary(self) -> Dict[str, float]:
+        out = {
+            "count": self.count,
+            "mean": self.total_us / self.count / 1_000_000 if self.count else 0.0,
+            "max": self.max_us / 1_000_000,
+        }
+        for q in QUANTILES:
+            out[f"p{q * 100:g}"] = self.quantile(q)
+        return out
+
+
+class LatencyMetrics:
+    """Гистограммы и счётчики ошибок по (семейство, имя)."""
+
+    def __init__(self):
+        self._hist: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self.errors: Counter = Counter()
+
+    def observe(self, family: str, name: str, seconds: float) -> None:
+        hist = self._hist.get((family, name))
+        if hist is None:
+            hist = self._hist[(family, name)] = LatencyHistogram()
+        hist.record(seconds)
+
+    def error(self, family: str, name: str) -> None:
+        self.errors[(family, name)] += 1
+
+    def histogram(self, family: str, name: str) -> Optional[LatencyHistogram]:
+        return self._hist.get((family, name))
+
+    def family(self, family: str) -> Dict[str, LatencyHistogram]:
+        return {name: h for (fam, name), h in self._hist.items() if fam == family}
+
+    def reset(self) -> None:
+        self._hist.clear()
+        self.errors.clear()
+
+
+latency = LatencyMetrics()
+
+LabelSet = Tuple[Tuple[str, str], ...]
+
+
+class Counters:
+    """Монотонные счётчики: имя + метки → значение."""
+
+    def __init__(self):
+        self._values: Dict[Tuple[str, LabelSet], float] = {}
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())) if labels else ())
+        self._values[key] = self._values.get(key, 0) + value
+
+    def items(self) -> List[Tuple[Tuple[str, LabelSet], float]]:
+        return list(self._values.items())
+
+    def get(self, name: str, **labels: str) -> float:
+        return self._values.get((name, tuple(sorted(labels.items()))), 0)
+
+
+counters = Counters()
+
+F = TypeVar("F", bound=Callable[..., Awaitable])
+
+
+def timed(family: str, name: Optional[str] = None) -> Callable[[F], F]:
+    """
+    Декоратор async-функции: время выполнения и ошибки в latency,
+    внутри трассы события — спан "<family> <name>".
+    """
+
+    def decorator(func: F) -> F:
+        label = name or func.__name__
+        span_name = f"{family} {label}"
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                with tracer.span(span_name):
+                    return await func(*args, **kwargs)
+            except Exception:
+                latency.error(family, label)
+                raise
+            finally:
+                latency.observe(family, label, time.perf_counter() - started)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
@@ -0,0 +1,141 @@
+"""
+library/middleware.py — Цепочка промежуточных обработчиков событий.
+
+Каждое событие (сообщение или нажатие) описывается контекстом Context и
+проходит цепочку middleware(ctx, call_next) → конечный обработчик.
+Цепочка собирается один раз при старте (Pipeline), поэтому на событие
+приходится только несколько вложенных await без поиска по спискам.
+
+Стандартный порядок:
+    errors → rate_limit → timing → load_state → обработчик
+errors стоит первым, чтобы сбой любого слоя (в том числе ответа о
+превышении лимита) не уходил в цикл опроса. Превысившие лимит события
+не попадают в гистограммы; ошибки учитываются во времени обработчика. Маршрут, пользователь и перехваченные ошибки
+записываются в корневой спан трассы события (library/tracing.py).
+"""
+import logging
+import time
+from dataclasses import dataclass
+from functools import partial
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, FrozenSet, List, Optional
+
+if TYPE_CHECKING:
+    from vk_bot.bot import VKBot
+
+from .metrics import latency
+from .ratelimit import rate_limiter
+from .state_manager import state_manager
+from .tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Context:
+    bot: "VKBot"
+    kind: str                 # "message" | "callback"
+    event: Any                # VKMessage | VKCallbackQuery
+    user_id: str
+    chat_id: str
+    route: str = "unknown"    # имя маршрута для метрик и логов
+    handler: Optional[Callable[..., Awaitable[None]]] = None
+    states: Optional[FrozenSet[str]] = None   # допустимые состояния FSM
+    reject: str = "❌ Ошибка состояния"
+    needs_state: bool = False
+    state: Optional[str] = None
+    error_text: str = "❌ Ошибка. Начните заново с /start"
+
+    async def reply(self, text: str, alert: bool = True) -> None:
+        """Короткий ответ: всплывающее уведомление или сообщение в чат."""
+        if self.kind == "callback":
+            await self.bot.answer_callback(self.event.queryId, text, alert)
+        else:
+            await self.bot.send_text(self.chat_id, text)
+
+
+Next = Callable[[Context], Awaitable[None]]
+Middleware = Callable[[Context, Next], Awaitable[None]]
+
+
+class Pipeline:
+    """Цепочка middleware, собранная вокруг конечного обработчика."""
+
+    def __init__(self, middlewares: List[Middleware], endpoint: Next):
+        self.middlewares = list(middlewares)
+        chain = endpoint
+        for mw in reversed(self.middlewares):
+            # partial, а не замыкание-корутина: на каждый слой на один кадр меньше
+            chain = partial(mw, call_next=chain)
+        self._chain = chain
+
+    def __call__(self, ctx: Context) -> Awaitable[None]:
+        return self._chain(ctx)
+
+
+# ─────────────────────────────────────────────────────────────────────── #
+# Стандартные middleware
+# ─────────────────────────────────────────────────────────────────────── #
+LIMIT_TEXT = {
+    "message": "⏳ Слишком частые запросы. Подождите секунду.",
+    "callback": "⏳ Подождите немного...",
+}
+
+
+async def rate_limit(ctx: Context, call_next: Next) -> None:
+    limited = rate_limiter.check(ctx.kind, ctx.user_id, ctx.chat_id)
+    if limited:
+        if limited == "user":
+            await ctx.reply(LIMIT_TEXT[ctx.kind])
+        elif ctx.kind == "callback":
+            # Превышен общий лимит: без текста, но кнопка не должна «зависнуть»
+            await ctx.bot.answer_callback(ctx.event.queryId)
+        return
+    await call_next(ctx)
+
+
+async def timing(ctx: Context, call_next: Next) -> None:
+    started = time.perf_counter()
+    try:
+        await call_next(ctx)
+    finally:
+        # route читается после обработки: его может уточнить load_state
+        route = f"{ctx.kind}:{ctx.route}"
+        latency.observe("handler", route, time.perf_counter() - started)
+        tracer.annotate(route=route, user_id=ctx.user_id)
+
+
+async def errors(ctx: Context, call_next: Next) -> None:
+    try:
+        await call_next(ctx)
+    except Exception as e:
+        latency.error("handler", f"{ctx.kind}:{ctx.route}")
+        tracer.record_error(e)
+        logger.error("❌ Ошибка обработчика [%s:%s]: %s", ctx.kind, ctx.route, e, exc_info=True)
+        try:
+            await ctx.reply(ctx.error_text)
+        except Exception:
+            pass
+
+
+async def load_state(ctx: Context, call_next: Next) -> None:
+    """Читает состояние FSM, если оно нужно маршруту, и проверяет его."""
+    if ctx.needs_state or ctx.states is not None:
+        ctx.state = await state_manager.get_state(ctx.user_id)
+        if ctx.states is not None and ctx.state not in ctx.states:
+            await ctx.reply(ctx.reject)
+            return
+    await call_next(ctx)
+
+
+async def call_handler(ctx: Context) -> None:
+    await ctx.handler(ctx.bot, ctx.event, ctx.user_id)
+
+
+DEFAULT_MIDDLEWARES: List[Middleware] = [errors, rate_limit, timing, load_state]
+
+
+def api_observer(method: str, seconds: float, ok: bool) -> None:
+    """Хук VKBot.on_request: гистограмма исходящих вызовов Bot API."""
+    latency.observe("api", method, seconds)
+    if not ok:
+        latency.error("api", method)
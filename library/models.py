@@ -17,6 +17,9 @@ class Question(BaseModel):
     difficulty: Difficulty = Difficulty.BASIC
     original_options: Optional[List[str]] = None
     shuffle_mapping: Optional[List[int]] = None
+    # Идентичность вопроса в банке: индекс в JSON-файле и версия файла
+    question_id: Optional[int] = None
+    bank_version: Optional[str] = None
 
     @field_validator('correct_answers', mode='after')
     @classmethod
@@ -45,6 +48,8 @@ class CurrentTestState(BaseModel):
     current_index: int = 0
     selected_answers: Set[int] = Field(default_factory=set)
     answers_history: Dict[int, Set[int]] = Field(default_factory=dict)
+    answer_times: Dict[int, float] = Field(default_factory=dict)  # сек на вопрос
+    question_shown_at: Optional[float] = None
     start_time: float = Field(default_factory=time.time)
     timer_task: Optional[object] = None
     last_message_id: Optional[str] = None  # str в VK Teams (msgId)
@@ -63,12 +68,22 @@ class CurrentTestState(BaseModel):
     grade: str = ""
     elapsed_time: str = ""
 
+    # Запись в БД (заполняется StatsManager.save_result)
+    result_id: Optional[int] = None
+    cert_serial: Optional[str] = None
+    created_at: Optional[str] = None  # test_results.created_at (UTC)
+
     model_config = {"arbitrary_types_allowed": True}
 
     def save_answer(self, question_index: int) -> None:
         self.answers_history[question_index] = self.selected_answers.copy()
+        if self.question_shown_at is not None:
+            spent = time.time() - self.question_shown_at
+            self.answer_times[question_index] = self.answer_times.get(question_index, 0.0) + spent
+            self.question_shown_at = None
 
     def load_answer(self, question_index: int) -> None:
+        self.question_shown_at = time.time()
         if question_index in self.answers_history:
             self.selected_answers = self.answers_history[question_index].copy()
         else:
@@ -0,0 +1,86 @@
+"""
+library/percentiles.py — Гистограммы результатов для процентильного ранга.
+
+Для каждой пары (специализация, уровень) и периода хранится
+гистограмма процентов с фиксированными корзинами по 1%.
+Гистограммы живут в памяти, пополняются при сохранении результата
+и периодически сверяются с БД (StatsManager.reconcile_histograms).
+Поиск ранга — O(число корзин), без запросов к БД.
+"""
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+N_BINS = 101  # 0..100 %
+
+# Ключ периода: "all" — за всё время, "YYYY-MM" — календарный месяц (UTC,
+# как CURRENT_TIMESTAMP в test_results)
+PERIOD_ALL = "all"
+
+HistKey = Tuple[str, str, str]  # (специализация, уровень, период)
+
+
+def score_bin(percentage: float) -> int:
+    return min(max(int(percentage), 0), N_BINS - 1)
+
+
+def period_key(period: str, when: Optional[datetime] = None) -> str:
+    """Ключ периода для настройки percentile_period ("all" | "month")."""
+    if period == "month":
+        when = when or datetime.now(timezone.utc)
+        return when.strftime("%Y-%m")
+    return PERIOD_ALL
+
+
+class ScoreHistograms:
+    """In-memory гистограммы результатов."""
+
+    def __init__(self):
+        self._hist: Dict[HistKey, List[int]] = {}
+
+    def add(self, specialization: str, difficulty: str, percentage: float) -> None:
+        """Учитывает новый результат во всех периодах."""
+        b = score_bin(percentage)
+        for period in (PERIOD_ALL, period_key("month")):
+            key = (specialization, difficulty, period)
+            hist = self._hist.get(key)
+            if hist is None:
+                hist = self._hist[key] = [0] * N_BINS
+            hist[b] += 1
+
+    def replace(self, rows: Iterable[Tuple[str, str, str, int, int]]) -> None:
+        """
+        Полная замена по данным БД.
+        rows: (специализация, уровень, месяц "YYYY-MM", корзина, количество).
+        """
+        hist: Dict[HistKey, List[int]] = {}
+        for spec, diff, month, b, count in rows:
+            b = score_bin(b)
+            for period in (PERIOD_ALL, month):
+                h = hist.setdefault((spec, diff, period), [0] * N_BINS)
+                h[b] += count
+        self._hist = hist
+
+    def percentile(
+        self,
+        specialization: str,
+        difficulty: str,
+        percentage: float,
+        period: str = PERIOD_ALL,
+        min_samples: int = 1
+    ) -> Optional[float]:
+        """
+        Доля ДРУГИХ результатов строго ниже данного, в процентах.
+        Предполагается, что сам результат уже учтён в гистограмме.
+        None — если для сравнения недостаточно данных.
+        """
+        hist = self._hist.get((specialization, difficulty, period))
+        if hist is None:
+            return None
+        others = sum(hist) - 1
+        if others < min_samples:
+            return None
+        below = sum(hist[:score_bin(percentage)])
+        return below / others * 100
+
+    def total(self, specialization: str, difficulty: str, period: str = PERIOD_ALL) -> int:
+        return sum(self._hist.get((specialization, difficulty, period), ()))
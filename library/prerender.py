@@ -0,0 +1,137 @@
+"""
+library/prerender.py — Упреждающий рендер сертификатов.
+
+Сразу после подсчёта результатов (finish_test) сертификат рендерится
+в фоне и кладётся в cert_cache, так что кнопка «Сертификат PDF»
+отдаёт уже готовый файл. Рендер низкоприоритетный: он запускается,
+только если в пуле есть свободный воркер, и не встаёт в очередь за
+рендерами, которые пользователи запросили явно.
+
+Политика (settings.cert_prerender):
+    off      — не рендерить заранее
+    passing  — только при положительной оценке
+    always   — для всех результатов
+    idle     — для всех, но только когда пул простаивает и
+               средняя нагрузка CPU ниже числа ядер
+
+Если сессия пользователя очищена раньше, чем он запросил сертификат,
+фоновый рендер отменяется, а невостребованный файл удаляется из кэша.
+Невостребованных рендеров хранится не больше cert_prerender_keep:
+сверх того самые старые вытесняются так же, как при очистке сессии.
+"""
+import asyncio
+import logging
+import os
+from typing import Dict, Tuple
+
+from config.settings import settings
+from .cert_cache import cache_key, cert_cache
+from .certificates import certificate_fields, cert_pool
+from .models import CurrentTestState
+from .state_manager import state_manager
+from .rollups import FAILED_GRADE
+
+logger = logging.getLogger(__name__)
+
+POLICIES = ("off", "passing", "always", "idle")
+
+
+def _cpu_idle() -> bool:
+    try:
+        load, _, _ = os.getloadavg()
+    except OSError:
+        return True
+    return load < (os.cpu_count() or 1)
+
+
+class Prerenderer:
+    """Фоновые рендеры по пользователям: user_id → (задача, ключ кэша)."""
+
+    def __init__(self):
+        self._jobs: Dict[str, Tuple[asyncio.Task, str]] = {}
+
+        # Метрики
+        self.started = 0
+        self.skipped = 0
+        self.served = 0
+        self.discarded = 0
+        self.evicted = 0
+
+    def _should_render(self, test_state: CurrentTestState) -> bool:
+        policy = settings.cert_prerender
+        if policy not in POLICIES or policy == "off":
+            return False
+        if policy == "passing" and test_state.grade == FAILED_GRADE:
+            return False
+        running = sum(1 for task, _ in self._jobs.values() if not task.done())
+        if running >= settings.cert_prerender_max:
+            return False
+        # Свободный воркер — иначе не мешаем явным запросам
+        if cert_pool.pending >= max(settings.cert_workers, 1):
+            return False
+        if policy == "idle" and (cert_pool.pending > 0 or not _cpu_idle()):
+            return False
+        return True
+
+    def schedule(self, user_id: str, test_state: CurrentTestState) -> None:
+        """Поставить упреждающий рендер (если позволяет политика)."""
+        self.cancel(user_id)
+        if not self._should_render(test_state):
+            self.skipped += 1
+            return
+        fields = certificate_fields(test_state, user_id)
+        key = cache_key(fields)
+        task = asyncio.create_task(self._render(fields))
+        self._jobs[user_id] = (task, key)
+        self.started += 1
+        self._trim()
+
+    def _trim(self) -> None:
+        """Вытесняет самые старые невостребованные рендеры сверх лимита."""
+        # dict хранит порядок вставки, а schedule() переставляет пользователя в конец
+        excess = len(self._jobs) - max(settings.cert_prerender_keep, 1)
+        for user_id in list(self._jobs)[:max(excess, 0)]:
+            self.cancel(user_id)
+            self.evicted += 1
+
+    async def _render(self, fields: dict) -> None:
+        try:
+            await cert_cache.get_or_render(fields)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Пользователь получит сертификат обычным путём
+            logger.debug("Упреждающий рендер не выполнен: %s", e)
+
+    def claim(self, user_id: str) -> None:
+        """
+        Пользователь запросил сертификат: фоновый рендер больше не
+        отменяется (незавершённый рендер обработчик дождётся через
+        cert_cache), а файл не удаляется при очистке сессии.
+        """
+        if self._jobs.pop(user_id, None) is not None:
+            self.served += 1
+
+    def cancel(self, user_id: str) -> None:
+        """Отменить рендер и удалить невостребованный сертификат."""
+        job = self._jobs.pop(user_id, None)
+        if job is None:
+            return
+        task, key = job
+        task.cancel()
+        cert_cache.discard(key)
+        self.discarded += 1
+
+    def metrics(self) -> Dict[str, int]:
+        return {
+            "pending": len(self._jobs),
+            "started": self.started,
+            "skipped": self.skipped,
+            "served": self.served,
+            "discarded": self.discarded,
+            "evicted": self.evicted,
+        }
+
+
+prerenderer = Prerenderer()
+state_manager.add_clear_listener(prerenderer.cancel)
@@ -0,0 +1,266 @@
+"""
+library/profiler.py — Профилирование работающего бота по запросу.
+
+Запускается командой администратора /profile или POST /profile на
+локальном HTTP-сервере, без перезапуска процесса. Режимы:
+
+    sample       — поток раз в profile_sample_interval снимает стек потока
+                   цикла событий (sys._current_frames). Нагрузка ~1–3%,
+                   безопасен под пиковой нагрузкой. Результат — «свёрнутые»
+                   стеки (.folded) для flamegraph.pl / speedscope.
+    cprofile     — детерминированный cProfile потока цикла. Точные числа
+                   вызовов, но обработчики замедляются в 1.5–3 раза.
+                   Результат — отчёт .txt и .pstats для snakeviz.
+    tracemalloc  — прирост памяти по местам выделения за время замера.
+                   Замедляет выделения в 2–4 раза и требует памяти.
+
+Одновременно идёт только одно профилирование, длительность ограничена
+profile_max_seconds. Файлы пишутся в logs/profiles, хранятся последние
+profile_keep. Разбор результатов выполняется в отдельном потоке.
+"""
+import asyncio
+import cProfile
+import io
+import logging
+import pstats
+import random
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = settings.logs_dir / "profiles"
+MODES = ("sample", "cprofile", "tracemalloc")
+OVERHEAD = {
+    "sample": "нагрузка ~1–3% CPU",
+    "cprofile": "обработчики замедляются в 1.5–3 раза",
+    "tracemalloc": "выделения памяти замедляются в 2–4 раза, растёт потребление памяти",
+}
+TOP_ROWS = 30            # строк в текстовых отчётах
+SUMMARY_ROWS = 5         # строк в кратком итоге (подпись к файлу)
+TRACEMALLOC_FRAMES = 10
+SELECTORS = "selectors.py"   # кадр select() — цикл ждёт событий
+SWITCH_DIVISOR = 20          # интервал переключения GIL при sample
+
+
+@dataclass
+class ProfileResult:
+    mode: str
+    seconds: float
+    path: Path
+    summary: str
+
+
+def parse_args(args: List[str]) -> Tuple[str, int]:
+    """[режим] [секунд] → (режим, секунд); ValueError при неверных аргументах."""
+    mode, seconds = "sample", settings.profile_default_seconds
+    for arg in args:
+        if arg.lower() in MODES:
+            mode = arg.lower()
+        elif arg.isdigit():
+            seconds = int(arg)
+        else:
+            raise ValueError(f"Неизвестный аргумент: {arg}")
+    if not 1 <= seconds <= settings.profile_max_seconds:
+        raise ValueError(f"Длительность — от 1 до {settings.profile_max_seconds} с")
+    return mode, seconds
+
+
+def _frame_name(code) -> str:
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+class _StackSampler:
+    """Поток, снимающий стек потока цикла событий через равные интервалы."""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()   # кортеж code-объектов (корень → лист)
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        # Случайный сдвиг интервала: периодическая нагрузка с тем же
+        # периодом иначе попадала бы в снимки всегда в одной фазе
+        while not self._stop.wait(self.interval * (0.5 + random.random())):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(frame.f_code)
+                frame = frame.f_back
+            stack.reverse()
+            self.stacks[tuple(stack)] += 1
+            self.samples += 1
+
+
+class Profiler:
+    def __init__(self):
+        self._running: Optional[str] = None
+        self.runs = 0
+
+    @property
+    def running(self) -> Optional[str]:
+        return self._running
+
+    async def run(self, mode: str, seconds: float) -> ProfileResult:
+        """Профилирует процесс seconds секунд; RuntimeError, если уже идёт замер."""
+        if mode not in MODES:
+            raise ValueError(f"Режим — один из: {', '.join(MODES)}")
+        seconds = min(seconds, settings.profile_max_seconds)
+        if self._running is not None:
+            raise RuntimeError(f"Уже идёт профилирование ({self._running})")
+        self._running = mode
+        logger.warning(f"🔬 Профилирование {mode} на {seconds} с: {OVERHEAD[mode]}")
+        try:
+            PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+            stem = PROFILE_DIR / f"{mode}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            if mode == "sample":
+                path, summary = await self._sample(seconds, stem)
+            elif mode == "cprofile":
+                path, summary = await self._cprofile(seconds, stem)
+            else:
+                path, summary = await self._tracemalloc(seconds, stem)
+            self.runs += 1
+            await asyncio.to_thread(self._prune)
+            logger.info(f"✅ Профиль сохранён: {path}")
+            return ProfileResult(mode, seconds, path, summary)
+        finally:
+            self._running = None
+
+    # ------------------------------------------------------------------ #
+    # Режимы
+    # ------------------------------------------------------------------ #
+    async def _sample(self, seconds: float, stem: Path) -> Tuple[Path, str]:
+        interval = settings.profile_sample_interval
+        sampler = _StackSampler(threading.get_ident(), interval)
+        # Снимок делается, когда поток цикла отдаёт GIL. При стандартном
+        # интервале переключения (5 ms) он успевает дойти до select(), и
+        # занятый цикл выглядит простаивающим — на время замера интервал
+        # уменьшается
+        switch = sys.getswitchinterval()
+        sys.setswitchinterval(min(switch, interval / SWITCH_DIVISOR))
+        sampler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            sys.setswitchinterval(switch)
+            await asyncio.to_thread(sampler.stop)
+        return await asyncio.to_thread(self._write_folded, sampler, stem)
+
+    @staticmethod
+    def _write_folded(sampler: _StackSampler, stem: Path) -> Tuple[Path, str]:
+        path = stem.with_suffix(".folded")
+        leaves: Counter = Counter()
+        idle = 0
+        with path.open("w", encoding="utf-8") as f:
+            for stack, n in sampler.stacks.most_common():
+                f.write(";".join(_frame_name(code) for code in stack) + f" {n}\n")
+                if stack and Path(stack[-1].co_filename).name == SELECTORS:
+                    idle += n
+                elif stack:
+                    leaves[_frame_name(stack[-1])] += n
+        total = sampler.samples or 1
+        lines = [
+            f"Снимков: {sampler.samples}, цикл занят {(total - idle) / total:.0%} времени",
+        ]
+        for name, n in leaves.most_common(SUMMARY_ROWS):
+            lines.append(f"• {n / total:.1%} {name}")
+        return path, "\n".join(lines)
+
+    async def _cprofile(self, seconds: float, stem: Path) -> Tuple[Path, str]:
+        # Профилируется поток, в котором вызван enable(), — поток цикла событий
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profile.disable()
+        return await asyncio.to_thread(self._write_cprofile, profile, stem)
+
+    @staticmethod
+    def _write_cprofile(profile: cProfile.Profile, stem: Path) -> Tuple[Path, str]:
+        profile.dump_stats(stem.with_suffix(".pstats"))
+        out = io.StringIO()
+        stats = pstats.Stats(profile, stream=out).strip_dirs()
+        stats.sort_stats("cumulative").print_stats(TOP_ROWS)
+        stats.sort_stats("tottime").print_stats(TOP_ROWS)
+        path = stem.with_suffix(".txt")
+        path.write_text(out.getvalue(), encoding="utf-8")
+
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)
+        lines = [f"Вызовов: {stats.total_calls}, CPU: {stats.total_tt:.2f} с (собственное время):"]
+        for (filename, line, func), (_, _, tottime, _, _) in rows[:SUMMARY_ROWS]:
+            lines.append(f"• {tottime:.3f} с {func} ({filename}:{line})")
+        return path, "\n".join(lines)
+
+    async def _tracemalloc(self, seconds: float, stem: Path) -> Tuple[Path, str]:
+        # Если трассировка уже включена (PYTHONTRACEMALLOC), её не выключаем
+        owned = not tracemalloc.is_tracing()
+        if owned:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        try:
+            before = tracemalloc.take_snapshot()
+            await asyncio.sleep(seconds)
+            after = tracemalloc.take_snapshot()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            if owned:
+                tracemalloc.stop()
+        return await asyncio.to_thread(self._write_tracemalloc, before, after, peak, stem)
+
+    @staticmethod
+    def _write_tracemalloc(before, after, peak: int, stem: Path) -> Tuple[Path, str]:
+        diff = after.compare_to(before, "lineno")
+        growth = sum(stat.size_diff for stat in diff)
+        path = stem.with_suffix(".txt")
+        with path.open("w", encoding="utf-8") as f:
+            f.write(f"Прирост: {growth / 1024:.1f} KiB, пик: {peak / 1024 / 1024:.1f} MiB\n\n")
+            for stat in diff[:TOP_ROWS]:
+                f.write(f"{stat}\n")
+            f.write("\nКрупнейшие места прироста (стек):\n")
+            for stat in after.compare_to(before, "traceback")[:SUMMARY_ROWS]:
+                f.write(f"\n{stat.size_diff / 1024:+.1f} KiB, {stat.count_diff:+d} блоков\n")
+                f.write("\n".join(stat.traceback.format()) + "\n")
+
+        lines = [f"Прирост: {growth / 1024:+.1f} KiB, пик: {peak / 1024 / 1024:.1f} MiB"]
+        for stat in diff[:SUMMARY_ROWS]:
+            frame = stat.traceback[0]
+            lines.append(
+                f"• {stat.size_diff / 1024:+.1f} KiB {Path(frame.filename).name}:{frame.lineno}"
+            )
+        return path, "\n".join(lines)
+
+    # ------------------------------------------------------------------ #
+    @staticmethod
+    def _prune() -> None:
+        """Оставляет в logs/profiles только profile_keep последних замеров."""
+        files = sorted(PROFILE_DIR.iterdir(), key=lambda p: p.stat().st_mtime, reverse=True)
+        stems: Dict[str, None] = {}
+        for file in files:
+            stems.setdefault(file.stem, None)
+        for stem in list(stems)[settings.profile_keep:]:
+            for file in PROFILE_DIR.glob(f"{stem}.*"):
+                file.unlink(missing_ok=True)
+
+    def metrics(self) -> Dict[str, int]:
+        return {"runs": self.runs, "running": int(self._running is not None)}
+
+
+profiler = Profiler()
@@ -0,0 +1,196 @@
+"""
+library/prometheus.py — Метрики бота в текстовом формате Prometheus.
+
+Источники:
+    counters (metrics.py)   — события polling, напоминания, таймеры
+    latency (metrics.py)    — гистограммы обработчиков, Bot API, БД, рендера
+    metrics() компонентов   — очереди, кэши, пул рендера, ограничитель частоты
+
+Гистограммы HDR сворачиваются в фиксированные корзины le через заранее
+посчитанную таблицу «корзина HDR → корзина le», поэтому снимок — один
+проход по счётчикам в памяти, без блокировок и запросов к БД.
+"""
+import time
+from typing import Callable, Dict, Iterable, List, Set, Tuple
+
+from config.settings import log_stats
+from .cert_cache import cert_cache
+from .certificates import cert_pool
+from .deferred import deferred
+from .metrics import N_BUCKETS, bucket_bounds, counters, latency
+from .prerender import prerenderer
+from .profiler import profiler
+from .ratelimit import rate_limiter
+from .registry import registry
+from .state_manager import state_manager
+from .timers import TestTimer
+from .tracing import tracer
+from .watchdog import watchdog
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+PREFIX = "bot"
+
+# Границы корзин, сек
+LE_BOUNDS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Семейство гистограммы → (имя метрики, имя метки, описание)
+HISTOGRAMS = {
+    "handler": ("handler_seconds", "route", "Время обработки события"),
+    "api": ("api_request_seconds", "method", "Время вызова Bot API (с повторами)"),
+    "db": ("db_query_seconds", "op", "Время метода StatsManager"),
+    "render": ("render_seconds", "kind", "Время рендера PDF в пуле"),
+    "loop": ("loop_lag_seconds", "probe", "Опоздание пробуждения в цикле событий"),
+}
+
+# Компонент → (функция metrics(), ключи-счётчики); ключи *_ms пропускаются —
+# для них есть гистограммы
+COMPONENTS: Dict[str, Tuple[Callable[[], Dict], Set[str]]] = {
+    "cert_pool": (cert_pool.metrics, {"rendered", "failed", "rejected"}),
+    "cert_cache": (cert_cache.metrics, {"hits", "misses", "reused_uploads", "evicted"}),
+    "prerender": (prerenderer.metrics, {"started", "skipped", "served", "discarded", "evicted"}),
+    "deferred": (deferred.metrics, {"done", "dropped", "api_calls"}),
+    "verify_registry": (registry.metrics, {"lookups", "cache_hits"}),
+    "watchdog": (watchdog.metrics, {"stalls", "reports"}),
+    "log": (log_stats, {"dropped", "sampled_out"}),
+    "traces": (tracer.metrics, {"started", "exported", "dropped"}),
+    "profiler": (profiler.metrics, {"runs"}),
+}
+
+# Описания счётчиков из metrics.counters
+COUNTER_HELP = {
+    "poll_requests_total": "Запросов events/get",
+    "poll_errors_total": "Неудачных запросов events/get",
+    "events_total": "Полученных событий по типу",
+    "tests_finished_total": "Завершённых тестов",
+    "timers_expired_total": "Тестов, завершённых по таймеру",
+    "reminders_sent_total": "Доставленных напоминаний",
+    "reminders_failed_total": "Недоставленных напоминаний",
+}
+
+_STARTED = time.time()
+
+
+def _le_slots() -> List[int]:
+    """Для каждой корзины HDR — индекс первой границы le, не меньшей её верха."""
+    slots = []
+    for index in range(N_BUCKETS):
+        high = bucket_bounds(index)[1] / 1_000_000
+        slot = next((i for i, le in enumerate(LE_BOUNDS) if high <= le), len(LE_BOUNDS))
+        slots.append(slot)
+    return slots
+
+
+_LE_SLOT = _le_slots()
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(pairs: Iterable[Tuple[str, str]]) -> str:
+    inner = ",".join(f'{k}="{_escape(v)}"' for k, v in pairs)
+    return f"{{{inner}}}" if inner else ""
+
+
+def _fmt(value: float) -> str:
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Writer:
+    def __init__(self):
+        self.lines: List[str] = []
+        self._declared: Set[str] = set()
+
+    def declare(self, name: str, kind: str, help_text: str) -> None:
+        if name not in self._declared:
+            self._declared.add(name)
+            self.lines.append(f"# HELP {name} {help_text}")
+            self.lines.append(f"# TYPE {name} {kind}")
+
+    def sample(self, name: str, value: float, labels: Iterable[Tuple[str, str]] = ()) -> None:
+        self.lines.append(f"{name}{_labels(labels)} {_fmt(value)}")
+
+
+def _write_histograms(w: _Writer) -> None:
+    for family, (metric, label, help_text) in HISTOGRAMS.items():
+        hists = latency.family(family)
+        if not hists:
+            continue
+        name = f"{PREFIX}_{metric}"
+        w.declare(name, "histogram", help_text)
+        for key, h in sorted(hists.items()):
+            per_slot = [0] * (len(LE_BOUNDS) + 1)
+            for index, n in enumerate(h.counts):
+                if n:
+                    per_slot[_LE_SLOT[index]] += n
+            cumulative = 0
+            for le, n in zip(LE_BOUNDS, per_slot):
+                cumulative += n
+                w.sample(f"{name}_bucket", cumulative, ((label, key), ("le", repr(le))))
+            w.sample(f"{name}_bucket", h.count, ((label, key), ("le", "+Inf")))
+            w.sample(f"{name}_sum", h.total_us / 1_000_000, ((label, key),))
+            w.sample(f"{name}_count", h.count, ((label, key),))
+
+    for family, (_, label, _) in HISTOGRAMS.items():
+        errors = [(k[1], n) for k, n in latency.errors.items() if k[0] == family]
+        if not errors:
+            continue
+        name = f"{PREFIX}_{family}_errors_total"
+        w.declare(name, "counter", f"Число ошибок по {label}")
+        for key, n in sorted(errors):
+            w.sample(name, n, ((label, key),))
+
+
+def _write_counters(w: _Writer) -> None:
+    for (name, labels), value in sorted(counters.items()):
+        full = f"{PREFIX}_{name}"
+        w.declare(full, "counter", COUNTER_HELP.get(name, name))
+        w.sample(full, value, labels)
+
+
+def _write_components(w: _Writer) -> None:
+    for component, (collect, counter_keys) in COMPONENTS.items():
+        for key, value in collect().items():
+            if key.endswith("_ms"):
+                continue
+            if key in counter_keys:
+                name = f"{PREFIX}_{component}_{key}_total"
+                w.declare(name, "counter", f"{component} {key}")
+            else:
+                name = f"{PREFIX}_{component}_{key}"
+                w.declare(name, "gauge", f"{component} {key}")
+            w.sample(name, value)
+
+    name = f"{PREFIX}_ratelimit_allowed_total"
+    w.declare(name, "counter", "События, пропущенные ограничителем частоты")
+    for kind, n in sorted(rate_limiter.allowed.items()):
+        w.sample(name, n, (("kind", kind),))
+    name = f"{PREFIX}_ratelimit_rejected_total"
+    w.declare(name, "counter", "События, отклонённые ограничителем частоты")
+    for (kind, scope), n in sorted(rate_limiter.rejected.items()):
+        w.sample(name, n, (("kind", kind), ("scope", scope)))
+    name = f"{PREFIX}_ratelimit_keys"
+    w.declare(name, "gauge", "Ключей в ограничителе частоты")
+    w.sample(name, rate_limiter.metrics()["keys"])
+
+
+def _write_gauges(w: _Writer) -> None:
+    for name, help_text, value in (
+        ("sessions", "Пользователей с состоянием FSM в памяти", state_manager.user_count()),
+        ("timers_active", "Запущенных таймеров теста", TestTimer.active),
+        ("uptime_seconds", "Время работы процесса", time.time() - _STARTED),
+    ):
+        w.declare(f"{PREFIX}_{name}", "gauge", help_text)
+        w.sample(f"{PREFIX}_{name}", value)
+
+
+def render() -> str:
+    """Снимок всех метрик в текстовом формате Prometheus."""
+    w = _Writer()
+    _write_gauges(w)
+    _write_counters(w)
+    _write_components(w)
+    _write_histograms(w)
+    return "\n".join(w.lines) + "\n"
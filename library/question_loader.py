@@ -2,6 +2,7 @@
 library/question_loader.py — Загрузка вопросов из JSON.
 Поддержка вложенных папок + fallback на общий файл.
 """
+import hashlib
 import json
 import logging
 import random
@@ -22,13 +23,9 @@ DIFFICULTY_MAP = {
 }
 
 
-def load_questions_for_specialization(
-    specialization: str,
-    difficulty: Difficulty,
-    user_id: str | None = None
-) -> List[Question]:
+def resolve_question_bank(specialization: str, difficulty: Difficulty) -> Path | None:
     """
-    Загружает и перемешивает вопросы для специализации/уровня.
+    Путь к JSON-банку вопросов для специализации/уровня.
     
     Приоритет путей:
     1. questions/{specialization}/{difficulty}.json
@@ -42,22 +39,53 @@ def load_questions_for_specialization(
     general_path = settings.questions_dir / f"{specialization}.json"
     
     if nested_path.exists():
-        json_path = nested_path
-        logger.info(f"📂 {specialization}/{difficulty_name}.json")
-    elif flat_path.exists():
-        json_path = flat_path
-        logger.info(f"📂 {specialization}_{difficulty_name}.json")
-    elif general_path.exists():
-        json_path = general_path
-        logger.warning(f"📂 Fallback: {specialization}.json")
-    else:
-        logger.error(f"❌ Файл вопросов не найден: {specialization} ({difficulty_name})")
+        logger.info("📂 %s/%s.json", specialization, difficulty_name)
+        return nested_path
+    if flat_path.exists():
+        logger.info("📂 %s_%s.json", specialization, difficulty_name)
+        return flat_path
+    if general_path.exists():
+        logger.warning("📂 Fallback: %s.json", specialization)
+        return general_path
+    logger.error(f"❌ Файл вопросов не найден: {specialization} ({difficulty_name})")
+    return None
+
+
+def _bank_version(raw_bytes: bytes) -> str:
+    # Версия банка — короткий хэш содержимого файла: question_id (индекс в
+    # файле) однозначен только в пределах одной версии.
+    return hashlib.sha1(raw_bytes).hexdigest()[:12]
+
+
+def get_bank_version(specialization: str, difficulty: Difficulty) -> str | None:
+    """Текущая версия банка вопросов (None, если файл недоступен)."""
+    json_path = resolve_question_bank(specialization, difficulty)
+    if json_path is None:
+        return None
+    try:
+        return _bank_version(json_path.read_bytes())
+    except OSError as e:
+        logger.error(f"❌ Ошибка чтения {json_path}: {e}")
+        return None
+
+
+def load_questions_for_specialization(
+    specialization: str,
+    difficulty: Difficulty,
+    user_id: str | None = None
+) -> List[Question]:
+    """
+    Загружает и перемешивает вопросы для специализации/уровня.
+    Порядок поиска файла — см. resolve_question_bank().
+    """
+    json_path = resolve_question_bank(specialization, difficulty)
+    if json_path is None:
         return []
     
     try:
-        with json_path.open("r", encoding="utf-8") as f:
-            raw_data = json.load(f)
-    except (json.JSONDecodeError, PermissionError, OSError) as e:
+        raw_bytes = json_path.read_bytes()
+        raw_data = json.loads(raw_bytes.decode("utf-8"))
+    except (json.JSONDecodeError, UnicodeDecodeError, PermissionError, OSError) as e:
         logger.error(f"❌ Ошибка чтения {json_path}: {e}")
         return []
     
@@ -65,6 +93,8 @@ def load_questions_for_specialization(
         logger.error(f"❌ Неверный формат JSON {json_path}: ожидается список")
         return []
     
+    bank_version = _bank_version(raw_bytes)
+    
     questions = []
     for idx, item in enumerate(raw_data):
         try:
@@ -86,7 +116,9 @@ def load_questions_for_specialization(
                 question=item["question"],
                 options=opts,
                 correct_answers=correct,
-                difficulty=difficulty
+                difficulty=difficulty,
+                question_id=idx,
+                bank_version=bank_version
             )
             q.shuffle_options()
             questions.append(q)
@@ -117,5 +149,5 @@ def load_questions_for_specialization(
     else:
         selected = questions[:target_count]
     
-    logger.info(f"✅ Загружено {len(selected)} вопросов для {specialization} ({difficulty.value})")
+    logger.info("✅ Загружено %d вопросов для %s (%s)", len(selected), specialization, difficulty.value)
     return selected
@@ -0,0 +1,118 @@
+"""
+library/ratelimit.py — Ограничение частоты событий (GCRA).
+
+Состояние ключа — одно число (theoretical arrival time), проверка —
+O(1) без списков отметок времени. Лимиты задаются строкой
+«N/сек» (не больше N событий за сек, всплеск до N) отдельно для
+пользователя, чата и всего бота, и отдельно для сообщений и нажатий.
+Ключи, у которых TAT уже в прошлом, ничем не отличаются от новых и
+периодически удаляются, поэтому память ограничена числом недавно
+активных пользователей.
+"""
+import time
+from collections import Counter
+from typing import Dict, Optional, Tuple
+
+from config.settings import settings
+
+SWEEP_INTERVAL = 60.0  # сек между чистками неактивных ключей
+
+SCOPES = ("user", "chat", "global")
+KINDS = ("message", "callback")
+
+
+def parse_limit(spec: str) -> Tuple[int, float]:
+    """«3/1» → (3 события, 1.0 сек)."""
+    count, _, period = spec.partition("/")
+    return int(count), float(period or 1)
+
+
+class GCRA:
+    """Generic Cell Rate Algorithm: limit событий за period, всплеск до limit."""
+
+    __slots__ = ("interval", "tolerance", "_tat")
+
+    def __init__(self, limit: int, period: float):
+        self.interval = period / limit
+        self.tolerance = period - self.interval
+        self._tat: Dict[str, float] = {}
+
+    def peek(self, key: str, now: float) -> Optional[float]:
+        """Новый TAT, если событие допустимо, иначе None (без изменений)."""
+        tat = max(self._tat.get(key, now), now)
+        if tat - now > self.tolerance:
+            return None
+        return tat + self.interval
+
+    def commit(self, key: str, tat: float) -> None:
+        self._tat[key] = tat
+
+    def sweep(self, now: float) -> int:
+        stale = [k for k, tat in self._tat.items() if tat <= now]
+        for k in stale:
+            del self._tat[k]
+        return len(stale)
+
+    def __len__(self) -> int:
+        return len(self._tat)
+
+
+class RateLimiter:
+    """
+    Проверка события по трём уровням: пользователь → чат → бот.
+    Событие учитывается, только если его пропускают все уровни.
+    """
+
+    def __init__(self):
+        self._buckets: Dict[Tuple[str, str], GCRA] = {}
+        for kind in KINDS:
+            for scope in SCOPES:
+                spec = getattr(settings, f"ratelimit_{scope}_{kind}")
+                if spec:
+                    self._buckets[(scope, kind)] = GCRA(*parse_limit(spec))
+        self._last_sweep = time.monotonic()
+
+        # Метрики: (kind, scope) → отклонено
+        self.rejected: Counter = Counter()
+        self.allowed: Counter = Counter()
+        self.evicted = 0
+
+    def check(self, kind: str, user_id: str, chat_id: str) -> Optional[str]:
+        """
+        None — событие разрешено; иначе уровень, на котором превышен
+        лимит ("user", "chat" или "global").
+        """
+        now = time.monotonic()
+        if now - self._last_sweep > SWEEP_INTERVAL:
+            self._sweep(now)
+
+        pending = []
+        for scope, key in (("user", user_id), ("chat", chat_id), ("global", "*")):
+            bucket = self._buckets.get((scope, kind))
+            if bucket is None or (scope == "chat" and key == user_id):
+                # В личном чате chatId совпадает с userId — уровень чата лишний
+                continue
+            tat = bucket.peek(key, now)
+            if tat is None:
+                self.rejected[(kind, scope)] += 1
+                return scope
+            pending.append((bucket, key, tat))
+        for bucket, key, tat in pending:
+            bucket.commit(key, tat)
+        self.allowed[kind] += 1
+        return None
+
+    def _sweep(self, now: float) -> None:
+        self._last_sweep = now
+        for bucket in self._buckets.values():
+            self.evicted += bucket.sweep(now)
+
+    def metrics(self) -> Dict[str, int]:
+        out = {f"allowed_{k}": v for k, v in self.allowed.items()}
+        out.update({f"rejected_{k}_{s}": v for (k, s), v in self.rejected.items()})
+        out["keys"] = sum(len(b) for b in self._buckets.values())
+        out["evicted"] = self.evicted
+        return out
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,80 @@
+"""
+library/registry.py — Проверка сертификатов по серийному номеру.
+
+Ответы кэшируются в памяти (LRU на settings.verify_cache_size записей),
+промах кэша — один запрос по первичному ключу certificates.
+Ненайденные номера тоже кэшируются на короткое время, чтобы перебор
+номеров не превращался в поток запросов к БД.
+"""
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from config.settings import settings
+from .serials import normalize_serial
+from .stats import stats_manager
+
+logger = logging.getLogger(__name__)
+
+NOT_FOUND_TTL = 60.0  # сек
+
+
+class CertificateRegistry:
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._cache: "OrderedDict[str, Tuple[Optional[Dict], float]]" = OrderedDict()
+
+        # Метрики
+        self.lookups = 0
+        self.cache_hits = 0
+
+    def _put(self, serial: str, record: Optional[Dict]) -> None:
+        self._cache[serial] = (record, time.monotonic())
+        self._cache.move_to_end(serial)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    async def lookup(self, text: str) -> Optional[Dict]:
+        """Запись реестра по номеру в любом написании или None."""
+        self.lookups += 1
+        serial = normalize_serial(text)
+        if serial is None:
+            return None
+
+        cached = self._cache.get(serial)
+        if cached is not None:
+            record, stored_at = cached
+            if record is not None or time.monotonic() - stored_at < NOT_FOUND_TTL:
+                self._cache.move_to_end(serial)
+                self.cache_hits += 1
+                return record
+
+        record = await stats_manager.get_certificate(serial)
+        self._put(serial, record)
+        return record
+
+    def metrics(self) -> Dict[str, int]:
+        return {
+            "size": len(self._cache),
+            "lookups": self.lookups,
+            "cache_hits": self.cache_hits,
+        }
+
+
+registry = CertificateRegistry(settings.verify_cache_size)
+
+
+def format_verification(serial: str, record: Optional[Dict]) -> str:
+    """Текст ответа на /verify."""
+    if record is None:
+        return f"❌ Сертификат <b>{serial}</b> не найден в реестре"
+    issued = str(record["created_at"])[:10]
+    return (
+        f"✅ <b>Сертификат {record['serial']} действителен</b>\n\n"
+        f"👤 {record['full_name']}\n"
+        f"🏢 {record['department']}\n"
+        f"📚 {record['specialization']} ({record['difficulty']})\n"
+        f"📊 {record['grade']} — {record['percentage']:.1f}%\n"
+        f"📅 Выдан: {issued}"
+    )
@@ -1,55 +1,140 @@
 """
 library/reminders.py — Фоновые напоминания для VK Teams.
+
+Неактивные пользователи читаются страницами (keyset по user_id),
+сообщения страницы отправляются параллельно (reminder_concurrency
+запросов), но не чаще reminder_rate в секунду. Доставленные
+отмечаются одним UPDATE-пакетом на страницу.
 """
 import asyncio
 import logging
-from typing import TYPE_CHECKING
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Awaitable, Callable, List, Optional
 
 if TYPE_CHECKING:
     from vk_bot.bot import VKBot
+    from .scheduler import Scheduler
 
+from config.settings import settings
+from .metrics import counters
 from .stats import stats_manager
 
 logger = logging.getLogger(__name__)
 
+PAGE_SIZE = 500
+
+REMINDER_TEXT = (
+    "👋 Привет! Тебя давно не было видно.\n\n"
+    "Не желаешь пройти тест и проверить свои знания?\n\n"
+    "Напиши /start и начни прямо сейчас! 🚀"
+)
+
+
+@dataclass
+class ReminderRun:
+    sent: int = 0
+    failed: int = 0
+    cursor: str = ""      # последний обработанный user_id
+    seconds: float = 0.0
+
+    @property
+    def per_second(self) -> float:
+        return self.sent / self.seconds if self.seconds else 0.0
+
 
-async def reminders_background_task(bot: "VKBot"):
+class _Pacer:
+    """Равномерный темп: не больше rate вызовов wait() в секунду."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = time.monotonic()
+
+    async def wait(self) -> None:
+        now = time.monotonic()
+        slot = max(self._next, now)
+        self._next = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+async def run_reminders(
+    bot: "VKBot",
+    after_user_id: str = "",
+    on_page: Optional[Callable[[ReminderRun], Awaitable[None]]] = None
+) -> ReminderRun:
     """
-    Фоновая задача: раз в 24 ч проверяет неактивных пользователей (7+ дней)
-    и отправляет им напоминание.
+    Один проход рассылки, начиная после after_user_id.
+    on_page вызывается после каждой обработанной страницы (например,
+    чтобы сохранить курсор).
     """
-    CHECK_INTERVAL_HOURS = 24
-    INACTIVE_DAYS = 7
+    threshold = (
+        datetime.now() - timedelta(days=settings.reminder_inactive_days)
+    ).isoformat()
+    run = ReminderRun(cursor=after_user_id)
+    pacer = _Pacer(settings.reminder_rate)
+    slots = asyncio.Semaphore(max(settings.reminder_concurrency, 1))
+    started = time.perf_counter()
 
-    logger.info(
-        f"▶️ Сервис напоминаний запущен "
-        f"(каждые {CHECK_INTERVAL_HOURS}ч, порог {INACTIVE_DAYS} дней)"
-    )
+    async def send(user_id: str) -> bool:
+        async with slots:
+            await pacer.wait()
+            try:
+                resp = await bot.send_text(user_id, REMINDER_TEXT)
+            except Exception as e:
+                logger.warning(f"⚠️ Не удалось отправить {user_id}: {e}")
+                return False
+            return bool(resp and resp.get("ok"))
 
     while True:
-        try:
-            inactive_users = await stats_manager.get_inactive_users(days=INACTIVE_DAYS)
-            if inactive_users:
-                logger.info(f"📨 Неактивных пользователей: {len(inactive_users)}")
-                sent_count = 0
-                for user_id in inactive_users:
-                    try:
-                        message = (
-                            "👋 Привет! Тебя давно не было видно.\n\n"
-                            "Не желаешь пройти тест и проверить свои знания?\n\n"
-                            "Напиши /start и начни прямо сейчас! 🚀"
-                        )
-                        await bot.send_text(user_id, message)
-                        await stats_manager.mark_reminder_sent(user_id)
-                        sent_count += 1
-                        logger.info(f"✅ Напоминание → {user_id}")
-                    except Exception as e:
-                        logger.warning(f"⚠️ Не удалось отправить {user_id}: {e}")
-                    await asyncio.sleep(1)
-                logger.info(f"✅ Напоминаний отправлено: {sent_count}/{len(inactive_users)}")
-            else:
-                logger.debug("ℹ️ Нет неактивных пользователей")
-        except Exception as e:
-            logger.error(f"❌ Ошибка сервиса напоминаний: {e}", exc_info=True)
-        
-        await asyncio.sleep(CHECK_INTERVAL_HOURS * 3600)
+        page = await stats_manager.get_inactive_users_page(
+            threshold, run.cursor, PAGE_SIZE
+        )
+        if not page:
+            break
+        results = await asyncio.gather(*(send(uid) for uid in page))
+        delivered: List[str] = [uid for uid, ok in zip(page, results) if ok]
+        await stats_manager.mark_reminders_sent(delivered)
+
+        run.sent += len(delivered)
+        run.failed += len(page) - len(delivered)
+        counters.inc("reminders_sent_total", len(delivered))
+        counters.inc("reminders_failed_total", len(page) - len(delivered))
+        run.cursor = page[-1]
+        run.seconds = time.perf_counter() - started
+        logger.info(
+            f"📨 Напоминания: отправлено {run.sent}, ошибок {run.failed} "
+            f"({run.per_second:.1f}/с)"
+        )
+        if on_page:
+            await on_page(run)
+
+    run.seconds = time.perf_counter() - started
+    return run
+
+
+def register_reminders(scheduler: "Scheduler", bot: "VKBot") -> None:
+    """Регистрирует рассылку в планировщике (см. scheduler.py)."""
+
+    async def job(cursor: str, checkpoint) -> None:
+        async def on_page(run: ReminderRun) -> None:
+            await checkpoint(run.cursor)
+
+        run = await run_reminders(bot, after_user_id=cursor, on_page=on_page)
+        if run.sent or run.failed:
+            logger.info(
+                f"✅ Напоминаний отправлено: {run.sent}/{run.sent + run.failed} "
+                f"за {run.seconds:.0f}s"
+            )
+        else:
+            logger.debug("ℹ️ Нет неактивных пользователей")
+
+    scheduler.add_job(
+        "reminders", settings.reminder_schedule, job,
+        quiet_hours=settings.reminder_quiet_hours
+    )
+    logger.info(
+        f"▶️ Напоминания: «{settings.reminder_schedule}», "
+        f"порог {settings.reminder_inactive_days} дней"
+    )
@@ -0,0 +1,38 @@
+"""
+library/rollups.py — Периоды для агрегатов results_rollup.
+
+Агрегаты ведутся по зерну «день / неделя / месяц» в разрезе
+(подразделение, специализация, уровень) и пополняются в той же
+транзакции, что и test_results. Периоды считаются в UTC, как
+CURRENT_TIMESTAMP в test_results.
+"""
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+GRAINS = ("day", "week", "month")
+
+FAILED_GRADE = "неудовлетворительно"
+NO_DEPARTMENT = "—"
+
+
+def period_for(grain: str, when: Optional[datetime] = None) -> str:
+    """Ключ периода: 2026-10-19 / 2026-W42 (ISO-неделя) / 2026-10."""
+    when = when or datetime.now(timezone.utc)
+    if grain == "day":
+        return when.strftime("%Y-%m-%d")
+    if grain == "week":
+        year, week, _ = when.isocalendar()
+        return f"{year}-W{week:02d}"
+    if grain == "month":
+        return when.strftime("%Y-%m")
+    raise ValueError(f"Неизвестное зерно агрегации: {grain}")
+
+
+def rollup_periods(when: Optional[datetime] = None) -> List[Tuple[str, str]]:
+    """Пары (зерно, период), в которые попадает результат."""
+    when = when or datetime.now(timezone.utc)
+    return [(grain, period_for(grain, when)) for grain in GRAINS]
+
+
+def normalize_department(department: Optional[str]) -> str:
+    return " ".join((department or "").split()) or NO_DEPARTMENT
@@ -0,0 +1,105 @@
+"""
+library/router.py — Маршрутизация callback-нажатий и текстовых сообщений.
+
+callbackData имеет вид «действие» или «действие_аргумент» (next,
+diff_базовый, ans_3, spec_oupds) — тот же формат, что уже стоит на
+кнопках отправленных сообщений. Маршруты регистрируются один раз при
+старте; compile() проверяет, что каждому callbackData соответствует
+ровно один маршрут, после чего поиск — не больше двух обращений к dict:
+точное совпадение, затем действие до первого «_».
+
+Допустимые состояния FSM задаются у маршрута данными (states, reject),
+а не условиями в диспетчере; состояние читается только для маршрутов
+с такой проверкой.
+"""
+from dataclasses import dataclass, replace
+from typing import Awaitable, Callable, Dict, FrozenSet, Iterable, Optional
+
+Handler = Callable[..., Awaitable[None]]
+
+SEPARATOR = "_"
+
+
+@dataclass(frozen=True)
+class Route:
+    key: str
+    handler: Handler
+    prefix: bool = False                   # «key_аргумент»
+    states: Optional[FrozenSet[str]] = None  # None — в любом состоянии
+    reject: str = "❌ Ошибка состояния"
+
+    def allows(self, state: Optional[str]) -> bool:
+        return self.states is None or state in self.states
+
+
+class Router:
+    def __init__(self):
+        self._exact: Dict[str, Route] = {}
+        self._prefix: Dict[str, Route] = {}
+        self._messages: Dict[str, Handler] = {}
+        self._compiled = False
+
+    # ------------------------------------------------------------------ #
+    # Регистрация
+    # ------------------------------------------------------------------ #
+    def callback(
+        self,
+        key: str,
+        handler: Handler,
+        prefix: bool = False,
+        states: Optional[Iterable[str]] = None,
+        reject: Optional[str] = None
+    ) -> None:
+        """
+        Регистрирует маршрут. prefix=True — key принимает аргумент после
+        «_» (key сам не может содержать «_»). states — состояния FSM, в
+        которых нажатие допустимо; в остальных пользователь получает reject.
+        """
+        if self._compiled:
+            raise RuntimeError("Маршруты уже скомпилированы")
+        table = self._prefix if prefix else self._exact
+        if prefix and SEPARATOR in key:
+            raise ValueError(f"Префикс не может содержать «{SEPARATOR}»: {key!r}")
+        if key in table:
+            raise ValueError(f"Маршрут {key!r} уже зарегистрирован")
+        route = Route(key, handler, prefix, frozenset(states) if states is not None else None)
+        table[key] = route if reject is None else replace(route, reject=reject)
+
+    def message(self, state: str, handler: Handler) -> None:
+        """Текстовый ввод в состоянии state."""
+        if self._compiled:
+            raise RuntimeError("Маршруты уже скомпилированы")
+        if state in self._messages:
+            raise ValueError(f"Обработчик состояния {state!r} уже зарегистрирован")
+        self._messages[state] = handler
+
+    def compile(self) -> "Router":
+        """Проверяет таблицы на неоднозначность и запрещает изменения."""
+        for key in self._exact:
+            head, sep, _ = key.partition(SEPARATOR)
+            if sep and head in self._prefix:
+                raise ValueError(
+                    f"Маршрут {key!r} неоднозначен: совпадает с префиксом {head!r}"
+                )
+        self._compiled = True
+        return self
+
+    # ------------------------------------------------------------------ #
+    # Поиск
+    # ------------------------------------------------------------------ #
+    def resolve(self, data: str) -> Optional[Route]:
+        route = self._exact.get(data)
+        if route is None:
+            head, sep, _ = data.partition(SEPARATOR)
+            if sep:
+                route = self._prefix.get(head)
+        return route
+
+    def for_state(self, state: Optional[str]) -> Optional[Handler]:
+        return self._messages.get(state) if state else None
+
+    def routes(self) -> Dict[str, Route]:
+        """Все маршруты: «key» для точных, «key_*» для префиксных."""
+        out = dict(self._exact)
+        out.update({f"{k}{SEPARATOR}*": r for k, r in self._prefix.items()})
+        return out
@@ -0,0 +1,285 @@
+"""
+library/scheduler.py — Планировщик фоновых задач с хранением в SQLite.
+
+Время следующего запуска и курсор незавершённого прохода хранятся в
+таблице scheduled_jobs, поэтому перезапуск бота не сдвигает
+расписание и не начинает прерванный проход заново.
+
+Правила — подмножество cron: «минута час день месяц день_недели»,
+поддерживаются *, списки (1,3), диапазоны (1-5) и шаг (*/15).
+День недели: 0 или 7 — воскресенье, 1 — понедельник. Время — в
+часовом поясе settings.scheduler_timezone.
+
+Пример: "0 9 * * 1-5" — по будням в 09:00.
+"""
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, time as dt_time, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from zoneinfo import ZoneInfo
+
+import aiosqlite
+
+from config.settings import settings
+from .stats import stats_manager
+
+logger = logging.getLogger(__name__)
+
+# Пропущенный запуск старше этого срока не выполняется «вдогонку»
+MISFIRE_GRACE = timedelta(hours=1)
+# Максимальный сон цикла (чтобы замечать изменения и сдвиг часов)
+MAX_SLEEP = 60.0
+
+Checkpoint = Callable[[str], Awaitable[None]]
+JobFunc = Callable[[str, Checkpoint], Awaitable[None]]
+
+
+class JobPaused(Exception):
+    """Проход остановлен (тихие часы); продолжится с сохранённого курсора."""
+
+
+# ─────────────────────────────────────────────────────────────────────── #
+# Правила расписания
+# ─────────────────────────────────────────────────────────────────────── #
+def _parse_field(spec: str, lo: int, hi: int) -> Set[int]:
+    values: Set[int] = set()
+    for part in spec.split(","):
+        rng, _, step = part.partition("/")
+        if rng == "*":
+            start, end = lo, hi
+        elif "-" in rng:
+            a, b = rng.split("-", 1)
+            start, end = int(a), int(b)
+        else:
+            start = end = int(rng)
+            if step:
+                end = hi
+        if start < lo or end > hi or start > end:
+            raise ValueError(f"Значение вне диапазона {lo}-{hi}: {part}")
+        values.update(range(start, end + 1, int(step) if step else 1))
+    return values
+
+
+class CronRule:
+    """Правило «минута час день месяц день_недели»."""
+
+    def __init__(self, expr: str):
+        parts = expr.split()
+        if len(parts) != 5:
+            raise ValueError(f"Ожидается 5 полей cron: {expr!r}")
+        self.expr = expr
+        self.minutes = sorted(_parse_field(parts[0], 0, 59))
+        self.hours = sorted(_parse_field(parts[1], 0, 23))
+        self.days = _parse_field(parts[2], 1, 31)
+        self.months = _parse_field(parts[3], 1, 12)
+        self.weekdays = {d % 7 for d in _parse_field(parts[4], 0, 7)}
+        # Как в cron: если заданы и день месяца, и день недели — подходит любой
+        self._dom_any = parts[2] == "*"
+        self._dow_any = parts[4] == "*"
+
+    def _day_matches(self, d: datetime) -> bool:
+        if d.month not in self.months:
+            return False
+        dom = d.day in self.days
+        dow = d.isoweekday() % 7 in self.weekdays
+        if self._dom_any or self._dow_any:
+            return dom and dow
+        return dom or dow
+
+    def next_after(self, after: datetime) -> datetime:
+        """Ближайшее время срабатывания строго после after (aware datetime)."""
+        tz = after.tzinfo
+        start = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        day = start.replace(hour=0, minute=0)
+        for _ in range(366 * 5):
+            if self._day_matches(day):
+                for h in self.hours:
+                    for m in self.minutes:
+                        candidate = datetime.combine(day.date(), dt_time(h, m), tz)
+                        if candidate >= start:
+                            return candidate
+            day += timedelta(days=1)
+        raise ValueError(f"Правило не срабатывает: {self.expr}")
+
+
+def parse_quiet_hours(spec: str) -> Optional[Tuple[dt_time, dt_time]]:
+    """«21:00-09:00» → (21:00, 09:00); пустая строка — без тихих часов."""
+    if not spec:
+        return None
+    a, b = spec.split("-", 1)
+    return dt_time.fromisoformat(a.strip()), dt_time.fromisoformat(b.strip())
+
+
+def quiet_until(now: datetime, quiet: Optional[Tuple[dt_time, dt_time]]) -> Optional[datetime]:
+    """Конец тихих часов, если now в них попадает, иначе None."""
+    if quiet is None:
+        return None
+    start, end = quiet
+    t = now.timetz().replace(tzinfo=None)
+    if start <= end:
+        inside = start <= t < end
+    else:  # через полночь
+        inside = t >= start or t < end
+    if not inside:
+        return None
+    until = datetime.combine(now.date(), end, now.tzinfo)
+    return until if until > now else until + timedelta(days=1)
+
+
+# ─────────────────────────────────────────────────────────────────────── #
+# Планировщик
+# ─────────────────────────────────────────────────────────────────────── #
+@dataclass
+class Job:
+    name: str
+    rule: CronRule
+    func: JobFunc
+    quiet: Optional[Tuple[dt_time, dt_time]] = None
+    next_run: Optional[datetime] = None
+    cursor: str = ""
+    running: bool = field(default=False)
+
+
+def _to_db(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).isoformat()
+
+
+def _from_db(value: str) -> datetime:
+    return datetime.fromisoformat(value)
+
+
+class Scheduler:
+    def __init__(self):
+        self._jobs: Dict[str, Job] = {}
+        self.tz = ZoneInfo(settings.scheduler_timezone)
+
+    def now(self) -> datetime:
+        return datetime.now(self.tz)
+
+    def add_job(
+        self,
+        name: str,
+        rule: str,
+        func: JobFunc,
+        quiet_hours: str = ""
+    ) -> None:
+        """
+        Регистрирует задачу. func(cursor, checkpoint) получает курсор
+        прерванного прохода ("" — с начала) и вызывает checkpoint(cursor)
+        после каждой порции работы.
+        """
+        self._jobs[name] = Job(name, CronRule(rule), func, parse_quiet_hours(quiet_hours))
+
+    # ------------------------------------------------------------------ #
+    # Хранение
+    # ------------------------------------------------------------------ #
+    async def _load(self) -> None:
+        async with aiosqlite.connect(stats_manager.db_path) as db:
+            for job in self._jobs.values():
+                cursor = await db.execute(
+                    "SELECT rule, next_run, cursor FROM scheduled_jobs WHERE name = ?",
+                    (job.name,)
+                )
+                row = await cursor.fetchone()
+                now = self.now()
+                job.cursor = (row[2] or "") if row else ""
+                if row is None or row[0] != job.rule.expr:
+                    # Новая задача или изменённое правило — считаем заново
+                    job.next_run = job.rule.next_after(now)
+                else:
+                    job.next_run = _from_db(row[1]).astimezone(self.tz)
+                    if not job.cursor and now - job.next_run > MISFIRE_GRACE:
+                        logger.info(f"⏭ [{job.name}] пропущен запуск {job.next_run:%d.%m %H:%M}")
+                        job.next_run = job.rule.next_after(now)
+                if job.cursor:
+                    job.next_run = min(job.next_run, now)  # дочитать прерванный проход
+                await self._save(db, job)
+            await db.commit()
+
+    async def _save(self, db: aiosqlite.Connection, job: Job, finished: bool = False) -> None:
+        await db.execute("""
+            INSERT INTO scheduled_jobs (name, rule, next_run, cursor, last_run)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (name) DO UPDATE SET
+                rule = excluded.rule,
+                next_run = excluded.next_run,
+                cursor = excluded.cursor,
+                last_run = COALESCE(excluded.last_run, last_run)
+        """, (
+            job.name, job.rule.expr, _to_db(job.next_run), job.cursor,
+            _to_db(self.now()) if finished else None
+        ))
+
+    async def _persist(self, job: Job, finished: bool = False) -> None:
+        async with aiosqlite.connect(stats_manager.db_path) as db:
+            await self._save(db, job, finished)
+            await db.commit()
+
+    # ------------------------------------------------------------------ #
+    # Выполнение
+    # ------------------------------------------------------------------ #
+    async def _run(self, job: Job) -> None:
+        async def checkpoint(cursor: str) -> None:
+            job.cursor = cursor
+            until = quiet_until(self.now(), job.quiet)
+            if until is not None:
+                job.next_run = until
+                await self._persist(job)
+                raise JobPaused(until)
+            await self._persist(job)
+
+        resumed = bool(job.cursor)
+        logger.info(
+            f"▶️ [{job.name}] запуск" + (f" (продолжение с {job.cursor})" if resumed else "")
+        )
+        job.running = True
+        try:
+            await job.func(job.cursor, checkpoint)
+        except JobPaused as e:
+            logger.info(f"⏸ [{job.name}] тихие часы, продолжение в {e.args[0]:%H:%M}")
+            return
+        except Exception as e:
+            # Курсор сохранён — следующая попытка продолжит с него
+            logger.error(f"❌ [{job.name}] ошибка: {e}", exc_info=True)
+            job.next_run = self.now() + timedelta(minutes=5)
+            await self._persist(job)
+            return
+        finally:
+            job.running = False
+
+        job.cursor = ""
+        job.next_run = job.rule.next_after(self.now())
+        await self._persist(job, finished=True)
+        logger.info(f"✅ [{job.name}] завершено, следующий запуск {job.next_run:%d.%m %H:%M}")
+
+    def _defer_for_quiet(self, job: Job) -> bool:
+        until = quiet_until(self.now(), job.quiet)
+        if until is None:
+            return False
+        job.next_run = until
+        return True
+
+    async def run_forever(self) -> None:
+        await self._load()
+        for job in self._jobs.values():
+            logger.info(f"🗓 [{job.name}] «{job.rule.expr}», следующий запуск {job.next_run:%d.%m %H:%M}")
+        while True:
+            now = self.now()
+            for job in self._jobs.values():
+                if job.next_run <= now and not job.running:
+                    if self._defer_for_quiet(job):
+                        await self._persist(job)
+                        continue
+                    await self._run(job)
+            nearest = min(j.next_run for j in self._jobs.values()) if self._jobs else None
+            delay = MAX_SLEEP
+            if nearest is not None:
+                delay = min(max((nearest - self.now()).total_seconds(), 0.0), MAX_SLEEP)
+            await asyncio.sleep(delay)
+
+    def jobs(self) -> List[Job]:
+        return list(self._jobs.values())
+
+
+scheduler = Scheduler()
@@ -0,0 +1,28 @@
+"""
+library/serials.py — Серийные номера сертификатов.
+
+Номер — 8 символов алфавита Crockford Base32 (40 бит случайности),
+печатается как XXXX-XXXX. Алфавит без I, L, O, U, поэтому номер
+легко продиктовать и переписать с бумаги; при вводе O читается как 0,
+а I и L — как 1.
+"""
+import secrets
+from typing import Optional
+
+ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+SERIAL_LENGTH = 8
+
+_READ_AS = str.maketrans({"O": "0", "I": "1", "L": "1"})
+
+
+def new_serial() -> str:
+    raw = "".join(secrets.choice(ALPHABET) for _ in range(SERIAL_LENGTH))
+    return f"{raw[:4]}-{raw[4:]}"
+
+
+def normalize_serial(text: str) -> Optional[str]:
+    """Приводит введённый номер к виду XXXX-XXXX или возвращает None."""
+    raw = "".join(ch for ch in text.upper() if ch.isalnum()).translate(_READ_AS)
+    if len(raw) != SERIAL_LENGTH or any(ch not in ALPHABET for ch in raw):
+        return None
+    return f"{raw[:4]}-{raw[4:]}"
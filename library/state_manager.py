@@ -3,7 +3,7 @@ library/state_manager.py — In-memory FSM для VK Teams бота.
 Заменяет aiogram FSMContext. Thread-safe через asyncio.Lock.
 """
 import logging
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, List, Optional
 import asyncio
 
 logger = logging.getLogger(__name__)
@@ -28,6 +28,7 @@ class StateManager:
     def __init__(self):
         self._store: Dict[str, UserState] = {}
         self._lock = asyncio.Lock()
+        self._clear_listeners: List[Callable[[str], None]] = []
     
     def _get_or_create(self, user_id: str) -> UserState:
         if user_id not in self._store:
@@ -59,6 +60,15 @@ class StateManager:
         async with self._lock:
             if user_id in self._store:
                 del self._store[user_id]
+        for listener in self._clear_listeners:
+            try:
+                listener(user_id)
+            except Exception as e:
+                logger.error("❌ Ошибка обработчика очистки состояния: %s", e)
+    
+    def add_clear_listener(self, listener: Callable[[str], None]) -> None:
+        """Подписаться на очистку состояния пользователя (sync-колбэк)."""
+        self._clear_listeners.append(listener)
     
     def user_count(self) -> int:
         """Количество пользователей с активным состоянием."""
@@ -3,24 +3,53 @@ library/stats.py — Управление статистикой (SQLite).
 Идентичен Telegram-версии.
 """
 import aiosqlite
+import asyncio
 import logging
-from datetime import datetime, timedelta
-from typing import List, Dict
+from datetime import datetime, timezone
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 
 from config.settings import settings
 from .models import CurrentTestState
+from .answer_codec import encode_answers, bank_version_of
+from .percentiles import ScoreHistograms, period_key
+from .serials import new_serial
+from .metrics import timed
+from .rollups import (
+    GRAINS, FAILED_GRADE, rollup_periods, period_for, normalize_department
+)
 
 logger = logging.getLogger(__name__)
 
+RESULT_COLUMNS = (
+    "id", "user_id", "full_name", "position", "department",
+    "specialization", "difficulty", "grade", "correct_count",
+    "total_questions", "percentage", "elapsed_time", "created_at",
+)
+
+_ROLLUP_UPSERT = """
+    INSERT INTO results_rollup (
+        grain, period, department, specialization, difficulty,
+        tests, passed, sum_percentage, best_percentage
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (grain, period, department, specialization, difficulty) DO UPDATE SET
+        tests = tests + excluded.tests,
+        passed = passed + excluded.passed,
+        sum_percentage = sum_percentage + excluded.sum_percentage,
+        best_percentage = MAX(best_percentage, excluded.best_percentage)
+"""
+
 
 class StatsManager:
     DB_PATH = settings.data_dir / "stats.db"
 
     def __init__(self):
         self.db_path = self.DB_PATH
+        self.histograms = ScoreHistograms()
 
     async def init_db(self):
         async with aiosqlite.connect(self.db_path) as db:
+            # WAL: длинные чтения (выгрузки, аналитика) не блокируют запись
+            await db.execute("PRAGMA journal_mode=WAL")
             await db.execute("""
                 CREATE TABLE IF NOT EXISTS test_results (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -46,24 +75,148 @@ class StatsManager:
                     reminder_sent BOOLEAN DEFAULT 0
                 )
             """)
+            # Частичный индекс: обход ещё не напомненных без скана всей таблицы
+            await db.execute("""
+                CREATE INDEX IF NOT EXISTS idx_activity_pending
+                ON user_activity (user_id) WHERE reminder_sent = 0
+            """)
+            # Поответные данные: один BLOB на тест (см. answer_codec),
+            # result_id совпадает с test_results.id
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS test_answers (
+                    result_id INTEGER PRIMARY KEY,
+                    bank_version TEXT,
+                    answers BLOB NOT NULL
+                )
+            """)
+            await db.execute("""
+                CREATE INDEX IF NOT EXISTS idx_test_answers_bank
+                ON test_answers (bank_version, result_id)
+            """)
+            # Агрегаты для рейтингов подразделений (см. rollups.py)
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS results_rollup (
+                    grain TEXT NOT NULL,
+                    period TEXT NOT NULL,
+                    department TEXT NOT NULL,
+                    specialization TEXT NOT NULL,
+                    difficulty TEXT NOT NULL,
+                    tests INTEGER NOT NULL,
+                    passed INTEGER NOT NULL,
+                    sum_percentage REAL NOT NULL,
+                    best_percentage REAL NOT NULL,
+                    PRIMARY KEY (grain, period, department, specialization, difficulty)
+                ) WITHOUT ROWID
+            """)
+            # Реестр выданных сертификатов: поиск по серийному номеру
+            # (первичный ключ) и по результату (уникальный индекс)
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS certificates (
+                    serial TEXT PRIMARY KEY,
+                    result_id INTEGER NOT NULL UNIQUE
+                ) WITHOUT ROWID
+            """)
+            # Расписание фоновых задач (см. scheduler.py)
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS scheduled_jobs (
+                    name TEXT PRIMARY KEY,
+                    rule TEXT NOT NULL,
+                    next_run TEXT NOT NULL,
+                    cursor TEXT NOT NULL DEFAULT '',
+                    last_run TEXT
+                )
+            """)
+            # Отложенные удаления/правки сообщений (см. deferred.py)
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS deferred_actions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    due REAL NOT NULL,
+                    kind TEXT NOT NULL,
+                    chat_id TEXT NOT NULL,
+                    msg_id TEXT NOT NULL,
+                    payload TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0
+                )
+            """)
             await db.commit()
+            await self._backfill_rollups(db)
             logger.info("✅ База данных инициализирована")
 
-    async def save_result(self, user_id: str, test_state: CurrentTestState):
+    async def _backfill_rollups(self, db: aiosqlite.Connection):
+        """Однократно заполняет results_rollup по существующей истории."""
+        cursor = await db.execute("SELECT 1 FROM results_rollup LIMIT 1")
+        if await cursor.fetchone():
+            return
+        cursor = await db.execute("SELECT 1 FROM test_results LIMIT 1")
+        if not await cursor.fetchone():
+            return
+
+        acc: Dict[Tuple, List] = {}
+        last_id = 0
+        while True:
+            cursor = await db.execute("""
+                SELECT id, department, specialization, difficulty, grade,
+                       percentage, created_at
+                FROM test_results WHERE id > ? ORDER BY id LIMIT 5000
+            """, (last_id,))
+            rows = await cursor.fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            for _, dept, spec, diff, grade, pct, created_at in rows:
+                when = datetime.fromisoformat(created_at)
+                dept = normalize_department(dept)
+                for grain, period in rollup_periods(when):
+                    a = acc.setdefault((grain, period, dept, spec, diff), [0, 0, 0.0, 0.0])
+                    a[0] += 1
+                    a[1] += grade != FAILED_GRADE
+                    a[2] += pct
+                    a[3] = max(a[3], pct)
+
+        await db.executemany(_ROLLUP_UPSERT, [key + tuple(v) for key, v in acc.items()])
+        await db.commit()
+        logger.info(f"✅ Агрегаты рейтингов построены по истории ({len(acc)} строк)")
+
+    @timed("db")
+    async def save_result(self, user_id: str, test_state: CurrentTestState) -> int:
+        """Сохраняет результат теста и возвращает его id в test_results."""
+        # Тот же формат, что у CURRENT_TIMESTAMP; дата выдачи сертификата
+        # берётся отсюда и не зависит от дня, когда его запросили
+        test_state.created_at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
         async with aiosqlite.connect(self.db_path) as db:
-            await db.execute("""
+            cursor = await db.execute("""
                 INSERT INTO test_results (
                     user_id, full_name, position, department,
                     specialization, difficulty, grade,
-                    correct_count, total_questions, percentage, elapsed_time
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    correct_count, total_questions, percentage, elapsed_time,
+                    created_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, (
                 user_id, test_state.full_name, test_state.position,
                 test_state.department, test_state.specialization,
                 test_state.difficulty.value, test_state.grade,
                 test_state.correct_count, test_state.total_questions,
-                test_state.percentage, test_state.elapsed_time
+                test_state.percentage, test_state.elapsed_time,
+                test_state.created_at
             ))
+            if settings.store_answers:
+                await db.execute("""
+                    INSERT INTO test_answers (result_id, bank_version, answers)
+                    VALUES (?, ?, ?)
+                """, (
+                    cursor.lastrowid, bank_version_of(test_state),
+                    encode_answers(test_state)
+                ))
+            department = normalize_department(test_state.department)
+            passed = int(test_state.grade != FAILED_GRADE)
+            await db.executemany(_ROLLUP_UPSERT, [
+                (grain, period, department, test_state.specialization,
+                 test_state.difficulty.value, 1, passed,
+                 test_state.percentage, test_state.percentage)
+                for grain, period in rollup_periods()
+            ])
+            test_state.result_id = cursor.lastrowid
+            test_state.cert_serial = await self._issue_serial(db, cursor.lastrowid)
             await db.execute("""
                 INSERT OR REPLACE INTO user_activity (user_id, last_activity, test_count, reminder_sent)
                 VALUES (
@@ -74,8 +227,211 @@ class StatsManager:
                 )
             """, (user_id, datetime.now().isoformat(), user_id))
             await db.commit()
+            self.histograms.add(
+                test_state.specialization, test_state.difficulty.value,
+                test_state.percentage
+            )
             logger.info(f"✅ Результат сохранён для {user_id}")
+            return cursor.lastrowid
+
+    @staticmethod
+    async def _issue_serial(db: aiosqlite.Connection, result_id: int) -> str:
+        """Выдаёт уникальный серийный номер (в транзакции вызывающего)."""
+        while True:
+            serial = new_serial()
+            cursor = await db.execute(
+                "INSERT OR IGNORE INTO certificates (serial, result_id) VALUES (?, ?)",
+                (serial, result_id)
+            )
+            if cursor.rowcount:
+                return serial
 
+    @timed("db")
+    async def ensure_serials(self, result_ids: List[int]) -> Dict[int, str]:
+        """Серийные номера для результатов; недостающие выдаются сейчас."""
+        if not result_ids:
+            return {}
+        async with aiosqlite.connect(self.db_path) as db:
+            marks = ", ".join("?" * len(result_ids))
+            cursor = await db.execute(
+                f"SELECT result_id, serial FROM certificates WHERE result_id IN ({marks})",
+                result_ids
+            )
+            serials = dict(await cursor.fetchall())
+            missing = [rid for rid in result_ids if rid not in serials]
+            for rid in missing:
+                serials[rid] = await self._issue_serial(db, rid)
+            if missing:
+                await db.commit()
+            return serials
+
+    @timed("db")
+    async def get_certificate(self, serial: str) -> Optional[Dict]:
+        """Запись реестра с данными результата или None."""
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute("""
+                SELECT c.serial, r.id AS result_id, r.full_name, r.department,
+                       r.specialization, r.difficulty, r.grade, r.percentage,
+                       r.created_at
+                FROM certificates c
+                JOIN test_results r ON r.id = c.result_id
+                WHERE c.serial = ?
+            """, (serial,))
+            row = await cursor.fetchone()
+            return dict(row) if row else None
+
+    def get_percentile(self, test_state: CurrentTestState) -> Optional[float]:
+        """
+        «Лучше, чем X% коллег» в той же специализации/уровне.
+        Считается по in-memory гистограммам, без запроса к БД.
+        """
+        return self.histograms.percentile(
+            test_state.specialization, test_state.difficulty.value,
+            test_state.percentage,
+            period=period_key(settings.percentile_period),
+            min_samples=settings.percentile_min_samples
+        )
+
+    @timed("db")
+    async def reconcile_histograms(self):
+        """Пересобирает гистограммы результатов по test_results."""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute("""
+                SELECT specialization, difficulty,
+                       strftime('%Y-%m', created_at) AS month,
+                       CAST(percentage AS INTEGER) AS bin,
+                       COUNT(*)
+                FROM test_results
+                GROUP BY specialization, difficulty, month, bin
+            """)
+            rows = await cursor.fetchall()
+        # Результаты, сохранённые во время запроса, могут учесться дважды
+        # или не учесться — это исправит следующая сверка.
+        self.histograms.replace(rows)
+        logger.info(f"✅ Гистограммы результатов сверены с БД ({len(rows)} корзин)")
+
+    @timed("db")
+    async def get_leaderboard(
+        self,
+        grain: str = "week",
+        period: Optional[str] = None,
+        specialization: Optional[str] = None,
+        difficulty: Optional[str] = None,
+        group_by: str = "department",
+        limit: int = 10
+    ) -> List[Dict]:
+        """
+        Рейтинг по агрегатам results_rollup (test_results не читается).
+        group_by: "department" или "specialization".
+        """
+        if grain not in GRAINS:
+            raise ValueError(f"Неизвестное зерно агрегации: {grain}")
+        if group_by not in ("department", "specialization"):
+            raise ValueError(f"Неизвестная группировка: {group_by}")
+        period = period or period_for(grain)
+
+        where = "grain = ? AND period = ?"
+        params: List = [grain, period]
+        if specialization:
+            where += " AND specialization = ?"
+            params.append(specialization)
+        if difficulty:
+            where += " AND difficulty = ?"
+            params.append(difficulty)
+        params.append(limit)
+
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute(f"""
+                SELECT {group_by} AS name,
+                       SUM(tests) AS tests,
+                       SUM(passed) AS passed,
+                       SUM(sum_percentage) / SUM(tests) AS avg_percentage,
+                       MAX(best_percentage) AS best_percentage
+                FROM results_rollup
+                WHERE {where}
+                GROUP BY {group_by}
+                ORDER BY avg_percentage DESC, tests DESC
+                LIMIT ?
+            """, params)
+            return [dict(r) for r in await cursor.fetchall()]
+
+    @staticmethod
+    def _results_filter(
+        date_from: Optional[str],
+        date_to: Optional[str],
+        department: Optional[str],
+        specialization: Optional[str]
+    ) -> Tuple[str, List]:
+        """Условие WHERE (без id) и параметры для фильтров выгрузки."""
+        where = ""
+        params: List = []
+        if date_from:
+            where += " AND created_at >= ?"
+            params.append(date_from)
+        if date_to:
+            where += " AND created_at < date(?, '+1 day')"
+            params.append(date_to)
+        if department:
+            where += " AND department = ?"
+            params.append(department)
+        if specialization:
+            where += " AND specialization = ?"
+            params.append(specialization)
+        return where, params
+
+    @timed("db")
+    async def count_results(
+        self,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        department: Optional[str] = None,
+        specialization: Optional[str] = None
+    ) -> int:
+        """Число строк test_results под фильтрами iter_results."""
+        where, params = self._results_filter(date_from, date_to, department, specialization)
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(
+                f"SELECT COUNT(*) FROM test_results WHERE 1 = 1{where}", params
+            )
+            (count,) = await cursor.fetchone()
+            return count
+
+    async def iter_results(
+        self,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        department: Optional[str] = None,
+        specialization: Optional[str] = None,
+        page_size: int = 1000
+    ) -> AsyncIterator[List[Tuple]]:
+        """
+        Страницы строк test_results по возрастанию id (keyset-пагинация).
+        Каждая страница — отдельный короткий запрос, поэтому длинная
+        выгрузка не держит транзакцию чтения.
+        date_from / date_to — даты YYYY-MM-DD включительно (UTC).
+        """
+        where, params = self._results_filter(date_from, date_to, department, specialization)
+
+        last_id = 0
+        async with aiosqlite.connect(self.db_path) as db:
+            while True:
+                cursor = await db.execute(f"""
+                    SELECT {", ".join(RESULT_COLUMNS)}
+                    FROM test_results
+                    WHERE id > ?{where}
+                    ORDER BY id
+                    LIMIT ?
+                """, (last_id, *params, page_size))
+                rows = await cursor.fetchall()
+                await cursor.close()
+                if not rows:
+                    return
+                yield rows
+                last_id = rows[-1][0]
+
+    @timed("db")
     async def get_user_stats(self, user_id: str) -> Dict:
         async with aiosqlite.connect(self.db_path) as db:
             db.row_factory = aiosqlite.Row
@@ -102,6 +458,7 @@ class StatsManager:
                 "recent_tests": [dict(r) for r in recent]
             }
 
+    @timed("db")
     async def update_user_activity(self, user_id: str):
         async with aiosqlite.connect(self.db_path) as db:
             await db.execute("""
@@ -115,22 +472,81 @@ class StatsManager:
             """, (user_id, datetime.now().isoformat(), user_id))
             await db.commit()
 
-    async def get_inactive_users(self, days: int = 7) -> List[str]:
-        threshold = (datetime.now() - timedelta(days=days)).isoformat()
+    @timed("db")
+    async def get_inactive_users_page(
+        self,
+        threshold: str,
+        after_user_id: str = "",
+        limit: int = 500
+    ) -> List[str]:
+        """
+        Неактивные с threshold (ISO-время) пользователи без напоминания.
+        Keyset-пагинация по user_id: страница — отдельный короткий запрос.
+        """
         async with aiosqlite.connect(self.db_path) as db:
             cursor = await db.execute("""
                 SELECT user_id FROM user_activity
-                WHERE last_activity < ? AND reminder_sent = 0
-            """, (threshold,))
+                WHERE reminder_sent = 0 AND user_id > ? AND last_activity < ?
+                ORDER BY user_id
+                LIMIT ?
+            """, (after_user_id, threshold, limit))
             rows = await cursor.fetchall()
             return [row[0] for row in rows]
 
-    async def mark_reminder_sent(self, user_id: str):
+    @timed("db")
+    async def mark_reminders_sent(self, user_ids: List[str]):
+        """Отмечает напоминания одной транзакцией."""
+        if not user_ids:
+            return
         async with aiosqlite.connect(self.db_path) as db:
-            await db.execute("""
-                UPDATE user_activity SET reminder_sent = 1 WHERE user_id = ?
-            """, (user_id,))
+            await db.executemany(
+                "UPDATE user_activity SET reminder_sent = 1 WHERE user_id = ?",
+                [(uid,) for uid in user_ids]
+            )
             await db.commit()
 
+    async def iter_answer_chunks(
+        self,
+        specialization: str,
+        difficulty: str,
+        bank_version: str,
+        after_id: int = 0,
+        chunk_size: int = 5000
+    ) -> AsyncIterator[List[Tuple[int, bytes]]]:
+        """
+        Порции (result_id, answers) из test_answers по возрастанию result_id.
+        Keyset-пагинация: каждая порция — отдельный короткий запрос.
+        Уровень учитывается отдельно: при fallback на общий файл у разных
+        уровней одна версия банка.
+        """
+        async with aiosqlite.connect(self.db_path) as db:
+            while True:
+                cursor = await db.execute("""
+                    SELECT a.result_id, a.answers
+                    FROM test_answers a
+                    JOIN test_results r ON r.id = a.result_id
+                    WHERE a.bank_version = ? AND a.result_id > ?
+                      AND r.specialization = ? AND r.difficulty = ?
+                    ORDER BY a.result_id
+                    LIMIT ?
+                """, (bank_version, after_id, specialization, difficulty, chunk_size))
+                rows = await cursor.fetchall()
+                await cursor.close()
+                if not rows:
+                    return
+                yield rows
+                after_id = rows[-1][0]
+
 
 stats_manager = StatsManager()
+
+
+async def histograms_reconcile_task():
+    """Фоновая задача: периодическая сверка гистограмм с БД."""
+    interval = settings.percentile_reconcile_minutes * 60
+    while True:
+        try:
+            await stats_manager.reconcile_histograms()
+        except Exception as e:
+            logger.error(f"❌ Ошибка сверки гистограмм: {e}", exc_info=True)
+        await asyncio.sleep(interval)
@@ -8,12 +8,15 @@ import time
 from typing import Callable, Awaitable
 
 from .enum import Difficulty
+from .metrics import counters
 from config.settings import settings
 
 logger = logging.getLogger(__name__)
 
 
 class TestTimer:
+    active = 0  # запущенных и ещё не завершённых таймеров (для метрик)
+
     def __init__(self, duration_minutes: int, timeout_callback: Callable[[], Awaitable[None]]):
         self.duration_seconds = duration_minutes * 60
         self.timeout_callback = timeout_callback
@@ -25,7 +28,8 @@ class TestTimer:
         try:
             await asyncio.sleep(self.duration_seconds)
             if not self._cancelled:
-                logger.info(f"⏰ Таймер истёк ({self.duration_seconds}s)")
+                logger.info("⏰ Таймер истёк (%ds)", self.duration_seconds)
+                counters.inc("timers_expired_total")
                 await self.timeout_callback()
         except asyncio.CancelledError:
             raise
@@ -35,12 +39,21 @@ class TestTimer:
             return
         self.start_time = time.time()
         self.task = asyncio.create_task(self._run())
-        logger.info(f"▶️ Таймер запущен на {self.duration_seconds // 60} мин")
+        TestTimer.active += 1
+        self.task.add_done_callback(TestTimer._finished)
+        logger.info("▶️ Таймер запущен на %d мин", self.duration_seconds // 60)
+
+    @staticmethod
+    def _finished(task: asyncio.Task) -> None:
+        TestTimer.active -= 1
 
     def stop(self):
         if self.task and not self.task.done():
             self._cancelled = True
-            self.task.cancel()
+            # Из timeout_callback (finish_test) задачу не отменяем: иначе
+            # CancelledError прервёт сохранение результата
+            if asyncio.current_task() is not self.task:
+                self.task.cancel()
 
     def remaining_time(self) -> str:
         if self.start_time is None:
@@ -0,0 +1,276 @@
+"""
+library/tracing.py — Трассировка обработки событий.
+
+На каждое событие polling создаётся трасса (корневой спан), текущий спан
+хранится в contextvars и наследуется всеми корутинами задачи. Вложенные
+спаны открываются вокруг вызовов Bot API (VKBot._get, _post_multipart)
+и методов StatsManager (декоратор metrics.timed), так что по trace_id
+видно, какие editText, answerCallbackQuery и записи в SQLite вызвало
+одно нажатие.
+
+Решение о сохранении принимается в конце трассы (tail sampling):
+сохраняются трассы дольше trace_slow_ms, трассы с ошибкой и доля
+trace_sample_rate остальных. Сохранённые трассы пишутся фоновым потоком
+в logs/traces.jsonl — по строке на трассу в формате OTLP/JSON
+(resourceSpans), который читают OpenTelemetry Collector (filelog/otlpjson)
+и Jaeger.
+
+Записи лога внутри трассы получают атрибут trace_id (в JSON-логе — поле),
+по которому их можно найти рядом с трассой.
+
+Вне трассы span() ничего не делает, поэтому фоновые задачи и бенчмарки
+не платят за трассировку.
+"""
+import json
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import QueueListener, RotatingFileHandler
+from typing import Any, Awaitable, Dict, Iterator, List, Optional
+
+from config.log_handlers import BoundedQueueHandler
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "fssp-test-bot"
+MAX_SPANS = 256            # на трассу; лишние спаны не записываются
+STATUS_OK, STATUS_ERROR = 1, 2
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "start_ns", "end_ns", "attrs", "error")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: str, attrs: Dict[str, Any]):
+        self.trace = trace
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attrs = attrs
+        self.error: Optional[str] = None
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    def fail(self, error: Any) -> None:
+        self.error = str(error) or type(error).__name__
+        self.trace.failed = True
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or time.time_ns()),
+            "attributes": [_attr(k, v) for k, v in self.attrs.items()],
+            "status": {"code": STATUS_ERROR, "message": self.error} if self.error
+            else {"code": STATUS_OK},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class Trace:
+    __slots__ = ("trace_id", "spans", "failed", "dropped")
+
+    def __init__(self):
+        self.trace_id = f"{random.getrandbits(128):032x}"
+        self.spans: List[Span] = []
+        self.failed = False
+        self.dropped = 0
+
+    @property
+    def root(self) -> Span:
+        return self.spans[0]
+
+    @property
+    def duration(self) -> float:
+        root = self.root
+        return ((root.end_ns or time.time_ns()) - root.start_ns) / 1e9
+
+
+def _attr(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+_current: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class Tracer:
+    def __init__(self):
+        self.enabled = settings.trace_enabled
+        self.slow = settings.trace_slow_ms / 1000
+        self.sample_rate = settings.trace_sample_rate
+        self._handler: Optional[BoundedQueueHandler] = None
+        self._listener: Optional[QueueListener] = None
+        self._sink = logging.getLogger("traces")
+        self._sink.propagate = False
+
+        # Метрики
+        self.started = 0
+        self.exported = 0
+
+    # ------------------------------------------------------------------ #
+    # Lifecycle
+    # ------------------------------------------------------------------ #
+    def start(self) -> None:
+        """Открывает файл трасс (фоновый поток записи)."""
+        if not self.enabled or self._listener is not None:
+            return
+        settings.logs_dir.mkdir(parents=True, exist_ok=True)
+        path = settings.logs_dir / "traces.jsonl"
+        file_handler = RotatingFileHandler(
+            path, encoding="utf-8",
+            maxBytes=settings.trace_max_mb * 1024 * 1024, backupCount=2
+        )
+        file_handler.setFormatter(TraceFormatter())
+        self._handler = BoundedQueueHandler(settings.log_queue_size)
+        self._sink.handlers[:] = [self._handler]
+        self._sink.setLevel(logging.INFO)
+        self._listener = QueueListener(self._handler.queue, file_handler)
+        self._listener.start()
+        for handler in logging.getLogger().handlers:
+            handler.addFilter(TraceIdFilter())
+        logger.info(
+            f"✅ Трассировка: {path.name}, медленнее {settings.trace_slow_ms:.0f} ms "
+            f"+ {self.sample_rate:.0%} остальных"
+        )
+
+    def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+    # ------------------------------------------------------------------ #
+    # Спаны
+    # ------------------------------------------------------------------ #
+    async def trace_event(self, name: str, coro: Awaitable[None], **attrs: Any) -> None:
+        """Выполняет coro внутри новой трассы (корневой спан name)."""
+        if not self.enabled:
+            await coro
+            return
+        trace = Trace()
+        root = Span(trace, name, "", attrs)
+        trace.spans.append(root)
+        self.started += 1
+        token = _current.set(root)
+        try:
+            await coro
+        except BaseException as e:
+            root.fail(e)
+            raise
+        finally:
+            _current.reset(token)
+            root.end_ns = time.time_ns()
+            self._finish(trace)
+
+    @contextmanager
+    def span(self, name: str, **attrs: Any) -> Iterator[Optional[Span]]:
+        """Вложенный спан текущей трассы; вне трассы — ничего не делает."""
+        parent = _current.get()
+        if parent is None or parent.trace.root.end_ns:
+            # Вне трассы или в задаче, пережившей своё событие (таймер теста)
+            yield None
+            return
+        trace = parent.trace
+        if len(trace.spans) >= MAX_SPANS:
+            trace.dropped += 1
+            yield None
+            return
+        span = Span(trace, name, parent.span_id, attrs)
+        trace.spans.append(span)
+        token = _current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.fail(e)
+            raise
+        finally:
+            _current.reset(token)
+            span.end_ns = time.time_ns()
+
+    def annotate(self, **attrs: Any) -> None:
+        """Атрибуты корневого спана текущей трассы (маршрут, пользователь)."""
+        current = _current.get()
+        if current is not None:
+            current.trace.root.attrs.update(attrs)
+
+    def record_error(self, error: Any) -> None:
+        """Помечает текущий спан ошибкой (когда исключение перехвачено)."""
+        current = _current.get()
+        if current is not None:
+            current.fail(error)
+
+    def current_trace_id(self) -> Optional[str]:
+        current = _current.get()
+        return current.trace.trace_id if current is not None else None
+
+    # ------------------------------------------------------------------ #
+    # Tail sampling и экспорт
+    # ------------------------------------------------------------------ #
+    def _finish(self, trace: Trace) -> None:
+        if self._handler is None:
+            return
+        keep = (
+            trace.failed
+            or trace.duration >= self.slow
+            or (self.sample_rate > 0 and random.random() < self.sample_rate)
+        )
+        if not keep:
+            return
+        if trace.dropped:
+            trace.root.attrs["spans.dropped"] = trace.dropped
+        self.exported += 1
+        # Трасса завершена и больше не меняется — её можно отдать другому потоку
+        self._sink.info("trace", extra={"trace": trace})
+
+    def metrics(self) -> Dict[str, int]:
+        return {
+            "started": self.started,
+            "exported": self.exported,
+            "dropped": self._handler.dropped if self._handler else 0,
+        }
+
+
+class TraceFormatter(logging.Formatter):
+    """Трасса → строка OTLP/JSON; выполняется в потоке записи, не в цикле событий."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        trace: Trace = record.trace
+        return json.dumps({
+            "resourceSpans": [{
+                "resource": {"attributes": [_attr("service.name", SERVICE_NAME)]},
+                "scopeSpans": [{
+                    "scope": {"name": __name__},
+                    "spans": [s.to_otlp() for s in trace.spans],
+                }],
+            }]
+        }, ensure_ascii=False, separators=(",", ":"))
+
+
+class TraceIdFilter(logging.Filter):
+    """Добавляет trace_id к записям лога, сделанным внутри трассы."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        current = _current.get()
+        if current is not None:
+            record.trace_id = current.trace.trace_id
+        return True
+
+
+tracer = Tracer()
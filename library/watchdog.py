@@ -0,0 +1,154 @@
+"""
+library/watchdog.py — Контроль задержки цикла событий.
+
+Задача-«пульс» просыпается каждые watchdog_interval секунд и пишет
+опоздание пробуждения в гистограмму ("loop", "lag"). Отдельный поток
+следит за временем последнего пульса: если цикл не отвечает дольше
+watchdog_threshold, поток снимает стек потока цикла
+(sys._current_frames) — в нём видна синхронная функция, которая
+блокирует цикл, и корутина, из которой она вызвана.
+
+Одинаковые стеки пишутся в лог не чаще раза в watchdog_report_interval
+секунд; пропущенные повторы считаются и выводятся со следующим отчётом.
+
+Для staging можно включить отладку asyncio (asyncio_debug): цикл сам
+сообщает о шагах дольше asyncio_slow_callback секунд.
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Dict, Optional, Tuple
+
+from config.settings import settings
+from .metrics import latency
+
+logger = logging.getLogger(__name__)
+
+STACK_LIMIT = 30          # кадров в отчёте
+SIGNATURE_FRAMES = 6      # по скольким верхним кадрам сравниваются стеки
+ASYNCIO_EVENTS = os.path.join("asyncio", "events.py")
+
+
+class LoopWatchdog:
+    def __init__(self):
+        self.interval = settings.watchdog_interval
+        self.threshold = settings.watchdog_threshold
+        self._beat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+        # Пишет только поток наблюдения
+        self._reported: Dict[Tuple, float] = {}
+        self._suppressed: Dict[Tuple, int] = {}
+        self.reports = 0
+        # Пишет только цикл событий
+        self.stalls = 0
+        self.max_lag = 0.0
+
+    # ------------------------------------------------------------------ #
+    # Lifecycle
+    # ------------------------------------------------------------------ #
+    def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        if settings.asyncio_debug:
+            loop.set_debug(True)
+            loop.slow_callback_duration = settings.asyncio_slow_callback
+            logger.info(
+                f"🐞 Отладка asyncio: медленные шаги > {settings.asyncio_slow_callback}s"
+            )
+        if not settings.watchdog_enabled:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._pulse())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        logger.info(
+            f"✅ Watchdog цикла: пульс {self.interval * 1000:.0f} ms, "
+            f"порог {self.threshold * 1000:.0f} ms"
+        )
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    # ------------------------------------------------------------------ #
+    # Пульс (в цикле событий)
+    # ------------------------------------------------------------------ #
+    async def _pulse(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._beat = now
+            lag = max(now - expected, 0.0)
+            latency.observe("loop", "lag", lag)
+            if lag > self.max_lag:
+                self.max_lag = lag
+            if lag > self.threshold:
+                self.stalls += 1
+
+    # ------------------------------------------------------------------ #
+    # Наблюдатель (отдельный поток)
+    # ------------------------------------------------------------------ #
+    def _watch(self) -> None:
+        captured_beat = None
+        while not self._stop.wait(self.threshold / 2):
+            beat = self._beat
+            stalled = time.monotonic() - beat - self.interval
+            if stalled > self.threshold and beat != captured_beat:
+                captured_beat = beat  # один снимок на одну остановку
+                self._capture(stalled)
+
+    def _capture(self, stalled: float) -> None:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return
+        stack = traceback.extract_stack(frame, limit=STACK_LIMIT)
+        # Кадры цикла до Handle._run не интересны — отчёт начинается с задачи
+        for i in range(len(stack) - 1, -1, -1):
+            if stack[i].name == "_run" and stack[i].filename.endswith(ASYNCIO_EVENTS):
+                stack = traceback.StackSummary.from_list(stack[i + 1:])
+                break
+        signature = tuple((f.filename, f.lineno) for f in stack[-SIGNATURE_FRAMES:])
+
+        now = time.monotonic()
+        last = self._reported.get(signature)
+        if last is not None and now - last < settings.watchdog_report_interval:
+            self._suppressed[signature] = self._suppressed.get(signature, 0) + 1
+            return
+        self._reported[signature] = now
+        repeats = self._suppressed.pop(signature, 0)
+        self.reports += 1
+
+        note = f" (ещё {repeats} таких же с прошлого отчёта)" if repeats else ""
+        logger.warning(
+            f"🐢 Цикл событий заблокирован уже {stalled * 1000:.0f} ms{note}. "
+            f"Стек потока цикла:\n{''.join(traceback.format_list(stack))}"
+        )
+
+    def metrics(self) -> Dict[str, float]:
+        return {
+            "stalls": self.stalls,
+            "reports": self.reports,
+            "max_lag_seconds": self.max_lag,
+        }
+
+
+watchdog = LoopWatchdog()
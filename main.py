@@ -4,51 +4,34 @@ main.py — VK Workspace ФССП Тест-бот.
 Production-ready: long-polling, FSM, PDF, статистика, напоминания.
 """
 import asyncio
+import html
 import logging
 import sys
-import time
-from collections import defaultdict
-from typing import Dict, List
 
 from config.settings import settings
 from vk_bot.bot import VKBot
 from vk_bot.types import VKEvent
 from library.keyboards import get_main_keyboard
 from library.state_manager import state_manager
-from library.states import TestStates
-from library.stats import stats_manager
-from library.reminders import reminders_background_task
-
-from specializations import (
-    callback_handlers,
-    callback_prefix_handlers,
-    message_state_handlers,
+from library.stats import stats_manager, histograms_reconcile_task
+from library.reminders import register_reminders
+from library.scheduler import scheduler
+from library.deferred import deferred
+from library.watchdog import watchdog
+from library.tracing import tracer
+from library.metrics import counters
+from library.middleware import (
+    Context, Pipeline, DEFAULT_MIDDLEWARES, call_handler, api_observer
 )
+from library.admin import ADMIN_COMMANDS, is_admin
+from library.certificates import cert_pool
+from library.cert_cache import cert_cache
+from library.registry import registry, format_verification
+from library.http_server import http_server
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[logging.StreamHandler(sys.stdout)]
-)
-logger = logging.getLogger(__name__)
-
-# ─────────────────────────────────────────────────────────────────────── #
-# Anti-spam: не более 3 событий за 1 секунду на пользователя
-# ─────────────────────────────────────────────────────────────────────────
-_SPAM_WINDOW = 1.0
-_SPAM_LIMIT  = 3
-_user_timestamps: Dict[str, List[float]] = defaultdict(list)
-
-
-def _is_spam(user_id: str) -> bool:
-    now = time.monotonic()
-    ts = _user_timestamps[user_id]
-    ts[:] = [t for t in ts if now - t < _SPAM_WINDOW]
-    if len(ts) >= _SPAM_LIMIT:
-        return True
-    ts.append(now)
-    return False
+from specializations import SPECIALIZATIONS, router
 
+logger = logging.getLogger(__name__)
 
 # ─────────────────────────────────────────────────────────────────────── #
 # Command handlers
@@ -112,17 +95,60 @@ async def handle_help_cmd(bot: VKBot, message, user_id: str):
     await bot.send_text(message.chat.chatId, HELP_TEXT)
 
 
+async def handle_verify_cmd(bot: VKBot, message, user_id: str):
+    """/verify <номер> — проверка сертификата по реестру."""
+    args = (message.text or "").split(maxsplit=1)[1:]
+    if not args:
+        await bot.send_text(message.chat.chatId, "Использование: /verify XXXX-XXXX")
+        return
+    record = await registry.lookup(args[0])
+    serial = record["serial"] if record else html.escape(args[0].strip().upper())
+    await bot.send_text(message.chat.chatId, format_verification(serial, record))
+
+
 COMMANDS = {
     "/start":  handle_start,
     "/stats":  handle_stats_cmd,
     "/help":   handle_help_cmd,
     "/помощь": handle_help_cmd,
+    "/verify": handle_verify_cmd,
 }
 
 
 # ─────────────────────────────────────────────────────────────────────── #
 # Event dispatcher
 # ─────────────────────────────────────────────────────────────────────── #
+async def handle_not_admin(bot: VKBot, message, user_id: str):
+    await bot.send_text(message.chat.chatId, "⛔ Команда доступна только администраторам")
+
+
+async def handle_unknown_callback(bot: VKBot, query, user_id: str):
+    await bot.answer_callback(query.queryId, "❓ Неизвестная команда")
+    logger.warning("⚠️ Неизвестный callback: %r", query.callbackData)
+
+
+async def _message_endpoint(ctx: Context):
+    if ctx.handler is not None:
+        await ctx.handler(ctx.bot, ctx.event, ctx.user_id)
+        return
+    
+    # FSM — текстовый ввод по состоянию
+    handler = router.for_state(ctx.state)
+    if handler is not None:
+        ctx.route = f"state:{ctx.state}"
+        await handler(ctx.bot, ctx.event, ctx.user_id)
+        return
+    
+    # Если нет состояния — показываем меню
+    if not ctx.state:
+        ctx.route = "menu"
+        await ctx.bot.send_text(ctx.chat_id, MAIN_MENU_TEXT, get_main_keyboard())
+
+
+message_pipeline = Pipeline(DEFAULT_MIDDLEWARES, _message_endpoint)
+callback_pipeline = Pipeline(DEFAULT_MIDDLEWARES, call_handler)
+
+
 async def dispatch_message(bot: VKBot, event: VKEvent):
     """Обработка текстовых сообщений."""
     msg = event.message
@@ -131,30 +157,20 @@ async def dispatch_message(bot: VKBot, event: VKEvent):
     
     user_id = msg.from_user.userId
     text = (msg.text or "").strip()
-    
-    if _is_spam(user_id):
-        await bot.send_text(msg.chat.chatId, "⏳ Слишком частые запросы. Подождите секунду.")
-        return
+    ctx = Context(bot, "message", msg, user_id, msg.chat.chatId, route="text")
     
     # Команды
     cmd = text.split()[0].lower() if text else ""
     if cmd in COMMANDS:
-        await COMMANDS[cmd](bot, msg, user_id)
-        return
-    
-    # FSM — текстовый ввод по состоянию
-    current_state = await state_manager.get_state(user_id)
-    if current_state and current_state in message_state_handlers:
-        try:
-            await message_state_handlers[current_state](bot, msg, user_id)
-        except Exception as e:
-            logger.error(f"❌ Ошибка msg-хэндлера [{current_state}]: {e}", exc_info=True)
-            await bot.send_text(msg.chat.chatId, "❌ Ошибка. Начните заново с /start")
-        return
+        ctx.route, ctx.handler = cmd, COMMANDS[cmd]
+    elif cmd in ADMIN_COMMANDS:
+        ctx.route = cmd
+        ctx.handler = ADMIN_COMMANDS[cmd] if is_admin(user_id) else handle_not_admin
+        ctx.error_text = "❌ Ошибка выполнения команды"
+    else:
+        ctx.needs_state = True
     
-    # Если нет состояния — показываем меню
-    if not current_state:
-        await bot.send_text(msg.chat.chatId, MAIN_MENU_TEXT, get_main_keyboard())
+    await message_pipeline(ctx)
 
 
 async def dispatch_callback(bot: VKBot, event: VKEvent):
@@ -163,47 +179,18 @@ async def dispatch_callback(bot: VKBot, event: VKEvent):
     if not cb:
         return
     
-    user_id = cb.from_user.userId
-    data = cb.callbackData
-    
-    if _is_spam(user_id):
-        await bot.answer_callback(cb.queryId, "⏳ Подождите немного...", True)
-        return
-    
-    current_state = await state_manager.get_state(user_id)
-    
-    try:
-        # 1. Точное совпадение
-        if data in callback_handlers:
-            handler = callback_handlers[data]
-            # Проверяем совместимость состояния для ans_* и next
-            if data == "next" and current_state != TestStates.ANSWERING_QUESTION:
-                await bot.answer_callback(cb.queryId, "❌ Нет активного теста", True)
-                return
-            await handler(bot, cb, user_id)
-            return
-        
-        # 2. Совпадение по префиксу
-        for prefix, handler in callback_prefix_handlers.items():
-            if data.startswith(prefix):
-                # Проверка состояния для ans_*
-                if prefix == "ans_" and current_state != TestStates.ANSWERING_QUESTION:
-                    await bot.answer_callback(cb.queryId, "❌ Нет активного теста", True)
-                    return
-                # Проверка состояния для diff_
-                if prefix == "diff_" and current_state != TestStates.WAITING_DIFFICULTY:
-                    await bot.answer_callback(cb.queryId, "❌ Ошибка состояния", True)
-                    return
-                await handler(bot, cb, user_id)
-                return
-        
-        # Не нашли хэндлер
-        await bot.answer_callback(cb.queryId, "❓ Неизвестная команда")
-        logger.warning(f"⚠️ Неизвестный callback: {data!r}")
+    ctx = Context(
+        bot, "callback", cb, cb.from_user.userId, cb.message.chat.chatId,
+        error_text="❌ Ошибка. Попробуйте /start"
+    )
+    route = router.resolve(cb.callbackData)
+    if route is None:
+        ctx.handler = handle_unknown_callback
+    else:
+        ctx.route, ctx.handler = route.key, route.handler
+        ctx.states, ctx.reject = route.states, route.reject
     
-    except Exception as e:
-        logger.error(f"❌ Ошибка callback-хэндлера [{data}]: {e}", exc_info=True)
-        await bot.answer_callback(cb.queryId, "❌ Ошибка. Попробуйте /start", True)
+    await callback_pipeline(ctx)
 
 
 # ─────────────────────────────────────────────────────────────────────── #
@@ -224,8 +211,10 @@ async def polling_loop(bot: VKBot):
     while True:
         try:
             resp = await bot.get_events(last_event_id)
+            counters.inc("poll_requests_total")
             
             if resp is None:
+                counters.inc("poll_errors_total")
                 error_count += 1
                 wait = min(2 ** error_count, 60)
                 logger.warning(f"⚠️ Нет ответа от API, ждём {wait}s")
@@ -233,6 +222,7 @@ async def polling_loop(bot: VKBot):
                 continue
 
             if not resp.get("ok", False):
+                counters.inc("poll_errors_total")
                 error_count += 1
                 description = resp.get("description", "unknown error")
                 wait = min(2 ** error_count, 60)
@@ -263,14 +253,20 @@ async def polling_loop(bot: VKBot):
                     payload=raw_event.get("payload", {}),
                     event_id=event_id
                 )
+                counters.inc("events_total", type=event.type)
                 
-                # Запускаем обработку в фоне (не блокируем polling)
+                # Запускаем обработку в фоне (не блокируем polling);
+                # у каждого события своя трасса
                 if event.type in ("newMessage", "editedMessage"):
-                    asyncio.create_task(dispatch_message(bot, event))
+                    asyncio.create_task(tracer.trace_event(
+                        event.type, dispatch_message(bot, event), event_id=event_id
+                    ))
                 elif event.type == "callbackQuery":
-                    asyncio.create_task(dispatch_callback(bot, event))
+                    asyncio.create_task(tracer.trace_event(
+                        event.type, dispatch_callback(bot, event), event_id=event_id
+                    ))
                 else:
-                    logger.debug(f"ℹ️ Игнорируем событие: {event.type}")
+                    logger.debug("ℹ️ Игнорируем событие: %s", event.type)
             
         except asyncio.CancelledError:
             logger.info("⚠️ Polling отменён")
@@ -299,7 +295,12 @@ async def main():
     logger.info(f"🔑 API_TOKEN загружен: {token_preview} (длина: {len(settings.api_token)})")
     logger.info(f"🌐 API_URL: {settings.api_url}")
 
+    watchdog.start()
+    tracer.start()
+    
     bot = VKBot(token=settings.api_token, api_url=settings.api_url)
+    bot.on_request = api_observer
+    bot.trace_span = tracer.span
     await bot.start()
 
     # Проверка соединения
@@ -317,11 +318,18 @@ async def main():
     await stats_manager.init_db()
     logger.info("✅ База данных инициализирована")
     
+    # Пул рендера сертификатов (воркеры прогреваются до начала polling)
+    await cert_pool.start()
+    await cert_cache.load()
+    await http_server.start()
+    await deferred.start(bot)
+    
     # Запуск фоновых задач
-    reminder_task = asyncio.create_task(reminders_background_task(bot))
-    logger.info("✅ Сервис напоминаний запущен")
+    register_reminders(scheduler, bot)
+    scheduler_task = asyncio.create_task(scheduler.run_forever())
+    histograms_task = asyncio.create_task(histograms_reconcile_task())
     
-    logger.info(f"✅ Загружено 11 специализаций")
+    logger.info(f"✅ Загружено специализаций: {len(SPECIALIZATIONS)}")
     logger.info(f"🧪 ФССП Тест-бот запущен (VK Workspace)")
     
     try:
@@ -329,11 +337,17 @@ async def main():
     except KeyboardInterrupt:
         logger.info("⚠️ Остановка по Ctrl+C")
     finally:
-        reminder_task.cancel()
-        try:
-            await reminder_task
-        except asyncio.CancelledError:
-            pass
+        for task in (scheduler_task, histograms_task):
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        await deferred.stop()
+        await watchdog.stop()
+        tracer.stop()
+        cert_pool.shutdown()
+        await http_server.stop()
         await bot.stop()
         logger.info("👋 Бот остановлен")
 
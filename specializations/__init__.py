@@ -1,15 +1,18 @@
 """
-specializations/__init__.py — Объединяет все хэндлеры в один реестр.
+specializations/__init__.py — Таблица специализаций и маршрутизатор.
 
-Структура реестра:
-    callback_handlers: Dict[str, handler_fn]   — точное совпадение callbackData
-    callback_prefix_handlers: Dict[str, handler_fn] — совпадение по префиксу
-    message_state_handlers: Dict[str, handler_fn]  — по текущему состоянию
+Каждый модуль специализации задаёт SPEC_NAME, SPEC_LABEL, SPEC_EMOJI.
+По этой таблице строится один маршрутизатор (library/router.py):
+    router.resolve(callbackData) — маршрут нажатия
+    router.for_state(state)      — обработчик текстового ввода
 """
+from typing import Dict
+
 from . import (
     oupds, ispolniteli, aliment, doznanie, rozyisk,
     prof, oko, informatika, kadry, bezopasnost, upravlenie
 )
+from ._base import Specialization, build_router
 
 # Все 11 специализаций
 _ALL = [
@@ -17,19 +20,9 @@ _ALL = [
     prof, oko, informatika, kadry, bezopasnost, upravlenie
 ]
 
-# Собираем реестры из всех специализаций
-callback_handlers = {}        # exact callbackData
-callback_prefix_handlers = {} # callbackData.startswith(key)
-message_state_handlers = {}   # state -> handler
-
-_PREFIX_KEYS = {"diff_", "ans_"}
+SPECIALIZATIONS: Dict[str, Specialization] = {
+    mod.SPEC_NAME: Specialization(mod.SPEC_NAME, mod.SPEC_LABEL, mod.SPEC_EMOJI)
+    for mod in _ALL
+}
 
-for mod in _ALL:
-    for key, fn in mod.handlers.items():
-        if key.startswith("msg:"):
-            # Сообщения по состоянию
-            message_state_handlers[key[4:]] = fn
-        elif key in _PREFIX_KEYS:
-            callback_prefix_handlers[key] = fn
-        else:
-            callback_handlers[key] = fn
+router = build_router(SPECIALIZATIONS)
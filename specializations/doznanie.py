@@ -1,8 +1,4 @@
 """specializations/doznanie.py — Дознание."""
-from ._base import make_handlers
-
 SPEC_NAME  = "doznanie"
 SPEC_LABEL = "Дознание"
 SPEC_EMOJI = "🎯"
-
-handlers = make_handlers(SPEC_NAME, SPEC_LABEL, SPEC_EMOJI)
@@ -1,8 +1,4 @@
 """specializations/informatika.py — Информатизация и информационная безопасность."""
-from ._base import make_handlers
-
 SPEC_NAME  = "informatika"
 SPEC_LABEL = "Информатизация и информационная безопасность"
 SPEC_EMOJI = "💻"
-
-handlers = make_handlers(SPEC_NAME, SPEC_LABEL, SPEC_EMOJI)
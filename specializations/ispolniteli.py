@@ -1,8 +1,4 @@
 """specializations/ispolniteli.py — Исполнительное производство."""
-from ._base import make_handlers
-
 SPEC_NAME  = "ispolniteli"
 SPEC_LABEL = "Исполнительное производство"
 SPEC_EMOJI = "📊"
-
-handlers = make_handlers(SPEC_NAME, SPEC_LABEL, SPEC_EMOJI)
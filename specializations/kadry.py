@@ -1,8 +1,4 @@
 """specializations/kadry.py — Кадровая работа."""
-from ._base import make_handlers
-
 SPEC_NAME  = "kadry"
 SPEC_LABEL = "Кадровая работа"
 SPEC_EMOJI = "👥"
-
-handlers = make_handlers(SPEC_NAME, SPEC_LABEL, SPEC_EMOJI)
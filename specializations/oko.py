@@ -1,8 +1,4 @@
 """specializations/oko.py — Организация управления и контроля."""
-from ._base import make_handlers
-
 SPEC_NAME  = "oko"
 SPEC_LABEL = "Организация управления и контроля"
 SPEC_EMOJI = "📡"
-
-handlers = make_handlers(SPEC_NAME, SPEC_LABEL, SPEC_EMOJI)
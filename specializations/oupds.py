@@ -1,8 +1,4 @@
 """specializations/oupds.py — ООУПДС."""
-from ._base import make_handlers
-
 SPEC_NAME  = "oupds"
 SPEC_LABEL = "ООУПДС"
 SPEC_EMOJI = "🚨"
-
-handlers = make_handlers(SPEC_NAME, SPEC_LABEL, SPEC_EMOJI)
@@ -0,0 +1,34 @@
+"""
+tests/conftest.py — Общая настройка тестов.
+
+Настройки читаются при импорте config.settings, поэтому окружение
+задаётся до первого импорта модулей бота: тестовый токен, временные
+data/ и logs/, без файлового лога.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+_TMP = Path(tempfile.mkdtemp(prefix="bot_tests_"))
+os.environ.setdefault("API_TOKEN", "test-token")
+os.environ.setdefault("DATA_DIR", str(_TMP / "data"))
+os.environ.setdefault("LOGS_DIR", str(_TMP / "logs"))
+os.environ.setdefault("USE_FILE_LOGGING", "false")
+
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """StatsManager с чистой базой во временном каталоге."""
+    from library.stats import stats_manager
+
+    monkeypatch.setattr(stats_manager, "db_path", tmp_path / "stats.db")
+    asyncio.run(stats_manager.init_db())
+    return stats_manager
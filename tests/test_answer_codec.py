@@ -0,0 +1,76 @@
+import pytest
+from pydantic import ValidationError
+
+from library.answer_codec import (
+    FORMAT_VERSION, HEADER_SIZE, MASK_BITS, MAX_OPTIONS, RECORD_SIZE, decode_answers, encode_answers,
+)
+from library.models import CurrentTestState, Question
+
+
+def _question(qid: int, correct, n_options: int = 5) -> Question:
+    q = Question(
+        question=f"Вопрос {qid}",
+        options=[f"Вариант {i}" for i in range(1, n_options + 1)],
+        correct_answers=set(correct),
+        question_id=qid,
+    )
+    q.shuffle_options()
+    return q
+
+
+def test_round_trip_keeps_original_option_order():
+    questions = [_question(10, {1}), _question(11, {2, 4}), _question(12, {5})]
+    state = CurrentTestState(questions=questions)
+    # Пользователь выбирает в ПЕРЕМЕШАННОМ порядке: правильные варианты
+    # первого вопроса и неправильный вариант третьего
+    wrong = min({1, 2, 3, 4, 5} - questions[2].correct_answers)
+    state.answers_history = {0: set(questions[0].correct_answers), 2: {wrong}}
+    state.answer_times = {0: 3.25, 1: 0.0, 2: 12.0}
+
+    blob = encode_answers(state)
+    assert blob[0] == FORMAT_VERSION
+    assert len(blob) == HEADER_SIZE + RECORD_SIZE * 3
+
+    records = decode_answers(blob)
+    assert [r.question_id for r in records] == [10, 11, 12]
+    # Маски — в исходном порядке JSON: вариант k → бит k-1
+    assert records[0].correct_mask == 0b00001
+    assert records[0].chosen_mask == records[0].correct_mask
+    assert records[1].correct_mask == 0b01010
+    assert records[1].chosen_mask == 0
+    assert records[2].correct_mask == 0b10000
+    assert records[2].chosen_mask == 1 << questions[2].shuffle_mapping[wrong - 1]
+    assert records[2].chosen_mask != records[2].correct_mask
+    assert [r.time_ds for r in records] == [32, 0, 120]
+
+
+def test_time_saturates_at_uint16():
+    state = CurrentTestState(questions=[_question(0, {1})])
+    state.answer_times = {0: 1e9}
+    assert decode_answers(encode_answers(state))[0].time_ds == 0xFFFF
+
+
+def test_decode_rejects_unknown_version():
+    assert decode_answers(b"") == []
+    with pytest.raises(ValueError):
+        decode_answers(bytes([FORMAT_VERSION + 1]) + b"\0" * RECORD_SIZE)
+
+
+def test_mask_covers_model_option_limit():
+    assert MAX_OPTIONS == 6
+    assert MAX_OPTIONS <= MASK_BITS
+
+
+def test_max_options_question_round_trips():
+    q = _question(7, {1, MAX_OPTIONS}, n_options=MAX_OPTIONS)
+    state = CurrentTestState(questions=[q])
+    state.answers_history = {0: set(range(1, MAX_OPTIONS + 1))}
+
+    record = decode_answers(encode_answers(state))[0]
+    assert record.correct_mask == 1 | 1 << (MAX_OPTIONS - 1)
+    assert record.chosen_mask == (1 << MAX_OPTIONS) - 1
+
+
+def test_model_rejects_more_options_than_the_mask_holds():
+    with pytest.raises(ValidationError):
+        _question(8, {1}, n_options=MAX_OPTIONS + 1)
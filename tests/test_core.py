@@ -0,0 +1,81 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from library import core
+from library.models import CurrentTestState, Question
+from library import timers
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, chat_id, text, keyboard=None):
+        self.sent.append(text)
+
+    async def delete_message(self, chat_id, msg_id):
+        pass
+
+
+def _state(n: int = 3) -> CurrentTestState:
+    questions = [
+        Question(question=f"Вопрос {i}", options=["a", "b", "c"], correct_answers={1}, question_id=i)
+        for i in range(n)
+    ]
+    return CurrentTestState(questions=questions, specialization="oupds")
+
+
+@pytest.fixture
+def no_prerender(monkeypatch):
+    monkeypatch.setattr(core.prerenderer, "schedule", lambda *a: None)
+
+
+def test_timeout_records_the_open_question(db, no_prerender):
+    state = _state()
+    # Первый вопрос отвечен через «Далее», на втором истекло время
+    state.load_answer(0)
+    state.question_shown_at -= 4.0
+    state.selected_answers = {1}
+    state.save_answer(0)
+    state.current_index = 1
+    state.load_answer(1)
+    state.question_shown_at -= 7.0
+    state.selected_answers = {1}
+
+    bot = FakeBot()
+    query = SimpleNamespace(message=SimpleNamespace(chat=SimpleNamespace(chatId="u1")))
+
+    async def scenario():
+        async def on_timeout():
+            await core.finish_test(bot, query, "u1", state)
+
+        timer = timers.TestTimer(0, on_timeout)
+        state.timer_task = timer
+        await timer.start()
+        await timer.task
+
+    asyncio.run(scenario())
+    assert state.result_id is not None
+    assert state.question_shown_at is None
+    assert state.answer_times[0] == pytest.approx(4.0, abs=0.5)
+    assert state.answer_times[1] == pytest.approx(7.0, abs=0.5)
+    assert 2 not in state.answer_times
+    # Выбор на открытом вопросе засчитан
+    assert state.answers_history == {0: {1}, 1: {1}}
+    assert state.correct_count == 2
+    assert "Тест завершён" in bot.sent[-1]
+
+
+def test_finish_after_last_question_keeps_recorded_time(db, no_prerender):
+    state = _state(1)
+    state.load_answer(0)
+    state.question_shown_at -= 3.0
+    state.save_answer(0)
+    state.current_index = 1
+
+    query = SimpleNamespace(message=SimpleNamespace(chat=SimpleNamespace(chatId="u2")))
+    asyncio.run(core.finish_test(FakeBot(), query, "u2", state))
+    assert list(state.answer_times) == [0]
+    assert state.answer_times[0] == pytest.approx(3.0, abs=0.5)
@@ -0,0 +1,162 @@
+import asyncio
+import json
+import time
+
+import aiosqlite
+import pytest
+
+from library import deferred as deferred_module
+from library.deferred import MAX_ATTEMPTS, RETRY_DELAY, DeferredQueue
+
+
+class FakeBot:
+    """Записывает вызовы; ответ задаётся заранее (None — сетевая ошибка)."""
+
+    def __init__(self, response=None):
+        self.response = response if response is not None else {"ok": True}
+        self.calls = []
+
+    async def delete_messages(self, chat_id, msg_ids):
+        self.calls.append(("delete", chat_id, list(msg_ids)))
+        return self.response if self.response != "error" else None
+
+    async def edit_text(self, chat_id, msg_id, text, inline_keyboard=None):
+        self.calls.append(("edit", chat_id, msg_id, text, inline_keyboard))
+        return self.response if self.response != "error" else None
+
+
+async def _rows(db):
+    async with aiosqlite.connect(db.db_path) as conn:
+        cursor = await conn.execute("SELECT kind, chat_id, msg_id, attempts, due FROM deferred_actions")
+        return await cursor.fetchall()
+
+
+async def _run_due(queue: DeferredQueue) -> None:
+    """Один проход воркера по всем действиям, как если бы срок наступил."""
+    due = sorted(queue._heap)
+    queue._heap.clear()
+    await queue._execute(due)
+
+
+def test_deletes_of_one_chat_go_in_one_call(db):
+    bot = FakeBot()
+    queue = DeferredQueue()
+    queue._bot = bot
+
+    async def scenario():
+        for msg_id in ("m1", "m2", "m3"):
+            await queue.delete_later("chat1", msg_id, 0)
+        await queue.delete_later("chat2", "m4", 0)
+        await _run_due(queue)
+        return await _rows(db)
+
+    assert asyncio.run(scenario()) == []
+    assert sorted(bot.calls) == [
+        ("delete", "chat1", ["m1", "m2", "m3"]),
+        ("delete", "chat2", ["m4"]),
+    ]
+    assert queue.metrics()["done"] == 4
+    assert queue.api_calls == 2
+
+
+def test_edit_payload(db):
+    bot = FakeBot()
+    queue = DeferredQueue()
+    queue._bot = bot
+    keyboard = [[{"text": "ОК", "callbackData": "ok"}]]
+
+    async def scenario():
+        await queue.edit_later("chat1", "m1", 0, "⏰ Время вышло", keyboard)
+        await _run_due(queue)
+
+    asyncio.run(scenario())
+    assert bot.calls == [("edit", "chat1", "m1", "⏰ Время вышло", keyboard)]
+
+
+def test_api_refusal_is_not_retried(db):
+    # ok=False — сообщение уже удалено: повторять бессмысленно
+    bot = FakeBot({"ok": False, "description": "Message not found"})
+    queue = DeferredQueue()
+    queue._bot = bot
+
+    async def scenario():
+        await queue.delete_later("chat1", "m1", 0)
+        await _run_due(queue)
+        return await _rows(db)
+
+    assert asyncio.run(scenario()) == []
+    assert queue.pending() == 0
+
+
+@pytest.mark.parametrize("description", ["Rate limit exceeded", "Internal error"])
+def test_temporary_refusal_is_retried(db, description):
+    bot = FakeBot({"ok": False, "description": description})
+    queue = DeferredQueue()
+    queue._bot = bot
+
+    async def scenario():
+        await queue.delete_later("chat1", "m1", 0)
+        await queue.edit_later("chat1", "m2", 0, "⏰ Время вышло")
+        await _run_due(queue)
+        return await _rows(db)
+
+    rows = asyncio.run(scenario())
+    assert sorted((r[0], r[2], r[3]) for r in rows) == [("delete", "m1", 1), ("edit", "m2", 1)]
+    assert all(r[4] == pytest.approx(time.time() + RETRY_DELAY, abs=1.0) for r in rows)
+    assert queue.pending() == 2
+    assert queue.metrics()["done"] == 0
+
+
+def test_network_error_backs_off_then_drops(db):
+    bot = FakeBot("error")
+    queue = DeferredQueue()
+    queue._bot = bot
+
+    async def scenario():
+        await queue.delete_later("chat1", "m1", 0)
+        history = []
+        for _ in range(MAX_ATTEMPTS):
+            before = time.time()
+            await _run_due(queue)
+            rows = await _rows(db)
+            history.append((rows, [a[0] - before for a in queue._heap]))
+        return history
+
+    history = asyncio.run(scenario())
+    for attempt, (rows, delays) in enumerate(history[:-1], start=1):
+        # Повтор сохранён в БД с числом попыток и отложен на RETRY_DELAY
+        assert [(r[0], r[2], r[3]) for r in rows] == [("delete", "m1", attempt)]
+        assert delays == [pytest.approx(RETRY_DELAY, abs=1.0)]
+        assert rows[0][4] == pytest.approx(time.time() + RETRY_DELAY, abs=1.0)
+    # После MAX_ATTEMPTS попыток действие отбрасывается
+    assert history[-1] == ([], [])
+    assert len(bot.calls) == MAX_ATTEMPTS
+    assert queue.metrics()["dropped"] == 1
+
+
+def test_queue_survives_restart(db, monkeypatch):
+    monkeypatch.setattr(deferred_module, "BATCH_WINDOW", 0.0)
+
+    async def scenario():
+        first = DeferredQueue()
+        first._bot = FakeBot()
+        await first.delete_later("chat1", "soon", 0.05)
+        await first.edit_later("chat1", "later", 3600, json.dumps("x"))
+
+        # «Перезапуск»: новая очередь читает действия из БД и выполняет наступившие
+        bot = FakeBot()
+        second = DeferredQueue()
+        await second.start(bot)
+        restored = second.pending()
+        for _ in range(100):
+            if bot.calls:
+                break
+            await asyncio.sleep(0.01)
+        await second.stop()
+        return restored, bot.calls, second.pending(), await _rows(db)
+
+    restored, calls, pending, rows = asyncio.run(scenario())
+    assert restored == 2
+    assert calls == [("delete", "chat1", ["soon"])]
+    assert pending == 1
+    assert [(r[0], r[2]) for r in rows] == [("edit", "later")]
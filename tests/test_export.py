@@ -0,0 +1,21 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from library import export
+
+
+def test_export_path_is_unique_within_a_second(tmp_path, monkeypatch):
+    monkeypatch.setattr(export, "EXPORT_DIR", tmp_path / "exports")
+    with ThreadPoolExecutor(8) as pool:
+        paths = list(pool.map(lambda _: export.export_path("certificates", ".zip"), range(20)))
+    assert len(set(paths)) == 20
+    assert all(p.exists() and p.name.startswith("certificates_") for p in paths)
+    assert all(p.name.endswith(".zip") for p in paths)
+
+
+def test_export_path_skips_existing_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(export, "EXPORT_DIR", tmp_path)
+    first = export.export_path("results", ".csv.gz")
+    first.write_bytes(b"data")
+    second = export.export_path("results", ".csv.gz")
+    assert second != first
+    assert first.read_bytes() == b"data"
@@ -0,0 +1,36 @@
+import logging
+
+from config import log_handlers
+from config.log_handlers import SAMPLE_MAX_KEYS, SamplingFilter
+
+
+def _record(msg, name="library.core", level=logging.INFO):
+    return logging.makeLogRecord({"name": name, "levelno": level, "msg": msg})
+
+
+def test_keeps_one_of_n_per_template():
+    f = SamplingFilter({"library": 3})
+    passed = [f.filter(_record("✅ Ответ %s")) for _ in range(7)]
+    assert passed == [True, False, False, True, False, False, True]
+    assert f.sampled_out == 4
+    assert f.filter(_record("⚠️ warn", level=logging.WARNING))
+    assert all(f.filter(_record("x", name="vk_bot")) for _ in range(3))
+
+
+def test_counters_reset_every_window(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(log_handlers.time, "monotonic", lambda: clock[0])
+    f = SamplingFilter({"library": 10})
+    assert f.filter(_record("msg"))
+    assert not f.filter(_record("msg"))
+    clock[0] += log_handlers.SAMPLE_WINDOW
+    # Новое окно: первая запись шаблона снова проходит
+    assert f.filter(_record("msg"))
+    assert len(f._seen) == 1
+
+
+def test_unique_messages_do_not_grow_memory():
+    f = SamplingFilter({"library": 2})
+    for i in range(SAMPLE_MAX_KEYS * 2 + 5):
+        f.filter(_record(f"Пользователь {i} начал тест"))
+    assert len(f._seen) <= SAMPLE_MAX_KEYS
@@ -0,0 +1,59 @@
+import asyncio
+from types import SimpleNamespace
+
+from library import middleware
+from library.middleware import DEFAULT_MIDDLEWARES, Context, Pipeline, errors
+
+
+class FlakyBot:
+    """Любой ответ пользователю падает, как при обрыве соединения."""
+
+    def __init__(self):
+        self.attempts = 0
+
+    async def answer_callback(self, *args, **kwargs):
+        self.attempts += 1
+        raise ConnectionError("connection reset")
+
+    async def send_text(self, *args, **kwargs):
+        self.attempts += 1
+        raise ConnectionError("connection reset")
+
+
+def _ctx(bot, kind="message"):
+    return Context(bot=bot, kind=kind, event=SimpleNamespace(queryId="q1"), user_id="u1", chat_id="u1")
+
+
+def test_errors_is_outermost():
+    assert DEFAULT_MIDDLEWARES[0] is errors
+
+
+def test_failed_limit_reply_does_not_escape(monkeypatch):
+    monkeypatch.setattr(middleware.rate_limiter, "check", lambda *a: "user")
+    handled = []
+
+    async def endpoint(ctx):
+        handled.append(ctx)
+
+    bot = FlakyBot()
+    pipeline = Pipeline(DEFAULT_MIDDLEWARES, endpoint)
+    for kind in ("message", "callback"):
+        asyncio.run(pipeline(_ctx(bot, kind)))
+    assert handled == []
+    assert bot.attempts > 0
+
+
+def test_handler_error_is_reported(monkeypatch):
+    monkeypatch.setattr(middleware.rate_limiter, "check", lambda *a: None)
+    sent = []
+
+    class Bot:
+        async def send_text(self, chat_id, text):
+            sent.append(text)
+
+    async def endpoint(ctx):
+        raise RuntimeError("boom")
+
+    ctx = _ctx(Bot())
+    asyncio.run(Pipeline(DEFAULT_MIDDLEWARES, endpoint)(ctx))
+    assert sent == [ctx.error_text]
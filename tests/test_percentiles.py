@@ -0,0 +1,64 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from library.percentiles import PERIOD_ALL, ScoreHistograms, period_key, score_bin
+
+
+def _filled(scores) -> ScoreHistograms:
+    hist = ScoreHistograms()
+    for score in scores:
+        hist.add("oupds", "базовый", score)
+    return hist
+
+
+def test_score_bin_clamps_to_0_100():
+    assert score_bin(-5) == 0
+    assert score_bin(49.9) == 49
+    assert score_bin(100) == 100
+    assert score_bin(250) == 100
+
+
+def test_period_key():
+    when = datetime(2026, 3, 31, 23, 59, tzinfo=timezone.utc)
+    assert period_key("month", when) == "2026-03"
+    assert period_key("all", when) == PERIOD_ALL
+
+
+def test_percentile_counts_others_strictly_below():
+    # 10 результатов 0, 10, …, 90; сам результат уже учтён
+    hist = _filled(range(0, 100, 10))
+    assert hist.percentile("oupds", "базовый", 0) == 0
+    assert hist.percentile("oupds", "базовый", 50) == pytest.approx(5 / 9 * 100)
+    assert hist.percentile("oupds", "базовый", 90) == 100
+
+
+def test_ties_are_not_counted_as_below():
+    hist = _filled([70, 70, 70, 40])
+    assert hist.percentile("oupds", "базовый", 70) == pytest.approx(1 / 3 * 100)
+
+
+def test_min_samples_and_unknown_key():
+    hist = _filled([10, 20, 30])
+    assert hist.percentile("oupds", "базовый", 30, min_samples=3) is None
+    assert hist.percentile("oupds", "базовый", 30, min_samples=2) == 100
+    assert hist.percentile("kadry", "базовый", 30) is None
+
+
+def test_add_counts_in_all_and_current_month():
+    hist = _filled([10, 20])
+    assert hist.total("oupds", "базовый") == 2
+    assert hist.total("oupds", "базовый", period_key("month")) == 2
+
+
+def test_replace_builds_all_time_from_months():
+    hist = ScoreHistograms()
+    hist.replace([
+        ("oupds", "базовый", "2026-01", 40, 3),
+        ("oupds", "базовый", "2026-02", 80, 1),
+        ("oupds", "базовый", "2026-02", 120, 1),   # за пределами → корзина 100
+    ])
+    assert hist.total("oupds", "базовый") == 5
+    assert hist.total("oupds", "базовый", "2026-01") == 3
+    assert hist.percentile("oupds", "базовый", 80, period="2026-02") == 0
+    assert hist.percentile("oupds", "базовый", 100) == 100
@@ -0,0 +1,38 @@
+import asyncio
+
+from library import prerender
+from library.prerender import Prerenderer
+
+
+def test_unclaimed_jobs_are_bounded(monkeypatch):
+    monkeypatch.setattr(prerender.settings, "cert_prerender_keep", 3)
+    monkeypatch.setattr(prerender, "certificate_fields", lambda state, user_id: {"user": user_id})
+    monkeypatch.setattr(prerender, "cache_key", lambda fields: f"key-{fields['user']}")
+    discarded = []
+    monkeypatch.setattr(prerender.cert_cache, "discard", discarded.append)
+
+    p = Prerenderer()
+    monkeypatch.setattr(p, "_should_render", lambda state: True)
+
+    async def render(fields):
+        pass
+
+    monkeypatch.setattr(p, "_render", render)
+
+    async def scenario():
+        for user in ("u1", "u2", "u3"):
+            p.schedule(user, None)
+        p.schedule("u1", None)          # повторный тест — u1 снова самый свежий
+        p.schedule("u4", None)
+        p.schedule("u5", None)
+        await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+    assert list(p._jobs) == ["u1", "u4", "u5"]
+    # Вытесненные невостребованные сертификаты удаляются из кэша
+    assert discarded == ["key-u1", "key-u2", "key-u3"]
+    assert p.metrics()["evicted"] == 2
+    assert p.metrics()["pending"] == 3
+
+    p.claim("u4")
+    assert list(p._jobs) == ["u1", "u5"]
@@ -0,0 +1,83 @@
+import re
+
+from library import prometheus
+from library.metrics import counters, latency
+from library.ratelimit import rate_limiter
+
+SAMPLE = re.compile(r"^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{[^}]*\})? (\S+)$")
+
+
+def _render():
+    latency.observe("handler", "callback:next", 0.004)
+    latency.observe("handler", "callback:next", 0.2)
+    latency.observe("handler", "message:text", 0.03)
+    latency.observe("api", "messages/sendText", 0.05)
+    latency.error("handler", "callback:next")
+    latency.error("api", "messages/sendText")
+    counters.inc("events_total", type="callback")
+    counters.inc("events_total", type="message")
+    counters.inc("poll_requests_total")
+    rate_limiter.rejected[("callback", "user")] += 1
+    rate_limiter.rejected[("message", "user")] += 1
+    rate_limiter.allowed["callback"] += 1
+    return prometheus.render()
+
+
+def _family(name: str, types: dict) -> str:
+    for suffix in ("_bucket", "_sum", "_count"):
+        base = name[: -len(suffix)]
+        if name.endswith(suffix) and types.get(base) == "histogram":
+            return base
+    return name
+
+
+def test_type_lines_are_unique():
+    text = _render()
+    declared = [line.split()[2] for line in text.splitlines() if line.startswith("# TYPE ")]
+    assert declared
+    assert len(declared) == len(set(declared))
+    helps = [line.split()[2] for line in text.splitlines() if line.startswith("# HELP ")]
+    assert helps == declared
+
+
+def test_samples_follow_their_declaration():
+    text = _render()
+    assert text.endswith("\n")
+    types = {}
+    current = None
+    seen_families = set()
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split()
+            types[name] = kind
+            current = name
+            continue
+        if line.startswith("#"):
+            continue
+        match = SAMPLE.match(line)
+        assert match, line
+        family = _family(match.group(1), types)
+        # Семейство объявлено и все его строки идут подряд
+        assert family == current, line
+        float(match.group(3))
+        seen_families.add(family)
+    assert seen_families == set(types)
+
+
+def test_histogram_buckets_are_cumulative():
+    text = _render()
+    name = "bot_handler_seconds"
+    buckets = [
+        line for line in text.splitlines()
+        if line.startswith(f'{name}_bucket{{route="callback:next"')
+    ]
+    values = [float(line.rsplit(" ", 1)[1]) for line in buckets]
+    assert values == sorted(values)
+    assert buckets[-1].startswith(f'{name}_bucket{{route="callback:next",le="+Inf"}}')
+    count = next(
+        line for line in text.splitlines()
+        if line.startswith(f'{name}_count{{route="callback:next"}}')
+    )
+    assert float(count.rsplit(" ", 1)[1]) == values[-1]
+    le_5ms = next(line for line in buckets if 'le="0.005"' in line)
+    assert float(le_5ms.rsplit(" ", 1)[1]) >= 1
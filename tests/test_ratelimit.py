@@ -0,0 +1,105 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from library import middleware, ratelimit
+from library.middleware import Context, rate_limit
+from library.ratelimit import GCRA, RateLimiter, parse_limit
+
+
+def test_parse_limit():
+    assert parse_limit("3/1") == (3, 1.0)
+    assert parse_limit("10/60") == (10, 60.0)
+    assert parse_limit("5") == (5, 1.0)
+
+
+def test_gcra_allows_burst_then_rejects():
+    bucket = GCRA(4, 1.0)   # interval 0.25 — точно в двоичной арифметике
+    now = 1000.0
+    for _ in range(4):
+        tat = bucket.peek("u", now)
+        assert tat is not None
+        bucket.commit("u", tat)
+    # Всплеск исчерпан: пятое событие в ту же секунду отклоняется
+    assert bucket.peek("u", now) is None
+    assert bucket.peek("u", now + 0.2) is None
+    # Через interval освобождается ровно одно место
+    tat = bucket.peek("u", now + bucket.interval)
+    assert tat is not None
+    bucket.commit("u", tat)
+    assert bucket.peek("u", now + bucket.interval) is None
+
+
+def test_gcra_keys_are_independent_and_swept():
+    bucket = GCRA(1, 1.0)
+    bucket.commit("a", bucket.peek("a", 0.0))
+    assert bucket.peek("a", 0.0) is None
+    assert bucket.peek("b", 0.0) is not None
+    assert bucket.sweep(0.5) == 0
+    assert bucket.sweep(1.0) == 1
+    assert len(bucket) == 0
+
+
+def _limiter(monkeypatch, **limits):
+    for scope in ratelimit.SCOPES:
+        for kind in ratelimit.KINDS:
+            name = f"ratelimit_{scope}_{kind}"
+            monkeypatch.setattr(ratelimit.settings, name, limits.get(name, ""))
+    return RateLimiter()
+
+
+def test_limiter_reports_scope(monkeypatch):
+    limiter = _limiter(monkeypatch, ratelimit_user_message="2/1", ratelimit_chat_message="3/1")
+    assert limiter.check("message", "u1", "group") is None
+    assert limiter.check("message", "u1", "group") is None
+    assert limiter.check("message", "u1", "group") == "user"
+    assert limiter.check("message", "u2", "group") is None
+    assert limiter.check("message", "u3", "group") == "chat"
+    # Отклонённое событие не расходует лимит других уровней
+    assert limiter.rejected == {("message", "user"): 1, ("message", "chat"): 1}
+    assert limiter.allowed["message"] == 3
+
+
+def test_empty_spec_disables_scope(monkeypatch):
+    limiter = _limiter(monkeypatch, ratelimit_user_callback="1/1")
+    assert limiter.check("callback", "u1", "c") is None
+    assert limiter.check("callback", "u2", "c") is None
+    assert limiter.check("message", "u1", "c") is None
+    assert limiter.check("callback", "u1", "c") == "user"
+
+
+def test_defaults_do_not_shed_other_users():
+    fields = type(ratelimit.settings).model_fields
+    for kind in ratelimit.KINDS:
+        assert fields[f"ratelimit_chat_{kind}"].default == ""
+        assert fields[f"ratelimit_global_{kind}"].default == ""
+
+
+class FakeBot:
+    def __init__(self):
+        self.answered = []
+        self.sent = []
+
+    async def answer_callback(self, query_id, text="", show_alert=False):
+        self.answered.append((query_id, text))
+
+    async def send_text(self, chat_id, text):
+        self.sent.append((chat_id, text))
+
+
+@pytest.mark.parametrize("scope", ["user", "chat", "global"])
+def test_dropped_callback_is_always_answered(monkeypatch, scope):
+    monkeypatch.setattr(middleware.rate_limiter, "check", lambda *a: scope)
+    bot = FakeBot()
+    ctx = Context(bot=bot, kind="callback", event=SimpleNamespace(queryId="q1"),
+                  user_id="u1", chat_id="c1")
+    handled = []
+
+    async def endpoint(ctx):
+        handled.append(ctx)
+
+    asyncio.run(rate_limit(ctx, endpoint))
+    assert handled == []
+    assert [q for q, _ in bot.answered] == ["q1"]
+    assert bool(bot.answered[0][1]) == (scope == "user")
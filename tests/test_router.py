@@ -0,0 +1,104 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from library.keyboards import get_difficulty_keyboard, get_finish_keyboard, get_main_keyboard, get_test_keyboard
+from library.router import Router
+from library.state_manager import state_manager
+from library.states import TestStates
+from specializations import SPECIALIZATIONS, router
+
+
+class FakeBot:
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, name):
+        async def call(*args, **kwargs):
+            self.calls.append((name, args))
+            return {"ok": True}
+        return call
+
+
+def _query(data: str, user_id: str):
+    chat = SimpleNamespace(chatId=user_id)
+    return SimpleNamespace(
+        queryId=f"q-{data}", callbackData=data,
+        message=SimpleNamespace(chat=chat, msgId="m1"),
+    )
+
+
+def test_all_specializations_registered():
+    assert len(SPECIALIZATIONS) == 11
+    menu = {btn["callbackData"] for row in get_main_keyboard() for btn in row}
+    assert {f"spec_{name}" for name in SPECIALIZATIONS} == menu - {"help"}
+
+
+@pytest.mark.parametrize("name", sorted(SPECIALIZATIONS))
+def test_spec_button_dispatches_to_its_specialization(name):
+    spec = SPECIALIZATIONS[name]
+    user_id = f"user-{name}"
+    data = f"spec_{name}"
+    route = router.resolve(data)
+    assert route is not None and route.key == "spec" and route.prefix
+    assert route.allows(None)
+
+    bot = FakeBot()
+
+    async def scenario():
+        await state_manager.clear(user_id)
+        await route.handler(bot, _query(data, user_id), user_id)
+        return await state_manager.get_state(user_id), await state_manager.get_data(user_id)
+
+    state, fsm = asyncio.run(scenario())
+    assert state == TestStates.WAITING_FULL_NAME
+    assert fsm["specialization"] == name
+    assert ("answer_callback", (f"q-{data}",)) in bot.calls
+    sent = [args for method, args in bot.calls if method == "send_text"]
+    assert len(sent) == 1 and spec.label in sent[0][1]
+
+
+def test_unknown_specialization_is_rejected():
+    bot = FakeBot()
+    route = router.resolve("spec_nosuch")
+    asyncio.run(route.handler(bot, _query("spec_nosuch", "u-unknown"), "u-unknown"))
+    assert bot.calls == [("answer_callback", ("q-spec_nosuch", "❓ Неизвестная специализация", True))]
+
+
+def test_every_button_resolves():
+    keyboards = get_main_keyboard() + get_difficulty_keyboard() + get_finish_keyboard() + get_test_keyboard(6)
+    for row in keyboards:
+        for btn in row:
+            assert router.resolve(btn["callbackData"]) is not None, btn["callbackData"]
+    assert router.resolve("nosuch") is None
+    assert router.resolve("nosuch_1") is None
+
+
+def test_state_guards():
+    assert router.resolve("diff_базовый").states == {TestStates.WAITING_DIFFICULTY}
+    assert not router.resolve("ans_1").allows(None)
+    assert router.resolve("next").reject == "❌ Нет активного теста"
+    assert router.for_state(TestStates.WAITING_FULL_NAME) is not None
+    assert router.for_state(None) is None
+
+
+def test_router_rejects_ambiguity():
+    async def handler(*args):
+        pass
+
+    r = Router()
+    r.callback("spec", handler, prefix=True)
+    with pytest.raises(ValueError):
+        r.callback("spec", handler, prefix=True)
+    with pytest.raises(ValueError):
+        r.callback("a_b", handler, prefix=True)
+    r.callback("spec_x", handler)
+    with pytest.raises(ValueError):
+        r.compile()
+
+    r = Router()
+    r.callback("help", handler)
+    r.compile()
+    with pytest.raises(RuntimeError):
+        r.callback("more", handler)
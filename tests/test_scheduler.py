@@ -0,0 +1,86 @@
+from datetime import datetime, time
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from library.scheduler import CronRule, parse_quiet_hours, quiet_until
+
+MSK = ZoneInfo("Europe/Moscow")
+
+
+def at(*args) -> datetime:
+    return datetime(*args, tzinfo=MSK)
+
+
+@pytest.mark.parametrize("expr, after, expected", [
+    # По будням в 09:00: пятница после запуска → понедельник
+    ("0 9 * * 1-5", at(2026, 10, 16, 10, 0), at(2026, 10, 19, 9, 0)),
+    # Строго после: ровно в момент срабатывания — следующий день
+    ("0 9 * * *", at(2026, 10, 19, 9, 0), at(2026, 10, 20, 9, 0)),
+    # Секунды отбрасываются, но 08:59:30 ещё до 09:00
+    ("0 9 * * *", at(2026, 10, 19, 8, 59, 30), at(2026, 10, 19, 9, 0)),
+    ("*/15 * * * *", at(2026, 10, 19, 10, 7), at(2026, 10, 19, 10, 15)),
+    ("*/15 * * * *", at(2026, 10, 19, 10, 45), at(2026, 10, 19, 11, 0)),
+    ("5/20 * * * *", at(2026, 10, 19, 10, 30), at(2026, 10, 19, 10, 45)),
+    ("0 8,20 * * *", at(2026, 10, 19, 8, 1), at(2026, 10, 19, 20, 0)),
+    # 7 и 0 — воскресенье
+    ("0 12 * * 7", at(2026, 10, 19, 0, 0), at(2026, 10, 25, 12, 0)),
+    ("0 12 * * 0", at(2026, 10, 19, 0, 0), at(2026, 10, 25, 12, 0)),
+    # День месяца ИЛИ день недели (как в cron): 13-е число или пятница
+    ("0 0 13 * 5", at(2026, 10, 10, 0, 0), at(2026, 10, 13, 0, 0)),
+    ("0 0 13 * 5", at(2026, 10, 13, 0, 0), at(2026, 10, 16, 0, 0)),
+    # Переход через год и високосный день
+    ("0 0 1 1 *", at(2026, 12, 31, 23, 59), at(2027, 1, 1, 0, 0)),
+    ("0 0 29 2 *", at(2026, 3, 1, 0, 0), at(2028, 2, 29, 0, 0)),
+    # Конец месяца: 31-е есть не в каждом месяце
+    ("30 23 31 * *", at(2026, 11, 1, 0, 0), at(2026, 12, 31, 23, 30)),
+])
+def test_next_after(expr, after, expected):
+    result = CronRule(expr).next_after(after)
+    assert result == expected
+    assert result.tzinfo is MSK
+
+
+@pytest.mark.parametrize("expr", [
+    "0 9 * *", "60 * * * *", "0 24 * * *", "0 0 0 * *", "0 0 * 13 *", "0 0 * * 8", "0 5-1 * * *",
+])
+def test_invalid_rules(expr):
+    with pytest.raises(ValueError):
+        CronRule(expr)
+
+
+def test_rule_that_never_fires():
+    with pytest.raises(ValueError):
+        CronRule("0 0 31 2 *").next_after(at(2026, 1, 1, 0, 0))
+
+
+def test_parse_quiet_hours():
+    assert parse_quiet_hours("") is None
+    assert parse_quiet_hours("21:00-09:00") == (time(21, 0), time(9, 0))
+    assert parse_quiet_hours(" 13:00 - 14:30 ") == (time(13, 0), time(14, 30))
+
+
+@pytest.mark.parametrize("now, expected", [
+    (at(2026, 10, 19, 20, 59), None),
+    (at(2026, 10, 19, 21, 0), at(2026, 10, 20, 9, 0)),   # начало включительно
+    (at(2026, 10, 19, 23, 30), at(2026, 10, 20, 9, 0)),
+    (at(2026, 10, 20, 0, 0), at(2026, 10, 20, 9, 0)),    # после полуночи
+    (at(2026, 10, 20, 8, 59), at(2026, 10, 20, 9, 0)),
+    (at(2026, 10, 20, 9, 0), None),                      # конец не включается
+])
+def test_quiet_hours_across_midnight(now, expected):
+    assert quiet_until(now, parse_quiet_hours("21:00-09:00")) == expected
+
+
+@pytest.mark.parametrize("now, expected", [
+    (at(2026, 10, 19, 12, 59), None),
+    (at(2026, 10, 19, 13, 0), at(2026, 10, 19, 14, 0)),
+    (at(2026, 10, 19, 13, 59), at(2026, 10, 19, 14, 0)),
+    (at(2026, 10, 19, 14, 0), None),
+])
+def test_quiet_hours_within_day(now, expected):
+    assert quiet_until(now, parse_quiet_hours("13:00-14:00")) == expected
+
+
+def test_no_quiet_hours():
+    assert quiet_until(at(2026, 10, 19, 3, 0), None) is None
@@ -0,0 +1,79 @@
+import asyncio
+import re
+
+import pytest
+
+from library.enum import Difficulty
+from library.models import CurrentTestState, Question
+from library.registry import CertificateRegistry
+from library.serials import ALPHABET, new_serial, normalize_serial
+
+
+def test_new_serial_format():
+    for _ in range(100):
+        serial = new_serial()
+        assert re.fullmatch(rf"[{ALPHABET}]{{4}}-[{ALPHABET}]{{4}}", serial)
+        assert normalize_serial(serial) == serial
+
+
+@pytest.mark.parametrize("text", [
+    "9PGA-N87H", "9pga-n87h", "9PGAN87H", " 9pga n87h ", "9PGA—N87H",
+])
+def test_normalize_accepts_spacing_case_and_dashes(text):
+    assert normalize_serial(text) == "9PGA-N87H"
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("O0O0-1111", "0000-1111"),
+    ("IL1i-l000", "1111-1000"),
+    ("oooo-oooo", "0000-0000"),
+])
+def test_normalize_reads_lookalikes(text, expected):
+    assert normalize_serial(text) == expected
+
+
+@pytest.mark.parametrize("text", ["", "9PGA-N87", "9PGA-N87HX", "9PGA-N87U", "ЯЯЯЯ-ЯЯЯЯ"])
+def test_normalize_rejects_invalid(text):
+    assert normalize_serial(text) is None
+
+
+def _finished_test() -> CurrentTestState:
+    question = Question(question="Вопрос", options=["a", "b", "c"], correct_answers={1})
+    state = CurrentTestState(
+        questions=[question], full_name="Иванов И. И.", position="Пристав",
+        department="ОСП №1", specialization="oupds", difficulty=Difficulty.BASIC,
+        correct_count=1, total_questions=1, percentage=100.0, grade="отлично",
+        elapsed_time="00:42",
+    )
+    return state
+
+
+def test_verify_finds_saved_certificate_by_lookalike_spelling(db):
+    registry = CertificateRegistry(max_size=10)
+
+    async def scenario():
+        state = _finished_test()
+        result_id = await db.save_result("1001", state)
+        typed = state.cert_serial.replace("0", "O").replace("1", "l").lower().replace("-", " ")
+        return result_id, state.cert_serial, await registry.lookup(typed)
+
+    result_id, serial, record = asyncio.run(scenario())
+    assert record["serial"] == serial
+    assert record["result_id"] == result_id
+    assert record["full_name"] == "Иванов И. И."
+
+
+def test_verify_unknown_and_invalid(db):
+    registry = CertificateRegistry(max_size=10)
+
+    async def scenario():
+        return (
+            await registry.lookup("ZZZZ-ZZZZ"),
+            await registry.lookup("ZZZZ-ZZZZ"),
+            await registry.lookup("не номер"),
+        )
+
+    assert asyncio.run(scenario()) == (None, None, None)
+    # Повторный неизвестный номер отвечен из кэша, без запроса к БД
+    assert registry.cache_hits == 1
+    assert registry.metrics()["size"] == 1
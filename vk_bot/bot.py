@@ -5,8 +5,10 @@ vk_bot/bot.py — Асинхронный HTTP-клиент для VK Teams Bot A
 import json
 import logging
 import asyncio
+import time
 import aiohttp
-from typing import Optional, List, Dict, Any
+from contextlib import contextmanager
+from typing import Optional, List, Dict, Any, Union, Callable, ContextManager
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
@@ -17,6 +19,11 @@ RETRY_DELAY = 2.0
 POLL_TIME = 25  # секунд для long-polling
 
 
+@contextmanager
+def _no_span(name: str, **attrs: Any):
+    yield None
+
+
 class VKBot:
     """
     Клиент VK Teams Bot API.
@@ -29,6 +36,12 @@ class VKBot:
         self.token = token
         self.api_url = api_url.rstrip("/")
         self._session: Optional[aiohttp.ClientSession] = None
+        # Хук наблюдения: on_request(method, seconds, ok) после каждого вызова
+        # API (время — с учётом повторов)
+        self.on_request: Optional[Callable[[str, float, bool], None]] = None
+        # Хук трассировки: trace_span(name, **attrs) — контекстный менеджер
+        # спана вокруг вызова API (с повторами); спан или None
+        self.trace_span: Callable[..., ContextManager] = _no_span
 
     # ------------------------------------------------------------------ #
     # Lifecycle
@@ -49,59 +62,93 @@ class VKBot:
     # ------------------------------------------------------------------ #
     # Internal helpers
     # ------------------------------------------------------------------ #
+    def _observe(self, method: str, started: float, data: Optional[Dict], span: Any) -> Optional[Dict]:
+        ok = bool(data and data.get("ok"))
+        if self.on_request is not None:
+            self.on_request(method, time.perf_counter() - started, ok)
+        if span is not None:
+            span.set(ok=ok)
+            if not ok:
+                span.fail(data.get("description", "ok=false") if data else "нет ответа")
+        return data
+
     async def _get(self, method: str, params: Dict[str, Any]) -> Optional[Dict]:
-        """GET-запрос к API."""
+        """GET-запрос к API. Значение-список передаётся повторением ключа."""
         params["token"] = self.token
         url = f"{self.api_url}/{method}"
+        query = [
+            (k, str(item)) for k, v in params.items()
+            for item in (v if isinstance(v, (list, tuple)) else [v])
+        ]
+        started = time.perf_counter()
         
-        for attempt in range(MAX_RETRIES):
-            try:
-                async with self._session.get(url, params=params) as resp:
-                    data = await resp.json(content_type=None)
-                    if not data.get("ok", False):
-                        logger.warning(f"⚠️ API error [{method}]: {data}")
-                    return data
-            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
-                logger.warning(f"⚠️ Network error [{method}] attempt {attempt+1}: {e}")
-                if attempt < MAX_RETRIES - 1:
-                    await asyncio.sleep(RETRY_DELAY * (attempt + 1))
-        return None
+        with self.trace_span(method, **{"http.method": "GET"}) as span:
+            for attempt in range(MAX_RETRIES):
+                try:
+                    async with self._session.get(url, params=query) as resp:
+                        data = await resp.json(content_type=None)
+                        if not data.get("ok", False):
+                            logger.warning("⚠️ API error [%s]: %s", method, data)
+                        return self._observe(method, started, data, span)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    logger.warning("⚠️ Network error [%s] attempt %d: %s", method, attempt + 1, e)
+                    if span is not None:
+                        span.set(retries=attempt + 1)
+                    if attempt < MAX_RETRIES - 1:
+                        await asyncio.sleep(RETRY_DELAY * (attempt + 1))
+            return self._observe(method, started, None, span)
 
     async def _post_multipart(
         self, method: str, params: Dict[str, Any],
-        file_bytes: bytes, filename: str
+        file_data: Union[bytes, Path], filename: str
     ) -> Optional[Dict]:
-        """POST multipart/form-data (для отправки файлов)."""
+        """
+        POST multipart/form-data (для отправки файлов).
+        file_data — байты или путь к файлу (файл читается потоково).
+        """
         params["token"] = self.token
         url = f"{self.api_url}/{method}"
+        started = time.perf_counter()
         
-        for attempt in range(MAX_RETRIES):
-            try:
-                form = aiohttp.FormData()
-                for k, v in params.items():
-                    form.add_field(k, str(v))
-                form.add_field("file", file_bytes, filename=filename,
-                               content_type="application/octet-stream")
-                
-                async with self._session.post(url, data=form) as resp:
-                    raw = await resp.text()
-                    if not raw or not raw.strip():
-                        logger.info(f"✅ [{method}] пустой ответ (файл отправлен)")
-                        return {"ok": True}
-                    try:
-                        import json as _json
-                        data = _json.loads(raw)
-                    except Exception:
-                        logger.warning(f"⚠️ [{method}] не-JSON ответ: {raw[:200]}")
-                        return {"ok": True, "raw": raw}
-                    if not data.get("ok", False):
-                        logger.warning(f"⚠️ API error [{method}]: {data}")
-                    return data
-            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
-                logger.warning(f"⚠️ Network error [{method}] attempt {attempt+1}: {e}")
-                if attempt < MAX_RETRIES - 1:
-                    await asyncio.sleep(RETRY_DELAY * (attempt + 1))
-        return None
+        with self.trace_span(method, **{"http.method": "POST"}) as span:
+            for attempt in range(MAX_RETRIES):
+                file_obj = None
+                try:
+                    form = aiohttp.FormData()
+                    for k, v in params.items():
+                        form.add_field(k, str(v))
+                    if isinstance(file_data, Path):
+                        file_obj = file_data.open("rb")
+                        payload = file_obj
+                    else:
+                        payload = file_data
+                    form.add_field("file", payload, filename=filename,
+                                   content_type="application/octet-stream")
+                    
+                    async with self._session.post(url, data=form) as resp:
+                        raw = await resp.text()
+                        if not raw or not raw.strip():
+                            logger.info("✅ [%s] пустой ответ (файл отправлен)", method)
+                            return self._observe(method, started, {"ok": True}, span)
+                        try:
+                            import json as _json
+                            data = _json.loads(raw)
+                        except Exception:
+                            logger.warning("⚠️ [%s] не-JSON ответ: %s", method, raw[:200])
+                            return self._observe(method, started, {"ok": True, "raw": raw}, span)
+                        if not data.get("ok", False):
+                            logger.warning("⚠️ API error [%s]: %s", method, data)
+                        return self._observe(method, started, data, span)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    logger.warning("⚠️ Network error [%s] attempt %d: %s", method, attempt + 1, e)
+                    if span is not None:
+                        span.set(retries=attempt + 1)
+                    if attempt < MAX_RETRIES - 1:
+                        await asyncio.sleep(RETRY_DELAY * (attempt + 1))
+                finally:
+                    if file_obj is not None:
+                        file_obj.close()
+            return self._observe(method, started, None, span)
 
     # ------------------------------------------------------------------ #
     # Events (polling)
@@ -159,6 +206,13 @@ class VKBot:
             "msgId": msg_id
         })
 
+    async def delete_messages(self, chat_id: str, msg_ids: List[str]) -> Optional[Dict]:
+        """Удалить несколько сообщений чата одним запросом."""
+        return await self._get("messages/deleteMessages", {
+            "chatId": chat_id,
+            "msgId": list(msg_ids)
+        })
+
     async def answer_callback(
         self,
         query_id: str,
@@ -187,6 +241,33 @@ class VKBot:
             "files/sendFile", params, file_bytes, filename
         )
 
+    async def send_file_path(
+        self,
+        chat_id: str,
+        path: Path,
+        filename: Optional[str] = None,
+        caption: str = ""
+    ) -> Optional[Dict]:
+        """Отправить файл с диска без загрузки его целиком в память."""
+        params: Dict[str, Any] = {"chatId": chat_id}
+        if caption:
+            params["caption"] = caption
+        return await self._post_multipart(
+            "files/sendFile", params, Path(path), filename or Path(path).name
+        )
+
+    async def send_file_by_id(
+        self,
+        chat_id: str,
+        file_id: str,
+        caption: str = ""
+    ) -> Optional[Dict]:
+        """Повторно отправить уже загруженный файл по fileId."""
+        params: Dict[str, Any] = {"chatId": chat_id, "fileId": file_id}
+        if caption:
+            params["caption"] = caption
+        return await self._get("files/sendFile", params)
+
     # ------------------------------------------------------------------ #
     # Self-info
     # ------------------------------------------------------------------ #